@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import TurfVenue, Booking, TurfUser, Rating, Transaction
+from .models import TurfVenue, Booking, TurfUser, Rating, Transaction, OwnerDayStats, Job, PriceRule, PriceHoliday
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
@@ -11,13 +12,43 @@ class BookingAdmin(admin.ModelAdmin):
     ordering = ('-date', '-start_time')
     raw_id_fields = ('player', 'turf')
 
+class PriceRuleInline(admin.TabularInline):
+    model = PriceRule
+    extra = 0
+
+class PriceHolidayInline(admin.TabularInline):
+    model = PriceHoliday
+    extra = 0
+
 @admin.register(TurfVenue)
 class TurfVenueAdmin(admin.ModelAdmin):
-    list_display = ('name', 'owner', 'location', 'price_per_hour', 'sports_type')
+    list_display = ('name', 'owner', 'location', 'price_per_hour', 'surge_multiplier', 'sports_type')
     list_filter = ('location', 'sports_type', 'owner')
     search_fields = ('name', 'location', 'owner__name')
     ordering = ('name',)
     raw_id_fields = ('owner',)
+    inlines = [PriceRuleInline, PriceHolidayInline]
+
+@admin.register(OwnerDayStats)
+class OwnerDayStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'turf', 'owner', 'bookings', 'revenue', 'blocked_minutes', 'rating_count')
+    list_filter = ('date', 'owner')
+    ordering = ('-date',)
+    raw_id_fields = ('owner', 'turf')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key', 'last_error')
+    ordering = ('-created_at',)
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        """Action to re-queue failed jobs."""
+        count = queryset.filter(status='Failed').update(status='Queued', attempts=0, run_at=timezone.now())
+        self.message_user(request, f"{count} job(s) have been queued again.")
+    retry_jobs.short_description = "Retry selected failed jobs"
 
 class CustomTurfUserAdmin(UserAdmin):
     list_display = ('username', 'name', 'email', 'role', 'is_staff', 'is_active')
@@ -0,0 +1,134 @@
+import calendar
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractIsoWeekDay, TruncMonth
+from .models import Booking, OwnerDayStats, TurfVenue
+from .availability import to_minutes
+from .stats import SOLD_STATUSES, owner_stats_version
+
+# -----------------------------------------------------------------------------
+# Owner Analytics
+# -----------------------------------------------------------------------------
+#
+# Every metric is one grouped query: revenue, bookings and occupancy read the
+# per-day OwnerDayStats rows, and the heatmap groups bookings by weekday and
+# interval. Reports are cached per (owner, range) under the owner's stats
+# version, so any booking, rating or transaction change invalidates them.
+
+ANALYTICS_CACHE_TIMEOUT = 60 * 30
+
+
+def resolve_range(view_type, year, month=None):
+    """
+    Turns the dashboard filters into (start, end, granularity). 'annually'
+    buckets a calendar year by month; 'monthly' buckets one month by day.
+    """
+    if view_type == 'monthly' and month:
+        last_day = calendar.monthrange(year, month)[1]
+        return date(year, month, 1), date(year, month, last_day), 'day'
+    return date(year, 1, 1), date(year, 12, 31), 'month'
+
+
+def _buckets(start, end, granularity):
+    """Returns (bucket_key, label, day_count) for every bucket in the range."""
+    buckets = []
+    if granularity == 'month':
+        current = start.replace(day=1)
+        while current <= end:
+            last_day = calendar.monthrange(current.year, current.month)[1]
+            bucket_end = min(end, current.replace(day=last_day))
+            day_count = (bucket_end - max(start, current)).days + 1
+            buckets.append((current, current.strftime('%b %Y'), day_count))
+            current = current.replace(day=last_day) + timedelta(days=1)
+    else:
+        current = start
+        while current <= end:
+            buckets.append((current, current.strftime('%d %b'), 1))
+            current += timedelta(days=1)
+    return buckets
+
+
+def daily_open_minutes(owner):
+    """Total minutes per day that the owner's turfs are open."""
+    hours = TurfVenue.objects.filter(owner=owner).values_list('open_time', 'close_time')
+    return sum(
+        # A close of 00:00 is midnight.
+        max(0, (to_minutes(close_time) or 24 * 60) - to_minutes(open_time))
+        for open_time, close_time in hours
+        if open_time and close_time
+    )
+
+
+def stats_by_bucket(owner, start, end, granularity):
+    """Maps each bucket key to its summed revenue, bookings and booked minutes."""
+    bucket = TruncMonth('date') if granularity == 'month' else F('date')
+    rows = (OwnerDayStats.objects.filter(owner=owner, date__range=(start, end))
+            .values(bucket=bucket)
+            .annotate(revenue=Sum('revenue'), bookings=Sum('bookings'), booked_minutes=Sum('booked_minutes'))
+            .order_by())
+    return {row['bucket']: row for row in rows}
+
+
+def hour_of_week_heatmap(owner, start, end):
+    """
+    Returns a 7x24 matrix (Monday first) of bookings per hour of the week. Each
+    booking counts towards every hour it covers.
+    """
+    heatmap = [[0] * 24 for _ in range(7)]
+    intervals = (Booking.objects.filter(turf__owner=owner, date__range=(start, end), status__in=SOLD_STATUSES)
+                 .annotate(weekday=ExtractIsoWeekDay('date'))
+                 .values_list('weekday', 'start_time', 'end_time')
+                 .annotate(count=Count('id'))
+                 .order_by())
+    for weekday, start_time, end_time, count in intervals:
+        first_hour = start_time.hour
+        end_minute = to_minutes(end_time) or 24 * 60  # An end of 00:00 is midnight.
+        last_hour = (end_minute - 1) // 60 if end_minute > to_minutes(start_time) else first_hour
+        row = heatmap[weekday - 1]
+        for hour in range(first_hour, min(last_hour, 23) + 1):
+            row[hour] += count
+    return heatmap
+
+
+def _build_report(owner, start, end, granularity):
+    open_minutes = daily_open_minutes(owner)
+    by_bucket = stats_by_bucket(owner, start, end, granularity)
+
+    labels, revenue, bookings, occupancy = [], [], [], []
+    total_booked = total_open = 0
+    for key, label, day_count in _buckets(start, end, granularity):
+        row = by_bucket.get(key, {})
+        booked_minutes = row.get('booked_minutes') or 0
+        bucket_open = open_minutes * day_count
+        labels.append(label)
+        revenue.append(float(row.get('revenue') or 0))
+        bookings.append(row.get('bookings') or 0)
+        occupancy.append(round(booked_minutes * 100 / bucket_open, 2) if bucket_open else 0)
+        total_booked += booked_minutes
+        total_open += bucket_open
+
+    return {
+        'labels': labels,
+        'revenue': revenue,
+        'bookings': bookings,
+        'occupancy': occupancy,
+        'heatmap': hour_of_week_heatmap(owner, start, end),
+        'totals': {
+            'revenue': sum(revenue),
+            'bookings': sum(bookings),
+            'occupancy': round(total_booked * 100 / total_open, 2) if total_open else 0,
+        },
+    }
+
+
+def owner_report(owner, start, end, granularity='day'):
+    """Returns the (cached) analytics report for an owner over [start, end]."""
+    key = 'owner-analytics:{}:{}:{}:{}:{}'.format(
+        owner.pk, owner_stats_version(owner.pk), start.isoformat(), end.isoformat(), granularity
+    )
+    report = cache.get(key)
+    if report is None:
+        report = _build_report(owner, start, end, granularity)
+        cache.set(key, report, ANALYTICS_CACHE_TIMEOUT)
+    return report
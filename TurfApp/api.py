@@ -0,0 +1,375 @@
+import hashlib
+import json
+import time
+from datetime import date, datetime, timedelta
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import aauthenticate, alogin
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.csrf import ensure_csrf_cookie
+from .availability import SLOT_MINUTES, to_minutes
+from .history import BookingHistory
+from .live import broker, live_channel, serves_live_streams
+from .models import Booking, SlotHold, TurfUser, TurfVenue
+from .pricing import PriceTable
+from .search import decode_cursor, encode_cursor
+from .services import BookingError, cancel_booking, create_booking
+from .slot_cache import availability_version, cached_turf_day
+from .templatetags.booking_tags import is_cancellable
+from .views import booking_json
+
+# -----------------------------------------------------------------------------
+# Mobile JSON API
+# -----------------------------------------------------------------------------
+#
+# Async views for the mobile clients under /api/v1/: turf listing, one turf-day
+# of availability, booking, cancellation and the player's bookings. They return
+# compact JSON and never render templates. Reads use the async ORM. Writes
+# reuse the booking services, run through sync_to_async because they need a
+# transaction. Under an ASGI server (uvicorn TurfProject.asgi:application)
+# a waiting request holds no thread, so one worker can keep many slow
+# connections open.
+#
+# The API signs in with the same session as the web app, so writes go through
+# the CSRF middleware: a client fetches /api/v1/session/ for the csrftoken
+# cookie (or POSTs its email and password there to sign in) and sends the
+# token back in an X-CSRFToken header.
+#
+# Availability responses carry an ETag built from the turf and day versions
+# and the live holds. A client that sends it back in If-None-Match gets a 304
+# before any slot work is done.
+
+API_PAGE_SIZE = 20
+MAX_API_PAGE_SIZE = 50
+
+
+def api_json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def api_error(message, status=400):
+    return api_json({'error': message}, status=status)
+
+
+def api_view(methods, role=None):
+    """
+    Restricts an async API view to some HTTP methods and a logged-in user (of a
+    role), answering with JSON errors instead of login redirects. The view gets
+    the user as its second argument.
+    """
+    def decorate(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return api_error(f"Use {' or '.join(methods)}.", status=405)
+            user = await request.auser()
+            if not user.is_authenticated:
+                return api_error("Authentication required.", status=401)
+            if role and user.role != role:
+                return api_error("Not allowed for this account.", status=403)
+            return await view(request, user, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def request_data(request):
+    """The request's JSON object body, or its form data."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def page_size(request):
+    try:
+        return max(1, min(int(request.GET.get('limit', API_PAGE_SIZE)), MAX_API_PAGE_SIZE))
+    except ValueError:
+        return API_PAGE_SIZE
+
+
+def thumbnail_url(turf):
+    """The smallest WebP variant of a turf's photo, else the original (or None)."""
+    variants = turf['image_variants'] or {}
+    if variants.get('source') == turf['image'] and variants.get('webp'):
+        return default_storage.url(variants['webp'][0][1])
+    return default_storage.url(turf['image']) if turf['image'] else None
+
+# -----------------------------------------------------------------------------
+# Session
+# -----------------------------------------------------------------------------
+
+def api_user_json(user):
+    return {'id': user.id, 'name': user.name, 'email': user.email, 'role': user.role}
+
+
+@ensure_csrf_cookie
+async def session_api(request):
+    """
+    GET: the signed-in user (or null) and a CSRF token, also set as a cookie.
+    POST: signs in with `email` and `password`; the token rotates on sign-in.
+    """
+    if request.method not in ('GET', 'POST'):
+        return api_error("Use GET or POST.", status=405)
+    if request.method == 'POST':
+        data = request_data(request)
+        if data is None:
+            return api_error("Send a JSON object.")
+        user = await aauthenticate(
+            request, username=str(data.get('email', '')), password=str(data.get('password', '')),
+        )
+        if user is None:
+            return api_error("Invalid email or password.", status=401)
+        await alogin(request, user)
+    else:
+        user = await request.auser()
+    return api_json({
+        'user': api_user_json(user) if user.is_authenticated else None,
+        'csrf_token': get_token(request),
+    })
+
+# -----------------------------------------------------------------------------
+# Turfs and Availability
+# -----------------------------------------------------------------------------
+
+@api_view(['GET'])
+async def turfs_api(request, user):
+    """Turfs by name, filtered by `sport` and `location`, paged with `cursor` and `limit`."""
+    turfs = TurfVenue.objects.order_by('name', 'id')
+    if request.GET.get('sport'):
+        turfs = turfs.filter(sports_type__iexact=request.GET['sport'])
+    if request.GET.get('location'):
+        turfs = turfs.filter(location__icontains=request.GET['location'])
+    cursor = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+    if cursor:
+        name, pk = cursor
+        turfs = turfs.filter(name__gte=name).exclude(name=name, id__lte=pk)
+
+    limit = page_size(request)
+    rows = [turf async for turf in turfs.values(
+        'id', 'name', 'location', 'sports_type', 'price_per_hour', 'open_time', 'close_time',
+        'rating_count', 'rating_sum', 'image', 'image_variants',
+    )[:limit + 1]]
+    next_cursor = encode_cursor(rows[limit - 1]['name'], rows[limit - 1]['id']) if len(rows) > limit else None
+    return api_json({
+        'results': [
+            {
+                'id': turf['id'],
+                'name': turf['name'],
+                'location': turf['location'],
+                'sport': turf['sports_type'],
+                'price_per_hour': str(turf['price_per_hour']),
+                'open_time': turf['open_time'].strftime('%H:%M') if turf['open_time'] else None,
+                'close_time': turf['close_time'].strftime('%H:%M') if turf['close_time'] else None,
+                'rating': round(turf['rating_sum'] / turf['rating_count'], 2) if turf['rating_count'] else None,
+                'rating_count': turf['rating_count'],
+                'thumbnail': thumbnail_url(turf),
+            }
+            for turf in rows[:limit]
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+async def viewer_holds(user, turf_id, day):
+    """The live holds of a turf-day that block this user: everyone's but their own."""
+    return [hold async for hold in SlotHold.objects.filter(
+        turf_id=turf_id, date=day, expires_at__gt=timezone.now(),
+    ).exclude(player=user).order_by('start_time', 'end_time').values_list('start_time', 'end_time')]
+
+
+def day_clock(day):
+    """
+    Returns (clock, cutoff): 'past', 'future', or for today the minute before
+    which slots have closed (cutoff is that time).
+    """
+    cutoff = (timezone.now() - timedelta(minutes=10)).time()
+    if day < date.today():
+        return 'past', cutoff
+    if day > date.today():
+        return 'future', cutoff
+    # Today's slots close as time passes, so the clock changes every minute.
+    return to_minutes(cutoff, round_up=True), cutoff
+
+
+def free_slots(grid, clock, cutoff, holds):
+    """The grid as a '1'/'0' string of slots the viewer can book."""
+    if clock == 'past':
+        blocked = grid.full_mask
+    elif clock == 'future':
+        blocked = 0
+    else:
+        blocked = grid.mask_before(cutoff)
+    return grid.bitstring(blocked | grid.mask_intervals(holds))
+
+
+def parse_day(request):
+    """The `date` query parameter (YYYY-MM-DD, default today), or None if invalid."""
+    try:
+        return date.fromisoformat(request.GET['date']) if request.GET.get('date') else date.today()
+    except ValueError:
+        return None
+
+
+@api_view(['GET'])
+async def availability_api(request, user, turf_id):
+    """
+    One turf-day as a '1'/'0' string of free slots plus per-slot prices, for
+    `date` (YYYY-MM-DD, default today). Supports If-None-Match.
+    """
+    day = parse_day(request)
+    if day is None:
+        return api_error("Invalid date.")
+
+    versions = await sync_to_async(availability_version)(turf_id, day)
+    if versions is None:
+        return api_error("No such turf.", status=404)
+    holds = await viewer_holds(user, turf_id, day)
+    clock, cutoff = day_clock(day)
+    fingerprint = f'{turf_id}:{day}:{versions[0]}:{versions[1]}:{clock}:{holds}'
+    etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest()[:20])
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    turf_day = await sync_to_async(cached_turf_day)(turf_id, day, versions)
+    if turf_day is None:
+        return api_error("No such turf.", status=404)
+    turf, grid = turf_day
+    response = api_json({
+        'turf': turf.id,
+        'date': day.isoformat(),
+        'open_time': turf.open_time.strftime('%H:%M') if turf.open_time else None,
+        'slot_minutes': SLOT_MINUTES,
+        'free': free_slots(grid, clock, cutoff, holds),
+        'prices': [str(price) for price in PriceTable(turf).slot_prices(day, grid)],
+    })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+# -----------------------------------------------------------------------------
+# Live Availability Stream
+# -----------------------------------------------------------------------------
+#
+# Server-sent events for one turf-day (see live.py). The stream opens with a
+# 'snapshot' of the viewer's free slots, so a page that reconnects after a drop
+# catches up, and then relays the broker's deltas with no further queries. It
+# closes after TURF_LIVE_STREAM_SECONDS; EventSource reconnects on its own.
+# Under WSGI it answers 204 No Content, which also stops EventSource retrying.
+
+LIVE_HEARTBEAT_SECONDS = 15
+
+
+def sse_event(message):
+    return f'data: {json.dumps(message, separators=(",", ":"))}\n\n'
+
+
+@api_view(['GET'])
+async def live_slots_stream(request, user, turf_id):
+    if not serves_live_streams(request):
+        return HttpResponse(status=204)
+    day = parse_day(request)
+    if day is None:
+        return api_error("Invalid date.")
+    # Subscribe before reading the snapshot, so no write can fall between the two.
+    hub = broker()
+    subscription = hub.subscribe(live_channel(turf_id, day))
+    try:
+        turf_day = await sync_to_async(cached_turf_day)(turf_id, day)
+        if turf_day is None:
+            hub.unsubscribe(subscription)
+            return api_error("No such turf.", status=404)
+        clock, cutoff = day_clock(day)
+        snapshot = free_slots(turf_day[1], clock, cutoff, await viewer_holds(user, turf_id, day))
+    except BaseException:
+        hub.unsubscribe(subscription)
+        raise
+    lifetime = getattr(settings, 'TURF_LIVE_STREAM_SECONDS', 300)
+
+    async def events():
+        deadline = time.monotonic() + lifetime
+        try:
+            yield f'retry: 3000\n{sse_event({"type": "snapshot", "free": snapshot})}'
+            while (remaining := deadline - time.monotonic()) > 0:
+                message = await subscription.get(min(remaining, LIVE_HEARTBEAT_SECONDS))
+                # A comment line keeps idle connections (and proxies) from timing out.
+                yield ': ping\n\n' if message is None else sse_event(message)
+        finally:
+            hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# -----------------------------------------------------------------------------
+# Bookings
+# -----------------------------------------------------------------------------
+
+def api_booking_json(booking):
+    return {**booking_json(booking), 'turf': booking.turf_id, 'cancellable': is_cancellable(booking)}
+
+
+@api_view(['GET', 'POST'], role=TurfUser.Role.PLAYER)
+async def bookings_api(request, user):
+    """
+    GET: the player's bookings, newest first (`status`, `from`, `to`, `cursor`).
+    POST: books `turf`, `date`, `start_time`, `end_time` (HH:MM) and `players`.
+    """
+    if request.method == 'GET':
+        history = BookingHistory(Booking.objects.filter(player=user), request.GET, page_size(request))
+        rows, next_cursor = await history.apage()
+        return api_json({'results': [api_booking_json(booking) for booking in rows], 'next_cursor': next_cursor})
+
+    data = request_data(request)
+    if data is None:
+        return api_error("Send a JSON object.")
+    try:
+        turf_id = int(data.get('turf', ''))
+        booking_date = date.fromisoformat(str(data.get('date', '')))
+        start_time = datetime.strptime(str(data.get('start_time', '')), '%H:%M').time()
+        end_time = datetime.strptime(str(data.get('end_time', '')), '%H:%M').time()
+        players = int(data.get('players', 1))
+    except (TypeError, ValueError):
+        return api_error("Invalid turf, date, time or player count.")
+    if booking_date < date.today():
+        return api_error("You cannot book a turf for a past date.")
+    try:
+        turf = await TurfVenue.objects.aget(pk=turf_id)
+    except TurfVenue.DoesNotExist:
+        return api_error("No such turf.", status=404)
+    # A turf with no_of_players unset (0) takes any team size.
+    if players < 1 or (turf.no_of_players and players > turf.no_of_players):
+        limit = f"between 1 and {turf.no_of_players}" if turf.no_of_players else "at least 1"
+        return api_error(f"Bring {limit} players.")
+    try:
+        booking = await sync_to_async(create_booking)(
+            turf, user, booking_date, start_time, end_time, no_of_players=players,
+        )
+    except BookingError as error:
+        return api_error(str(error), status=409)
+    return api_json(api_booking_json(booking), status=201)
+
+
+@api_view(['GET', 'DELETE'], role=TurfUser.Role.PLAYER)
+async def booking_api(request, user, booking_id):
+    """GET one of the player's bookings; DELETE cancels it (up to 2 hours before the start)."""
+    try:
+        booking = await Booking.objects.aget(pk=booking_id, player=user)
+    except Booking.DoesNotExist:
+        return api_error("No such booking.", status=404)
+    if request.method == 'DELETE':
+        if not is_cancellable(booking):
+            return api_error("Cancellation is not allowed within 2 hours of the start time.", status=409)
+        await sync_to_async(cancel_booking)(booking)
+    return api_json(api_booking_json(booking))
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TurfappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'TurfApp'
+
+    def ready(self):
+        from . import signals, images, waitlist  # noqa: F401
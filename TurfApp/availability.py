@@ -0,0 +1,335 @@
+import heapq
+from bisect import bisect_left
+from datetime import time
+
+# -----------------------------------------------------------------------------
+# Slot Availability Engine
+# -----------------------------------------------------------------------------
+#
+# One turf-day is a row of fixed 30-minute slots counted from the opening time.
+# A DayGrid stores that row as a single Python integer where bit k is set when
+# slot k is taken, so overlap, free-run and "N consecutive free slots" queries
+# are a handful of integer operations instead of per-slot datetime loops.
+
+SLOT_MINUTES = 30
+
+
+def to_minutes(value, round_up=False):
+    """Converts a time object into minutes since midnight."""
+    minutes = value.hour * 60 + value.minute
+    if round_up and (value.second or value.microsecond):
+        minutes += 1
+    return minutes
+
+
+def from_minutes(minutes):
+    """Converts minutes since midnight back into a time object."""
+    hours, mins = divmod(minutes, 60)
+    return time(hour=hours % 24, minute=mins)
+
+
+class DayGrid:
+    """
+    A fixed-width bitmask of the 30-minute slots in one turf-day.
+    """
+    __slots__ = ('open_minute', 'slot_count', 'full_mask', 'taken')
+
+    def __init__(self, open_time=None, close_time=None):
+        if open_time and close_time:
+            self.open_minute = to_minutes(open_time)
+            span = to_minutes(close_time, round_up=True) - self.open_minute
+            self.slot_count = max(0, -(-span // SLOT_MINUTES))
+        else:
+            self.open_minute = 0
+            self.slot_count = 0
+        self.full_mask = (1 << self.slot_count) - 1
+        self.taken = 0
+
+    @classmethod
+    def for_turf(cls, turf, bookings=()):
+        """Builds the grid for a turf's opening hours and marks the given bookings."""
+        grid = cls(turf.open_time, turf.close_time)
+        grid.mark_bookings(bookings)
+        return grid
+
+    def __len__(self):
+        return self.slot_count
+
+    # --- Index helpers ---
+
+    def span(self, start_time, end_time):
+        """Returns the (first, stop) slot indices touched by an interval, clipped to the day."""
+        start = to_minutes(start_time) - self.open_minute
+        end = to_minutes(end_time, round_up=True) - self.open_minute
+        first = max(0, start // SLOT_MINUTES)
+        stop = min(self.slot_count, -(-end // SLOT_MINUTES))
+        return first, max(first, stop)
+
+    def mask(self, start_time, end_time):
+        """Returns the bitmask of every slot that overlaps [start_time, end_time)."""
+        first, stop = self.span(start_time, end_time)
+        return ((1 << (stop - first)) - 1) << first
+
+    def slot_start(self, index):
+        return from_minutes(self.open_minute + index * SLOT_MINUTES)
+
+    def slot_end(self, index):
+        return from_minutes(self.open_minute + (index + 1) * SLOT_MINUTES)
+
+    def mask_before(self, cutoff_time):
+        """Returns the bitmask of slots that start before the given time."""
+        elapsed = to_minutes(cutoff_time, round_up=True) - self.open_minute
+        count = min(self.slot_count, max(0, -(-elapsed // SLOT_MINUTES)))
+        return (1 << count) - 1
+
+    # --- Mutation ---
+
+    def mark(self, start_time, end_time):
+        """Marks every slot overlapping the interval as taken."""
+        self.taken |= self.mask(start_time, end_time)
+
+    def mark_bookings(self, bookings):
+        for booking in bookings:
+            self.taken |= self.mask(booking.start_time, booking.end_time)
+
+    # --- Queries ---
+
+    @property
+    def free_mask(self):
+        return self.full_mask & ~self.taken
+
+    def is_taken(self, index):
+        return bool(self.taken >> index & 1)
+
+    def fits(self, start_time, end_time):
+        """Returns True if the interval is non-empty and inside opening hours."""
+        start = to_minutes(start_time) - self.open_minute
+        end = to_minutes(end_time, round_up=True) - self.open_minute
+        return 0 <= start < end <= self.slot_count * SLOT_MINUTES
+
+    def overlaps(self, start_time, end_time):
+        """Returns True if any slot touched by the interval is already taken."""
+        return bool(self.taken & self.mask(start_time, end_time))
+
+    def is_free(self, start_time, end_time):
+        """Returns True if the interval fits the day and touches no taken slot."""
+        return self.fits(start_time, end_time) and not self.overlaps(start_time, end_time)
+
+    def free_runs(self, blocked=0):
+        """Returns (first_index, length) for every maximal run of free slots."""
+        free = self.free_mask & ~blocked
+        runs = []
+        while free:
+            first = (free & -free).bit_length() - 1
+            shifted = free >> first
+            length = (shifted ^ (shifted + 1)).bit_length() - 1
+            runs.append((first, length))
+            free &= ~(((1 << length) - 1) << first)
+        return runs
+
+    def first_free_run(self, count, blocked=0):
+        """
+        Returns the index of the first slot that starts `count` consecutive free slots,
+        or None if the day has no such run.
+        """
+        if count <= 0 or count > self.slot_count:
+            return None
+        run = self.free_mask & ~blocked
+        width = 1
+        # Doubling: after each step bit i is set iff slots i..i+width-1 are all free.
+        while width < count and run:
+            step = min(width, count - width)
+            run &= run >> step
+            width += step
+        if not run:
+            return None
+        return (run & -run).bit_length() - 1
+
+    def bitstring(self, blocked=0):
+        """Returns the free slots as a '1'/'0' string, slot 0 first."""
+        if not self.slot_count:
+            return ''
+        free = self.free_mask & ~blocked
+        return format(free, '0{}b'.format(self.slot_count))[::-1]
+
+    def slots(self, blocked=0, held=0):
+        """Returns the template rows for a player-facing slot picker; `held` marks other players' holds."""
+        unavailable = self.taken | blocked | held
+        rows = []
+        for index in range(self.slot_count):
+            rows.append({
+                'start_time': self.slot_start(index),
+                'end_time': self.slot_end(index),
+                'is_available': not unavailable >> index & 1,
+                'is_held': bool(held >> index & 1),
+            })
+        return rows
+
+    def mask_intervals(self, intervals):
+        """Returns the bitmask of every slot overlapping any (start_time, end_time) pair."""
+        mask = 0
+        for start_time, end_time in intervals:
+            mask |= self.mask(start_time, end_time)
+        return mask
+
+    def owners(self, bookings):
+        """Maps each slot index to the earliest booking overlapping it (or None)."""
+        index = IntervalIndex.from_bookings(bookings)
+        return [index.first_overlapping(self.slot_start(k), self.slot_end(k)) for k in range(self.slot_count)]
+
+
+# -----------------------------------------------------------------------------
+# Interval Index
+# -----------------------------------------------------------------------------
+#
+# The DayGrid answers slot-granular questions; booking validation needs exact
+# ones, since bookings may start and end off the 30-minute grid. IntervalIndex
+# keeps a turf-day's intervals sorted by start and treats that array as an
+# implicit balanced tree: the node in the middle of every range stores the
+# largest and smallest end times in the range, so an overlap query skips any
+# range that ends before it and a containment query any range that ends after it.
+
+def to_seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class IntervalIndex:
+    """
+    A static interval tree over half-open [start, end) intervals, compared to the
+    second. "Any overlap?" is O(log n) and listing k hits is O(log n + k).
+    """
+    __slots__ = ('starts', 'ends', 'items', 'max_end', 'min_end')
+
+    def __init__(self, intervals=()):
+        rows = sorted(
+            ((to_seconds(start), to_seconds(end), item) for start, end, item in intervals if start < end),
+            key=lambda row: (row[0], row[1]),
+        )
+        self.starts = [row[0] for row in rows]
+        self.ends = [row[1] for row in rows]
+        self.items = [row[2] for row in rows]
+        self.max_end = [0] * len(rows)
+        self.min_end = [0] * len(rows)
+        self._build(0, len(rows))
+
+    @classmethod
+    def from_bookings(cls, bookings):
+        return cls((booking.start_time, booking.end_time, booking) for booking in bookings)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self, lo, hi):
+        """Fills in the end bounds of the subtree over [lo, hi) and returns them as (max, min)."""
+        if lo >= hi:
+            return -1, float('inf')
+        mid = (lo + hi) // 2
+        left, right = self._build(lo, mid), self._build(mid + 1, hi)
+        self.max_end[mid] = max(self.ends[mid], left[0], right[0])
+        self.min_end[mid] = min(self.ends[mid], left[1], right[1])
+        return self.max_end[mid], self.min_end[mid]
+
+    def _collect(self, lo, hi, start, end, hits, limit):
+        """Appends, in start order, the positions in [lo, hi) overlapping [start, end)."""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.max_end[mid] <= start:
+                return
+            self._collect(lo, mid, start, end, hits, limit)
+            if self.starts[mid] >= end or (limit and len(hits) >= limit):
+                return
+            if self.ends[mid] > start:
+                hits.append(mid)
+            lo = mid + 1
+
+    def _collect_within(self, lo, hi, first, stop, end, hits):
+        """Appends, in start order, the positions in [lo, hi) and [first, stop) that end by `end`."""
+        while lo < hi and lo < stop and hi > first:
+            mid = (lo + hi) // 2
+            if self.min_end[mid] > end:
+                return
+            self._collect_within(lo, mid, first, stop, end, hits)
+            if mid >= stop:
+                return
+            if mid >= first and self.ends[mid] <= end:
+                hits.append(mid)
+            lo = mid + 1
+
+    def _query(self, start, end, limit=0):
+        hits = []
+        self._collect(0, len(self.items), start, end, hits, limit)
+        return hits[:limit] if limit else hits
+
+    # --- Queries ---
+
+    def overlapping(self, start_time, end_time):
+        """Returns the items overlapping [start_time, end_time), earliest first."""
+        return [self.items[i] for i in self._query(to_seconds(start_time), to_seconds(end_time))]
+
+    def first_overlapping(self, start_time, end_time):
+        hits = self._query(to_seconds(start_time), to_seconds(end_time), limit=1)
+        return self.items[hits[0]] if hits else None
+
+    def overlaps(self, start_time, end_time):
+        return bool(self._query(to_seconds(start_time), to_seconds(end_time), limit=1))
+
+    def containing(self, start_time, end_time):
+        """Returns the items that cover all of [start_time, end_time)."""
+        start, end = to_seconds(start_time), to_seconds(end_time)
+        return [self.items[i] for i in self._query(start, end) if self.starts[i] <= start and self.ends[i] >= end]
+
+    def within(self, start_time, end_time):
+        """
+        Returns the items lying entirely inside [start_time, end_time), earliest
+        first. Only items starting inside the range are looked at, and of those
+        only subtrees holding one that also ends inside it.
+        """
+        start = to_seconds(start_time)
+        end = to_seconds(end_time) or 24 * 3600  # An end of 00:00 is midnight.
+        hits = []
+        self._collect_within(
+            0, len(self.items), bisect_left(self.starts, start), bisect_left(self.starts, end), end, hits,
+        )
+        return [self.items[i] for i in hits]
+
+    def covering(self, moment):
+        """Returns the items in progress at the given time."""
+        second = to_seconds(moment)
+        return [self.items[i] for i in self._query(second, second + 1)]
+
+    def lanes(self):
+        """
+        Packs the intervals into the fewest lanes without overlaps, reusing the
+        lane that frees up earliest. Returns the lanes, each ordered by start.
+        """
+        lanes = []
+        free_at = []  # heap of (end, lane index)
+        for start, end, item in zip(self.starts, self.ends, self.items, strict=True):
+            if free_at and free_at[0][0] <= start:
+                _, lane = heapq.heapreplace(free_at, (end, free_at[0][1]))
+                lanes[lane].append(item)
+            else:
+                heapq.heappush(free_at, (end, len(lanes)))
+                lanes.append([item])
+        return lanes
+
+
+def pack_into_lanes(bookings):
+    """Packs bookings into the fewest non-overlapping sub-lanes for the owner timeline."""
+    return IntervalIndex.from_bookings(bookings).lanes()
+
+
+def build_day_grids(turfs, days, bookings):
+    """
+    Builds one DayGrid per (turf_id, day) from a flat iterable of
+    (turf_id, date, start_time, end_time) rows fetched in a single query.
+    """
+    grids = {}
+    for turf in turfs:
+        for day in days:
+            grids[turf.id, day] = DayGrid(turf.open_time, turf.close_time)
+    for turf_id, day, start_time, end_time in bookings:
+        grid = grids.get((turf_id, day))
+        if grid is not None:
+            grid.mark(start_time, end_time)
+    return grids
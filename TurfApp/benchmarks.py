@@ -0,0 +1,229 @@
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from .models import TurfUser, TurfVenue, Booking
+from .synthetic import CITIES, SPORTS
+
+# -----------------------------------------------------------------------------
+# Benchmark Suite
+# -----------------------------------------------------------------------------
+#
+# Drives the hot pages with concurrent in-process clients against whatever
+# database is configured (normally one filled by generate_synthetic_data) and
+# reports latency percentiles and throughput per scenario. Requests are picked
+# from a seeded random stream, so two runs against the same data issue the same
+# requests and their JSON reports can be compared between commits.
+
+PERCENTILES = (50, 95, 99)
+
+# Scenarios that write; they only run when asked for explicitly.
+WRITE_SCENARIOS = ('checkout',)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkSuite:
+    """
+    Runs each scenario for `requests` requests spread over `concurrency` worker
+    threads, after `warmup` unmeasured requests. Every worker thread keeps its own
+    logged-in clients and database connection; logging in is not timed.
+    """
+    def __init__(self, requests=200, concurrency=8, warmup=20, seed=42, sample_size=200):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.warmup = warmup
+        self.seed = seed
+        self.sample_size = sample_size
+        self._local = threading.local()
+        self._load_samples()
+
+    def _load_samples(self):
+        players = list(Booking.objects.filter(player__role=TurfUser.Role.PLAYER).order_by('player_id')
+                       .values_list('player_id', flat=True).distinct()[:self.sample_size])
+        owners = list(TurfVenue.objects.order_by('owner_id').values_list('owner_id', flat=True).distinct()[:self.sample_size])
+        if not players or not owners:
+            raise ValueError("No data to benchmark; run generate_synthetic_data first.")
+        self.players = TurfUser.objects.in_bulk(players)
+        self.owners = TurfUser.objects.in_bulk(owners)
+        self.owner_turfs = {}
+        for turf_id, owner_id in TurfVenue.objects.filter(owner_id__in=owners).values_list('id', 'owner_id'):
+            self.owner_turfs.setdefault(owner_id, []).append(turf_id)
+        self.player_ids = sorted(self.players)
+        self.owner_ids = sorted(self.owner_turfs)
+        self.turf_ids = sorted(turf_id for turfs in self.owner_turfs.values() for turf_id in turfs)
+
+    # --- Scenarios ---
+    # Each returns (role, user id, method, url, data) for the n-th request.
+
+    def _day(self, rng):
+        return (date.today() + timedelta(days=rng.randint(0, 13))).isoformat()
+
+    def booking_page(self, rng):
+        url = reverse('booking_page', kwargs={'turf_id': rng.choice(self.turf_ids)})
+        return 'player', rng.choice(self.player_ids), 'get', f'{url}?date={self._day(rng)}', None
+
+    def manage_slots(self, rng):
+        owner_id = rng.choice(self.owner_ids)
+        url = reverse('manage_slots', kwargs={'turf_id': rng.choice(self.owner_turfs[owner_id])})
+        return 'owner', owner_id, 'get', f'{url}?date={self._day(rng)}', None
+
+    def owner_dashboard(self, rng):
+        return 'owner', rng.choice(self.owner_ids), 'get', reverse('owner_view'), None
+
+    def my_bookings(self, rng):
+        return 'player', rng.choice(self.player_ids), 'get', reverse('my_bookings'), None
+
+    def search(self, rng):
+        params = rng.choice([
+            f'q={rng.choice(CITIES)}',
+            f'sport={rng.choice(SPORTS)}&sort=rating',
+            f'sport={rng.choice(SPORTS)}&location={rng.choice(CITIES)}&sort=price',
+            f'date={self._day(rng)}&time=evening',
+        ])
+        return 'player', rng.choice(self.player_ids), 'get', f"{reverse('home_turf_view')}?{params}", None
+
+    def search_api(self, rng):
+        query = rng.choice(CITIES + SPORTS)[:rng.randint(3, 6)]
+        return 'player', rng.choice(self.player_ids), 'get', f"{reverse('turf_search_api')}?q={query}", None
+
+    def checkout(self, rng):
+        turf_id = rng.choice(self.turf_ids)
+        start = rng.randrange(8, 20)
+        data = {
+            'booking_date': self._day(rng), 'start_time': f'{start:02d}:00',
+            'end_time': f'{start + 1:02d}:00', 'no_of_players': 10,
+        }
+        url = reverse('booking_page', kwargs={'turf_id': turf_id})
+        return 'player', rng.choice(self.player_ids), 'post', url, data
+
+    SCENARIOS = ('booking_page', 'manage_slots', 'owner_dashboard', 'my_bookings', 'search', 'search_api', 'checkout')
+
+    # --- Runner ---
+
+    def _client(self, user_id, users):
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        if user_id not in clients:
+            # The test client's default 'testserver' host is not in ALLOWED_HOSTS.
+            hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')]
+            client = Client(HTTP_HOST=hosts[0].lstrip('.') if hosts else 'localhost')
+            client.force_login(users[user_id])
+            clients[user_id] = client
+        return clients[user_id]
+
+    def _send(self, request):
+        role, user_id, method, url, data = request
+        client = self._client(user_id, self.players if role == 'player' else self.owners)
+        started = time.perf_counter()
+        response = getattr(client, method)(url, data) if data else getattr(client, method)(url)
+        elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, response.status_code < 400
+
+    def _run_slice(self, requests):
+        try:
+            return [self._send(request) for request in requests]
+        finally:
+            connections.close_all()
+
+    def _run_concurrently(self, requests):
+        slices = [requests[worker::self.concurrency] for worker in range(self.concurrency)]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return [result for chunk in pool.map(self._run_slice, slices) for result in chunk]
+
+    def run_scenario(self, name):
+        rng = random.Random(f'{self.seed}:{name}')
+        build = getattr(self, name)
+        requests = [build(rng) for _ in range(self.warmup + self.requests)]
+
+        self._run_concurrently(requests[:self.warmup])
+        started = time.perf_counter()
+        results = self._run_concurrently(requests[self.warmup:])
+        wall = time.perf_counter() - started
+
+        latencies = sorted(elapsed for elapsed, _ in results)
+        report = {
+            'requests': len(results),
+            'errors': sum(1 for _, ok in results if not ok),
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'throughput_rps': round(len(results) / wall, 2) if wall else None,
+        }
+        for pct in PERCENTILES:
+            value = percentile(latencies, pct)
+            report[f'p{pct}_ms'] = round(value, 2) if value is not None else None
+        return report
+
+    def run(self, scenarios=None, stdout=None):
+        scenarios = scenarios or [name for name in self.SCENARIOS if name not in WRITE_SCENARIOS]
+        results = {}
+        for name in scenarios:
+            results[name] = self.run_scenario(name)
+            if stdout:
+                row = results[name]
+                stdout.write(
+                    f"{name:16} p50 {row['p50_ms']:>8} ms  p95 {row['p95_ms']:>8} ms  "
+                    f"p99 {row['p99_ms']:>8} ms  {row['throughput_rps']:>8} req/s  errors {row['errors']}"
+                )
+        return {
+            'meta': {
+                'commit': current_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'requests': self.requests,
+                'concurrency': self.concurrency,
+                'warmup': self.warmup,
+                'seed': self.seed,
+                'dataset': {
+                    'users': TurfUser.objects.count(),
+                    'turfs': TurfVenue.objects.count(),
+                    'bookings': Booking.objects.count(),
+                },
+            },
+            'scenarios': results,
+        }
+
+
+def compare_reports(baseline, current):
+    """Returns {scenario: {metric: percent change}} for scenarios in both reports."""
+    changes = {}
+    for name, row in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        changes[name] = {
+            metric: round((row[metric] - before[metric]) * 100 / before[metric], 1)
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')
+            if row.get(metric) is not None and before.get(metric)
+        }
+    return changes
+
+
+def write_report(report, path):
+    with open(path, 'w') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
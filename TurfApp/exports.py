@@ -0,0 +1,169 @@
+import csv
+import io
+from .models import Booking, Transaction
+
+# -----------------------------------------------------------------------------
+# Owner Exports
+# -----------------------------------------------------------------------------
+#
+# Streams an owner's bookings or transactions, joined with turf and player, as
+# CSV or Parquet. Rows come from values_list(...).iterator(), so only one chunk
+# is ever in memory, and each encoded chunk is yielded straight to the response
+# (or file). Parquet needs the optional pyarrow package; every chunk becomes one
+# row group.
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column, queryset field, arrow type) per export kind.
+EXPORT_COLUMNS = {
+    'bookings': [
+        ('booking_id', 'id', 'int64'),
+        ('turf_id', 'turf_id', 'int64'),
+        ('turf', 'turf__name', 'string'),
+        ('location', 'turf__location', 'string'),
+        ('player', 'player__name', 'string'),
+        ('player_email', 'player__email', 'string'),
+        ('date', 'date', 'date'),
+        ('start_time', 'start_time', 'time'),
+        ('end_time', 'end_time', 'time'),
+        ('players', 'no_of_players', 'int64'),
+        ('status', 'status', 'string'),
+        ('total_price', 'total_price', 'money'),
+        ('booked_at', 'booked_at', 'timestamp'),
+    ],
+    'transactions': [
+        ('transaction_id', 'id', 'int64'),
+        ('booking_id', 'booking_id', 'int64'),
+        ('turf', 'booking__turf__name', 'string'),
+        ('player', 'booking__player__name', 'string'),
+        ('booking_date', 'booking__date', 'date'),
+        ('amount', 'amount', 'money'),
+        ('status', 'status', 'string'),
+        ('created_at', 'created_at', 'timestamp'),
+    ],
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(Exception):
+    """Raised for an unknown export kind or format, or a missing optional dependency."""
+
+
+def export_queryset(kind, owner=None, start=None, end=None, turf_id=None):
+    """Returns the ordered values_list for an export, limited to an owner, turf and date range."""
+    if kind not in EXPORT_COLUMNS:
+        raise ExportError(f"Unknown export '{kind}'. Choose bookings or transactions.")
+    if kind == 'bookings':
+        rows, prefix = Booking.objects.all(), ''
+    else:
+        rows, prefix = Transaction.objects.all(), 'booking__'
+    filters = {}
+    if owner is not None:
+        filters[f'{prefix}turf__owner'] = owner
+    if turf_id is not None:
+        filters[f'{prefix}turf_id'] = turf_id
+    if start:
+        filters[f'{prefix}date__gte'] = start
+    if end:
+        filters[f'{prefix}date__lte'] = end
+    fields = [field for _, field, _ in EXPORT_COLUMNS[kind]]
+    return rows.filter(**filters).order_by(f'{prefix}date', 'id').values_list(*fields)
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_csv(kind, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the CSV text chunk by chunk, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _, _ in EXPORT_COLUMNS[kind]])
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _Drain:
+    """A write-only file that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _arrow_schema(kind):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ExportError("Parquet export needs the pyarrow package; use CSV instead.")
+    types = {
+        'int64': pa.int64(), 'string': pa.string(), 'date': pa.date32(), 'time': pa.time64('us'),
+        'money': pa.decimal128(12, 2), 'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    return pa.schema([(column, types[kind_name]) for column, _, kind_name in EXPORT_COLUMNS[kind]])
+
+
+def stream_parquet(kind, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields a Parquet file in pieces, one row group per chunk."""
+    schema = _arrow_schema(kind)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    drain = _Drain()
+    writer = pq.ParquetWriter(pa.PythonFile(drain, mode='w'), schema)
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            columns = list(zip(*chunk, strict=True))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema, strict=True)], schema=schema,
+            ))
+            yield drain.take()
+    finally:
+        writer.close()
+    yield drain.take()
+
+
+def stream_export(kind, export_format, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Returns the chunk generator for a format; raises ExportError up front if it is unavailable."""
+    if export_format == 'csv':
+        return stream_csv(kind, rows, chunk_size)
+    if export_format == 'parquet':
+        _arrow_schema(kind)
+        return stream_parquet(kind, rows, chunk_size)
+    raise ExportError(f"Unknown format '{export_format}'. Choose csv or parquet.")
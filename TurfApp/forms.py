@@ -1,8 +1,21 @@
 from django import forms
 from .models import TurfUser, TurfVenue, Amenity
+from .images import IMAGE_FIELDS, queue_image_variants
 from django.contrib.auth.forms import PasswordChangeForm as AuthPasswordChangeForm
 
-class UpdateProfileForm(forms.ModelForm):
+class ImageVariantsMixin:
+    """
+    Queues resized copies of the model's image once a new upload is saved. Hooks
+    _save_m2m, which runs after the instance is saved on both save() and
+    save(commit=False) followed by save_m2m().
+    """
+    def _save_m2m(self):
+        super()._save_m2m()
+        field = IMAGE_FIELDS[type(self.instance).__name__][0]
+        if field in self.changed_data:
+            queue_image_variants(self.instance)
+
+class UpdateProfileForm(ImageVariantsMixin, forms.ModelForm):
     """
     A form for the owner to update their profile information.
     """
@@ -26,7 +39,7 @@ class PasswordChangeForm(AuthPasswordChangeForm):
         self.fields['new_password1'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Enter new password'})
         self.fields['new_password2'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Confirm new password'})
 
-class TurfVenueForm(forms.ModelForm):
+class TurfVenueForm(ImageVariantsMixin, forms.ModelForm):
     """
     A comprehensive form for creating and updating TurfVenue instances.
     """
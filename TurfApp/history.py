@@ -0,0 +1,91 @@
+from datetime import date, time
+from django.db.models import Q
+from .models import Booking
+from .search import decode_cursor, encode_cursor
+
+# -----------------------------------------------------------------------------
+# Booking History Pages
+# -----------------------------------------------------------------------------
+#
+# A player's or a turf's booking history, newest first, paged with a keyset
+# cursor on (date, start_time, id) instead of OFFSET. Every page seeks the
+# (player | turf, -date, -start_time) index to the cursor and reads one page of
+# rows, so page 500 costs the same as page 1.
+
+HISTORY_PAGE_SIZE = 20
+
+BOOKING_STATUSES = [value for value, _ in Booking.STATUS_CHOICES]
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _decode(cursor):
+    decoded = decode_cursor(cursor) if cursor else None
+    if decoded is None:
+        return None
+    value, pk = decoded
+    # A tampered cursor can carry any JSON value; treat it like no cursor.
+    if not isinstance(value, str):
+        return None
+    try:
+        day, start = value.split(' ')
+        return date.fromisoformat(day), time.fromisoformat(start), pk
+    except ValueError:
+        return None
+
+
+class BookingHistory:
+    """
+    Parses `status`, `from`, `to` (YYYY-MM-DD, inclusive) and `cursor` from a
+    QueryDict and returns one page of an already scoped Booking queryset.
+    """
+    def __init__(self, bookings, params, page_size=HISTORY_PAGE_SIZE):
+        self.bookings = bookings
+        self.page_size = page_size
+        status = params.get('status')
+        self.status = status if status in BOOKING_STATUSES else None
+        self.start = _parse_date(params.get('from'))
+        self.end = _parse_date(params.get('to'))
+        self.cursor = _decode(params.get('cursor'))
+
+    def queryset(self):
+        bookings = self.bookings
+        if self.status:
+            bookings = bookings.filter(status=self.status)
+        if self.start:
+            bookings = bookings.filter(date__gte=self.start)
+        if self.end:
+            bookings = bookings.filter(date__lte=self.end)
+        return bookings.order_by('-date', '-start_time', '-id')
+
+    def after_cursor(self):
+        """The filtered queryset, restricted to rows after the cursor (if any)."""
+        bookings = self.queryset()
+        if not self.cursor:
+            return bookings
+        day, start, pk = self.cursor
+        # The plain date__lte bound lets the index seek straight to the cursor.
+        return bookings.filter(
+            Q(date__lt=day) | Q(date=day, start_time__lt=start) | Q(date=day, start_time=start, id__lt=pk),
+            date__lte=day,
+        )
+
+    def page(self):
+        """Returns (bookings, next_cursor); next_cursor is None on the last page."""
+        return self._paginate(list(self.after_cursor()[:self.page_size + 1]))
+
+    async def apage(self):
+        """page() for async views, fetched with the async ORM."""
+        return self._paginate([booking async for booking in self.after_cursor()[:self.page_size + 1]])
+
+    def _paginate(self, rows):
+        if len(rows) <= self.page_size:
+            return rows, None
+        rows = rows[:self.page_size]
+        last = rows[-1]
+        return rows, encode_cursor(f'{last.date.isoformat()} {last.start_time.isoformat()}', last.id)
@@ -0,0 +1,110 @@
+import hashlib
+import io
+import posixpath
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from PIL import Image, ImageOps
+from .jobs import enqueue, job, new_job
+
+# -----------------------------------------------------------------------------
+# Image Variants
+# -----------------------------------------------------------------------------
+#
+# Uploaded turf photos and profile pictures are served as resized WebP and JPEG
+# copies instead of the original file. Saving a form with a new image enqueues
+# a process_image job; the worker decodes the upload once, applies its EXIF
+# orientation, drops all metadata and writes one file per width and format
+# under a name derived from the source bytes, so unchanged uploads are never
+# re-encoded and the files can be cached forever. The result is stored on the
+# row as {'source': name, 'webp': [[width, name], ...], 'jpeg': [...]}.
+#
+# `manage.py process_images` backfills existing media, optionally with a pool
+# of processes.
+
+# model label -> (image field, variants field, widths)
+IMAGE_FIELDS = {
+    'TurfVenue': ('image', 'image_variants', (320, 640, 1280)),
+    'TurfUser': ('profile_picture', 'profile_picture_variants', (64, 128, 256)),
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _flatten(image):
+    """Applies the EXIF orientation and returns an RGB copy with no metadata."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    else:
+        image = image.convert('RGB')
+    image.info = {}
+    return image
+
+
+def build_variants(source_name, widths):
+    """
+    Writes the resized copies of one stored image and returns its variants
+    dict. Widths wider than the source are replaced by the source width.
+    Touches storage only, never the database, so it can run in a child process.
+    """
+    with default_storage.open(source_name, 'rb') as handle:
+        data = handle.read()
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    with Image.open(io.BytesIO(data)) as original:
+        image = _flatten(original)
+
+    folder = posixpath.join(posixpath.dirname(source_name), 'variants')
+    variants = {'source': source_name}
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for key, (pil_format, options) in VARIANT_FORMATS.items():
+            name = posixpath.join(folder, f'{digest}-{width}w.{key}')
+            if not default_storage.exists(name):
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                # Storage may rename on a clash; keep whatever name it returns.
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants.setdefault(key, []).append([width, name])
+    return variants
+
+
+def needs_variants(name, variants):
+    return bool(name) and (variants or {}).get('source') != name
+
+
+def store_variants(model, pk, source_name, variants):
+    """Saves a variants dict, unless the image was replaced while it was being built."""
+    field, variants_field, _ = IMAGE_FIELDS[model.__name__]
+    changes = {variants_field: variants}
+    if model.__name__ == 'TurfVenue':
+        # Cached turf-days hold the turf instance, so let them go stale.
+        changes['version'] = F('version') + 1
+    return model.objects.filter(pk=pk, **{field: source_name}).update(**changes)
+
+
+def queue_image_variants(instance):
+    """Enqueues a process_image job for a saved instance whose image needs variants."""
+    model = type(instance)
+    field, variants_field, _ = IMAGE_FIELDS[model.__name__]
+    name = getattr(instance, field).name
+    if needs_variants(name, getattr(instance, variants_field)):
+        enqueue(new_job('process_image', key=f'image:{model.__name__}:{instance.pk}', model=model.__name__, pk=instance.pk))
+
+
+@job('process_image')
+def process_image(model, pk):
+    model = apps.get_model('TurfApp', model)
+    field, variants_field, widths = IMAGE_FIELDS[model.__name__]
+    row = model.objects.filter(pk=pk).values_list(field, variants_field).first()
+    if row is None or not needs_variants(*row):
+        return
+    store_variants(model, pk, row[0], build_variants(row[0], widths))
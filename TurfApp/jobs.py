@@ -0,0 +1,272 @@
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Booking, Job, Rating, SlotHold, Transaction
+from .stats import refresh_day_stats
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Background Job Queue
+# -----------------------------------------------------------------------------
+#
+# A durable queue in the Job table. Jobs are inserted inside the transaction of
+# the change that caused them, so they commit or roll back with it, and one
+# INSERT is all a request pays. `manage.py run_jobs` claims due jobs with a
+# conditional UPDATE (safe with several workers), runs each in its own
+# transaction and retries failures with exponential backoff. A job whose worker
+# died is reclaimed once its lease runs out.
+#
+# An idempotency key makes enqueueing a no-op while a job with the same key is
+# still queued, which also coalesces bursts of identical work (such as several
+# stats refreshes for one turf-day).
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+# A Running job not finished within this long is assumed lost and claimed again.
+LEASE_SECONDS = 5 * 60
+
+JOB_HANDLERS = {}
+
+
+def job(name):
+    """Registers a function as the handler for jobs called `name`."""
+    def register(func):
+        JOB_HANDLERS[name] = func
+        return func
+    return register
+
+
+def new_job(name, key=None, delay=None, max_attempts=DEFAULT_MAX_ATTEMPTS, **payload):
+    """Builds an unsaved Job; pass it to enqueue(). The payload must be JSON-serializable."""
+    return Job(
+        name=name, payload=payload, idempotency_key=key, max_attempts=max_attempts,
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def enqueue(*jobs):
+    """
+    Inserts jobs with a single INSERT, skipping any whose key is already queued.
+    With settings.TURF_JOBS_EAGER the jobs are also run once the current
+    transaction commits, so development servers work without a worker.
+    """
+    if not getattr(settings, 'TURF_JOBS_EAGER', False):
+        Job.objects.bulk_create(jobs, ignore_conflicts=True)
+        return
+    # Ignoring conflicts hides the new ids, so unkeyed jobs (which never
+    # conflict) are inserted on their own and keyed ones are found by key.
+    keyed = [job for job in jobs if job.idempotency_key]
+    unkeyed = [job for job in jobs if not job.idempotency_key]
+    Job.objects.bulk_create(keyed, ignore_conflicts=True)
+    Job.objects.bulk_create(unkeyed)
+
+    # One batch per transaction. A batch that already ran, or was dropped by a
+    # rollback (so is no longer among the connection's callbacks), is not reused.
+    connection = transaction.get_connection()
+    batch = getattr(connection, 'turf_job_batch', None)
+    registered = (batch is not None and not batch.ran
+                  and any(callback is batch for _, callback, _ in connection.run_on_commit))
+    if not registered:
+        batch = connection.turf_job_batch = EagerBatch()
+    batch.add(keyed, unkeyed)
+    if not registered:
+        # Outside a transaction this runs the batch right away.
+        transaction.on_commit(batch)
+
+
+class EagerBatch:
+    """The jobs one transaction enqueued, run together once it commits."""
+
+    def __init__(self):
+        self.keys = set()
+        self.ids = set()
+        self.ran = False
+
+    def add(self, keyed, unkeyed):
+        self.keys.update(job.idempotency_key for job in keyed)
+        self.ids.update(job.pk for job in unkeyed)
+
+    def __call__(self):
+        self.ran = True
+        run_pending(only=Q(idempotency_key__in=self.keys) | Q(id__in=self.ids))
+
+
+def backoff(attempts):
+    """Delay before the next try after `attempts` failed ones, with some jitter."""
+    seconds = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim_jobs(worker, limit=100, only=None):
+    """
+    Marks up to `limit` due jobs as Running for this worker and returns them.
+    `only` (a Q) restricts the claim to some jobs.
+    """
+    now = timezone.now()
+    due = Q(status='Queued', run_at__lte=now) | Q(status='Running', locked_at__lt=now - timedelta(seconds=LEASE_SECONDS))
+    if only is not None:
+        due &= only
+    ids = list(Job.objects.filter(due).order_by('run_at').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    # Repeating the condition makes the claim safe against other workers.
+    Job.objects.filter(due, id__in=ids).update(
+        status='Running', locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+    )
+    return list(Job.objects.filter(id__in=ids, status='Running', locked_by=worker, locked_at=now).order_by('run_at'))
+
+
+def run_job(job):
+    """Runs one claimed job and records the outcome. Returns True on success."""
+    try:
+        handler = JOB_HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f"No handler is registered for job '{job.name}'.")
+        with transaction.atomic():
+            handler(**job.payload)
+    except Exception as exc:
+        logger.exception("Job %s #%s failed (attempt %d of %d)", job.name, job.id, job.attempts, job.max_attempts)
+        _record_failure(job, f'{type(exc).__name__}: {exc}')
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status='Done', finished_at=timezone.now(), last_error='',
+    )
+    return True
+
+
+def _record_failure(job, error):
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    if job.attempts >= job.max_attempts:
+        mine.update(status='Failed', finished_at=timezone.now(), last_error=error)
+        return
+    try:
+        with transaction.atomic():
+            mine.update(status='Queued', run_at=timezone.now() + backoff(job.attempts), locked_by='', last_error=error)
+    except IntegrityError:
+        # A newer job with the same key is queued and will do the same work.
+        mine.update(status='Done', finished_at=timezone.now(), last_error=f'{error} (superseded)')
+
+
+def run_pending(worker=None, batch_size=100, only=None):
+    """Runs every due job (or those matching `only`), batch by batch. Returns (succeeded, failed)."""
+    worker = worker or worker_name()
+    succeeded = failed = 0
+    while True:
+        jobs = claim_jobs(worker, batch_size, only)
+        if not jobs:
+            return succeeded, failed
+        for claimed in jobs:
+            if run_job(claimed):
+                succeeded += 1
+            else:
+                failed += 1
+
+
+def purge_finished_jobs(older_than=timedelta(days=7)):
+    """Deletes Done jobs finished before the cutoff; Failed jobs are kept for inspection."""
+    return Job.objects.filter(status='Done', finished_at__lt=timezone.now() - older_than).delete()[0]
+
+# -----------------------------------------------------------------------------
+# Job Handlers
+# -----------------------------------------------------------------------------
+#
+# Handlers must be safe to run twice: a worker can die after the work but before
+# the job is marked Done.
+
+def _send(recipient, subject, lines):
+    if recipient and recipient.email:
+        send_mail(subject, '\n'.join(lines), None, [recipient.email])
+
+
+def _booking_lines(booking):
+    return [
+        f"Turf: {booking.turf.name}, {booking.turf.location}",
+        f"Date: {booking.date:%d %b %Y}",
+        f"Time: {booking.start_time:%I:%M %p} - {booking.end_time:%I:%M %p}",
+        f"Amount: Rs. {booking.total_price}",
+    ]
+
+
+@job('refresh_day_stats')
+def refresh_day_stats_job(turf_id, day):
+    refresh_day_stats(turf_id, date.fromisoformat(day))
+
+
+@job('record_payment')
+def record_payment(booking_id):
+    booking = Booking.objects.filter(pk=booking_id).first()
+    if booking is None or booking.transactions.exists():
+        return
+    Transaction.objects.create(booking=booking, amount=booking.total_price, status='Completed')
+
+
+@job('send_booking_receipt')
+def send_booking_receipt(booking_id):
+    booking = Booking.objects.select_related('turf', 'player').filter(pk=booking_id).first()
+    if booking is None:
+        return
+    _send(booking.player, f"Booking #{booking.id} confirmed", [
+        f"Hi {booking.player.name},", "", "Your booking is confirmed.", "",
+        *_booking_lines(booking),
+    ])
+
+
+@job('send_cancellation_notice')
+def send_cancellation_notice(booking_id):
+    booking = Booking.objects.select_related('turf', 'player').filter(pk=booking_id).first()
+    if booking is None:
+        return
+    _send(booking.player, f"Booking #{booking.id} cancelled", [
+        f"Hi {booking.player.name},", "", "Your booking has been cancelled.", "",
+        *_booking_lines(booking),
+    ])
+
+
+@job('send_waitlist_offer')
+def send_waitlist_offer(hold_token):
+    hold = SlotHold.objects.select_related('turf', 'player').filter(
+        token=hold_token, expires_at__gt=timezone.now(),
+    ).first()
+    if hold is None:
+        return
+    _send(hold.player, f"{hold.turf.name}: your waitlisted slot is free", [
+        f"Hi {hold.player.name},", "",
+        f"The time you were waiting for is free and held for you until {timezone.localtime(hold.expires_at):%I:%M %p}.",
+        "Open the turf's booking page to book it before then.", "",
+        f"Turf: {hold.turf.name}, {hold.turf.location}",
+        f"Date: {hold.date:%d %b %Y}",
+        f"Time: {hold.start_time:%I:%M %p} - {hold.end_time:%I:%M %p}",
+    ])
+
+
+@job('notify_owner')
+def notify_owner(booking_id, event):
+    booking = Booking.objects.select_related('turf__owner', 'player').filter(pk=booking_id).first()
+    if booking is None:
+        return
+    player = booking.player.name if booking.player else 'A player'
+    if event == 'rated':
+        rating = Rating.objects.filter(booking=booking).first()
+        if rating is None:
+            return
+        summary = f"{player} rated {booking.turf.name} {rating.score}/5."
+    elif event == 'cancelled':
+        summary = f"{player} cancelled their booking at {booking.turf.name}."
+    else:
+        summary = f"{player} booked {booking.turf.name}."
+    _send(booking.turf.owner, f"{booking.turf.name}: booking #{booking.id} {event}", [summary, "", *_booking_lines(booking)])
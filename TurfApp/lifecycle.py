@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Min
+from django.utils import timezone
+from .models import Booking, TurfDayLock, Watermark
+
+# -----------------------------------------------------------------------------
+# Booking Lifecycle
+# -----------------------------------------------------------------------------
+#
+# Confirmed bookings become Completed once they have ended, so pages can filter
+# and badge on the indexed status column instead of comparing datetimes per row.
+# Past days are swept with one UPDATE per batch of days, each in its own
+# transaction that also advances a watermark, so an interrupted sweep resumes
+# where it stopped and a routine run only touches the days since the last one.
+# Today is swept by end time on every run and never moves the watermark.
+#
+# Completed bookings no longer occupy slots, so the swept days' availability
+# versions are bumped in the same transaction (see slot_cache.py).
+
+SWEEPER_WATERMARK = 'complete-past-bookings'
+DEFAULT_BATCH_DAYS = 7
+
+
+def _complete(bookings, days):
+    updated = bookings.update(status='Completed')
+    if updated:
+        TurfDayLock.objects.filter(**days).update(version=F('version') + 1)
+    return updated
+
+
+def complete_past_bookings(batch_days=DEFAULT_BATCH_DAYS, restart=False, now=None):
+    """
+    Moves every Confirmed booking that has ended to Completed. With `restart`,
+    the watermark is ignored and the sweep starts from the oldest Confirmed
+    booking. Returns the number of bookings completed.
+    """
+    now = timezone.localtime(now)
+    today = now.date()
+    confirmed = Booking.objects.filter(status='Confirmed')
+
+    watermark = None
+    if not restart:
+        watermark = Watermark.objects.filter(name=SWEEPER_WATERMARK).values_list('date', flat=True).first()
+    if watermark is not None:
+        start = watermark + timedelta(days=1)
+    else:
+        start = confirmed.filter(date__lt=today).aggregate(first=Min('date'))['first'] or today
+
+    completed = 0
+    while start < today:
+        stop = min(start + timedelta(days=batch_days - 1), today - timedelta(days=1))
+        with transaction.atomic():
+            completed += _complete(confirmed.filter(date__range=(start, stop)), {'date__range': (start, stop)})
+            Watermark.objects.update_or_create(name=SWEEPER_WATERMARK, defaults={'date': stop})
+        start = stop + timedelta(days=1)
+
+    with transaction.atomic():
+        completed += _complete(confirmed.filter(date=today, end_time__lt=now.time()), {'date': today})
+    return completed
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+# -----------------------------------------------------------------------------
+# Live Availability
+# -----------------------------------------------------------------------------
+#
+# Open booking pages subscribe to a server-sent-events stream for their
+# (turf, date) channel instead of reloading to see whether a slot freed up.
+# Every write that takes or frees an interval (bookings, cancellations, blocks,
+# unblocks and block rules) publishes it once its transaction commits, as
+# {'type': 'slots', 'free': bool, 'slots': [['HH:MM', 'HH:MM'], ...]}, and the
+# page patches those slots in place.
+#
+# The broker is chosen by settings.TURF_LIVE_BROKER. LocalBroker fans messages
+# out to the streams held open by this process, which is enough for a single
+# ASGI worker. Several workers need a shared broker (Redis pub/sub, Postgres
+# LISTEN/NOTIFY) with the same publish/subscribe/unsubscribe methods.
+#
+# Streams are only served under ASGI. A WSGI server (including runserver)
+# buffers an async iterator until it ends and pins a worker for the whole
+# lifetime, so there the stream answers 204 and pages skip it.
+
+DEFAULT_CONFIG = {
+    'BACKEND': 'TurfApp.live.LocalBroker',
+    'OPTIONS': {'max_pending': 64},
+}
+
+RESYNC = {'type': 'resync'}
+
+
+def serves_live_streams(request):
+    """True if the request came in over ASGI, which can stream without holding a worker."""
+    return isinstance(request, ASGIRequest)
+
+
+def live_channel(turf_id, day):
+    return (int(turf_id), day.isoformat())
+
+
+class Subscription:
+    """One open stream: an asyncio queue fed from any thread through its event loop."""
+    __slots__ = ('channel', 'loop', 'queue')
+
+    def __init__(self, channel, max_pending):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_pending)
+
+    def put(self, message):
+        # Runs on the subscriber's loop. A reader that fell this far behind
+        # gets one resync instead of the backlog.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """The next message, or None if none arrives within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """Fans messages out to the subscribers in this process."""
+
+    def __init__(self, max_pending=64):
+        self.max_pending = max_pending
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        """Subscribes the running event loop to a channel."""
+        subscription = Subscription(channel, self.max_pending)
+        with self._lock:
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, message):
+        """Delivers a message to every subscriber of a channel; safe from any thread."""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down; its stream is gone.
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(map(len, self._channels.values()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    """Returns the process-wide broker configured by settings.TURF_LIVE_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, 'TURF_LIVE_BROKER', DEFAULT_CONFIG)
+                _broker = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _broker
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'TURF_LIVE_BROKER':
+        _broker = None
+
+
+def publish_slots(turf_id, days, start_time, end_time, free):
+    """
+    Announces that [start_time, end_time) became free (or taken) on some days
+    of a turf, once the current transaction commits. Nothing is sent if it
+    rolls back.
+    """
+    channels = [live_channel(turf_id, day) for day in days]
+    if not channels:
+        return
+    message = {
+        'type': 'slots',
+        'free': free,
+        'slots': [[start_time.strftime('%H:%M'), end_time.strftime('%H:%M')]],
+    }
+
+    def send():
+        hub = broker()
+        for channel in channels:
+            hub.publish(channel, message)
+
+    transaction.on_commit(send)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from TurfApp.lifecycle import DEFAULT_BATCH_DAYS, complete_past_bookings
+
+
+class Command(BaseCommand):
+    help = "Marks Confirmed bookings that have ended as Completed. Run it periodically, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-days', type=int, default=DEFAULT_BATCH_DAYS, help="Days swept per UPDATE.")
+        parser.add_argument('--restart', action='store_true', help="Ignore the watermark and sweep from the oldest booking.")
+
+    def handle(self, *args, **options):
+        completed = complete_past_bookings(batch_days=max(1, options['batch_days']), restart=options['restart'])
+        self.stdout.write(self.style.SUCCESS(f"Completed {completed} booking(s)."))
@@ -0,0 +1,46 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from TurfApp.exports import EXPORT_CHUNK_SIZE, EXPORT_COLUMNS, EXPORT_FORMATS, ExportError, export_queryset, stream_export
+from TurfApp.models import TurfUser
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class Command(BaseCommand):
+    help = "Streams bookings or transactions (optionally for one owner) to a CSV or Parquet file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(EXPORT_COLUMNS), default='bookings')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--owner', help="Username of the owner to export; all owners by default.")
+        parser.add_argument('--start', type=_date, help="First date, YYYY-MM-DD.")
+        parser.add_argument('--end', type=_date, help="Last date, YYYY-MM-DD.")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched and written at a time.")
+        parser.add_argument('--output', help="File to write; CSV goes to stdout by default.")
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            owner = TurfUser.objects.filter(username=options['owner'], role=TurfUser.Role.OWNER).first()
+            if owner is None:
+                raise CommandError(f"No owner with username '{options['owner']}'.")
+        if options['format'] != 'csv' and not options['output']:
+            raise CommandError("Binary formats need --output.")
+
+        rows = export_queryset(options['kind'], owner=owner, start=options['start'], end=options['end'])
+        try:
+            chunks = stream_export(options['kind'], options['format'], rows, max(1, options['chunk_size']))
+        except ExportError as error:
+            raise CommandError(str(error))
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        mode = 'w' if options['format'] == 'csv' else 'wb'
+        with open(options['output'], mode, **({'newline': ''} if mode == 'w' else {})) as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['kind']} to {options['output']}."))
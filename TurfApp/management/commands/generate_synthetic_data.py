@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from TurfApp.synthetic import SyntheticDataGenerator, clear_synthetic_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic owners, turfs, players, bookings, ratings and transactions for load testing. "
+        "For example --owners 10000 --turfs-per-owner 10 --players 200000 --days-back 300 "
+        "--bookings-per-day 8 gives 10k owners, 100k turfs and roughly 10M bookings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, default=50)
+        parser.add_argument('--turfs-per-owner', type=int, default=2)
+        parser.add_argument('--players', type=int, default=500)
+        parser.add_argument('--days-back', type=int, default=60, help="Days of booking history before today.")
+        parser.add_argument('--days-ahead', type=int, default=14, help="Days of future bookings after today.")
+        parser.add_argument('--bookings-per-day', type=float, default=6, help="Average bookings per turf per day.")
+        parser.add_argument('--rating-rate', type=float, default=0.3, help="Share of completed bookings that get rated.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk insert.")
+        parser.add_argument('--clear', action='store_true', help="Delete previously generated data first.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted = clear_synthetic_data()
+            self.stdout.write(f"Cleared synthetic data ({deleted} bookings).")
+
+        generator = SyntheticDataGenerator(
+            owners=options['owners'], turfs_per_owner=options['turfs_per_owner'], players=options['players'],
+            days_back=options['days_back'], days_ahead=options['days_ahead'],
+            bookings_per_day=options['bookings_per_day'], rating_rate=options['rating_rate'],
+            seed=options['seed'], batch_size=options['batch_size'], stdout=self.stdout,
+        )
+        counts = generator.generate()
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary}."))
@@ -0,0 +1,50 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from TurfApp.images import IMAGE_FIELDS, build_variants, needs_variants, store_variants
+
+
+class Command(BaseCommand):
+    help = "Builds resized WebP/JPEG variants for turf and profile images that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Processes to encode images in (1 = this process).")
+        parser.add_argument('--force', action='store_true', help="Rebuild variants even for images that already have them.")
+
+    def pending(self, force):
+        """Yields (model, pk, image name, widths) for every image to process."""
+        for label, (field, variants_field, widths) in IMAGE_FIELDS.items():
+            model = apps.get_model('TurfApp', label)
+            rows = (model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                    .order_by('pk').values_list('pk', field, variants_field))
+            for pk, name, variants in rows.iterator():
+                if force or needs_variants(name, variants):
+                    yield model, pk, name, widths
+
+    def handle(self, *args, **options):
+        work = list(self.pending(options['force']))
+        done = failed = 0
+
+        def finish(model, pk, name, build):
+            nonlocal done, failed
+            try:
+                variants = build()
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{model.__name__} #{pk} ({name}): {type(exc).__name__}: {exc}")
+                return
+            store_variants(model, pk, name, variants)
+            done += 1
+
+        if options['workers'] <= 1:
+            for model, pk, name, widths in work:
+                finish(model, pk, name, lambda: build_variants(name, widths))
+        else:
+            # Children only read and write media files; every database write stays here.
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+                futures = {pool.submit(build_variants, name, widths): (model, pk, name) for model, pk, name, widths in work}
+                for future in as_completed(futures):
+                    finish(*futures[future], future.result)
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} image(s), {failed} failed."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from TurfApp.stats import rebuild_all_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the OwnerDayStats table from bookings, ratings and transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per bulk insert.")
+
+    def handle(self, *args, **options):
+        written = rebuild_all_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt owner stats: {written} turf-day rows."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from TurfApp.stats import reconcile_turf_ratings
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized rating totals on every turf and fixes any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted turfs without fixing them.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk update.")
+
+    def handle(self, *args, **options):
+        drifted = reconcile_turf_ratings(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Turf ratings are in sync."))
+            return
+        verb = "Found" if options['dry_run'] else "Fixed"
+        self.stdout.write(self.style.WARNING(f"{verb} rating drift on {len(drifted)} turf(s): {', '.join(map(str, drifted))}"))
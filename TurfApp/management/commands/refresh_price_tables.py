@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from TurfApp.models import TurfVenue
+from TurfApp.pricing import refresh_price_table
+
+
+class Command(BaseCommand):
+    help = "Recompiles every turf's price table so surge pricing follows recent demand. Run it daily, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turf', type=int, action='append', help="Only this turf id (repeatable).")
+
+    def handle(self, *args, **options):
+        turfs = TurfVenue.objects.order_by('pk')
+        if options['turf']:
+            turfs = turfs.filter(pk__in=options['turf'])
+        count = 0
+        for turf_id in turfs.values_list('pk', flat=True).iterator():
+            refresh_price_table(turf_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {count} price table(s)."))
@@ -0,0 +1,39 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from TurfApp.benchmarks import BenchmarkSuite, WRITE_SCENARIOS, compare_reports, write_report
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the booking, slot management, dashboard, my-bookings and search pages under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=BenchmarkSuite.SCENARIOS, dest='scenarios',
+                            help=f"Scenario to run (repeatable). Defaults to every read-only scenario; "
+                                 f"{', '.join(WRITE_SCENARIOS)} must be named explicitly.")
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads.")
+        parser.add_argument('--warmup', type=int, default=20, help="Unmeasured requests per scenario.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark.json', help="Where to write the JSON report.")
+        parser.add_argument('--compare', help="A previous JSON report to compare against.")
+
+    def handle(self, *args, **options):
+        try:
+            suite = BenchmarkSuite(
+                requests=options['requests'], concurrency=options['concurrency'],
+                warmup=options['warmup'], seed=options['seed'],
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        report = suite.run(options['scenarios'], stdout=self.stdout)
+        write_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+            self.stdout.write(f"Change vs {baseline.get('meta', {}).get('commit') or options['compare']} (%):")
+            for name, changes in compare_reports(baseline, report).items():
+                formatted = '  '.join(f"{metric} {change:+.1f}" for metric, change in changes.items())
+                self.stdout.write(f"  {name:16} {formatted}")
@@ -0,0 +1,33 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from TurfApp.jobs import purge_finished_jobs, run_pending, worker_name
+from TurfApp.services import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (receipts, notifications, stats refreshes) until stopped, and reaps expired slot holds."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the due jobs once and exit.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Jobs claimed per query.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--purge-days', type=int, default=7, help="Delete finished jobs older than this many days.")
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        purged = purge_finished_jobs(timedelta(days=options['purge_days']))
+        self.stdout.write(f"Worker {worker} started; purged {purged} finished job(s).")
+        try:
+            while True:
+                # One indexed DELETE; reads already ignore expired holds, this just keeps the table small.
+                release_expired_holds()
+                succeeded, failed = run_pending(worker, batch_size=options['batch_size'])
+                if succeeded or failed:
+                    self.stdout.write(f"Ran {succeeded + failed} job(s): {succeeded} succeeded, {failed} failed.")
+                if options['once']:
+                    return
+                if not (succeeded or failed):
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker stopped.")
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0009_alter_amenity_options_rename_amen_name_amenity_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='turfvenue',
+            name='custom_amenities',
+            field=models.CharField(blank=True, help_text='Enter comma-separated custom amenities.', max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['turf', 'date', 'status'], name='booking_turf_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['player', '-date', '-start_time'], name='booking_player_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['Confirmed', 'Blocked'])), fields=['turf', 'date', 'start_time'], name='booking_active_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0010_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TurfDayLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('turf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_locks', to='TurfApp.turfvenue')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('turf', 'date'), name='unique_turf_day_lock')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0011_turfdaylock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerDayStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('collected', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('blocked_minutes', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_stats', to=settings.AUTH_USER_MODEL)),
+                ('turf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_stats', to='TurfApp.turfvenue')),
+            ],
+            options={
+                'verbose_name': 'Owner Day Stats',
+                'verbose_name_plural': 'Owner Day Stats',
+                'indexes': [models.Index(fields=['owner', 'date'], name='daystats_owner_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('turf', 'date'), name='unique_turf_day_stats')],
+            },
+        ),
+    ]
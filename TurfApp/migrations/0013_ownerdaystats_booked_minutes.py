@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0012_ownerdaystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ownerdaystats',
+            name='booked_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
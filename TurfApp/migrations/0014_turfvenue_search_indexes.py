@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:36
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0013_ownerdaystats_booked_minutes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turfvenue',
+            index=models.Index(fields=['name', 'id'], name='turf_name_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turfvenue',
+            index=models.Index(fields=['price_per_hour', 'id'], name='turf_price_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turfvenue',
+            index=models.Index(django.db.models.functions.text.Lower('sports_type'), models.F('price_per_hour'), models.F('id'), name='turf_sport_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turfvenue',
+            index=models.Index(django.db.models.functions.text.Lower('sports_type'), models.F('name'), models.F('id'), name='turf_sport_name_idx'),
+        ),
+    ]
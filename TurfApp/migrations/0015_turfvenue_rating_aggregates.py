@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:38
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+PRIOR_MEAN = 3.5
+PRIOR_WEIGHT = 5
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    TurfVenue = apps.get_model('TurfApp', 'TurfVenue')
+    Rating = apps.get_model('TurfApp', 'Rating')
+    totals = Rating.objects.values('turf_id').annotate(total=Sum('score'), count=Count('id')).order_by()
+    turfs = []
+    for row in totals:
+        turfs.append(TurfVenue(
+            id=row['turf_id'],
+            rating_sum=row['total'] or 0,
+            rating_count=row['count'],
+            rating_score=(PRIOR_MEAN * PRIOR_WEIGHT + (row['total'] or 0)) / (PRIOR_WEIGHT + row['count']),
+        ))
+    TurfVenue.objects.bulk_update(turfs, ['rating_sum', 'rating_count', 'rating_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0014_turfvenue_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turfvenue',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='turfvenue',
+            name='rating_score',
+            field=models.FloatField(default=3.5, editable=False, help_text='Bayesian-weighted average used for sorting.'),
+        ),
+        migrations.AddField(
+            model_name='turfvenue',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='turfvenue',
+            index=models.Index(fields=['rating_score', 'id'], name='turf_rating_keyset_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0015_turfvenue_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turfvenue',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped on every edit; part of the availability cache key.'),
+        ),
+    ]
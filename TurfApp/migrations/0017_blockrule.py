@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0016_turfvenue_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(default='Maintenance', max_length=100)),
+                ('weekdays', models.PositiveSmallIntegerField(help_text='Bitmask of weekdays, Monday is bit 0.')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('exceptions', models.TextField(blank=True, default='', help_text='Comma-separated YYYY-MM-DD dates to skip.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('turf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='block_rules', to='TurfApp.turfvenue')),
+            ],
+            options={
+                'ordering': ['start_date', 'start_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='block_rule',
+            field=models.ForeignKey(blank=True, help_text='The recurring rule this block was expanded from, if any.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='blocks', to='TurfApp.blockrule'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0019_booking_lifecycle'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['turf', '-date', '-start_time'], name='booking_turf_recent_idx'),
+        ),
+    ]
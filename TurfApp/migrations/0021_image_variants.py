@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0020_booking_turf_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turfuser',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='turfvenue',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0021_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='turfvenue',
+            name='price_table',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='turfvenue',
+            name='surge_multiplier',
+            field=models.DecimalField(decimal_places=2, default=1, max_digits=4),
+        ),
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(default='Peak hours', max_length=100)),
+                ('weekdays', models.PositiveSmallIntegerField(help_text='Bitmask of weekdays, Monday is bit 0.')),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('multiplier', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('turf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='TurfApp.turfvenue')),
+            ],
+            options={
+                'ordering': ['start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceHoliday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('label', models.CharField(default='Holiday', max_length=100)),
+                ('priced_as', models.PositiveSmallIntegerField(default=6, help_text='Weekday whose prices apply, Monday is 0.')),
+                ('turf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_holidays', to='TurfApp.turfvenue')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('turf', 'date'), name='unique_turf_price_holiday')],
+            },
+        ),
+    ]
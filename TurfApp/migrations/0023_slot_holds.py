@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:08
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0022_pricing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('expires_at', models.DateTimeField()),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to=settings.AUTH_USER_MODEL)),
+                ('turf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='TurfApp.turfvenue')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['turf', 'date', 'expires_at'], name='hold_turf_day_idx'), models.Index(fields=['expires_at'], name='hold_expiry_idx')],
+            },
+        ),
+    ]
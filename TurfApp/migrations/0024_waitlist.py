@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TurfApp', '0023_slot_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+                ('turf', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='TurfApp.turfvenue')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['turf', 'date', 'created_at'], name='waitlist_fifo_idx'), models.Index(fields=['player', 'date'], name='waitlist_player_idx')],
+                'constraints': [models.UniqueConstraint(fields=('turf', 'player', 'date', 'start_time', 'end_time'), name='unique_waitlist_entry')],
+            },
+        ),
+    ]
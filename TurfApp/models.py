@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from datetime import datetime, timedelta
+import uuid
 
 # -----------------------------------------------------------------------------
 # User and Authentication Models
@@ -19,6 +21,8 @@ class TurfUser(AbstractUser):
     phone = models.CharField(max_length=15, blank=True, null=True)
     role = models.CharField(max_length=10, choices=Role.choices, default=Role.PLAYER)
     profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=True)
+    # Resized copies of profile_picture, written by the process_image job (see images.py).
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     class Meta:
         verbose_name = "Turf User"
@@ -62,6 +66,8 @@ class TurfVenue(models.Model):
     sports_type = models.CharField(max_length=50)
     price_per_hour = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='turf_images/', blank=True, null=True)
+    # Resized copies of image, written by the process_image job (see images.py).
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     no_of_players = models.IntegerField(default=0)
     open_time = models.TimeField(blank=True, null=True)
     close_time = models.TimeField(blank=True, null=True)
@@ -69,15 +75,62 @@ class TurfVenue(models.Model):
     google_maps_link = models.URLField(max_length=500, blank=True, null=True)
     amenities = models.ManyToManyField(Amenity, blank=True)
     custom_amenities = models.CharField(max_length=255, blank=True, null=True, help_text="Enter comma-separated custom amenities.")
+
+    # A new turf starts as if it had RATING_PRIOR_WEIGHT ratings of RATING_PRIOR_MEAN,
+    # so one 5-star review does not outrank a hundred 4.8-star ones.
+    RATING_PRIOR_MEAN = 3.5
+    RATING_PRIOR_WEIGHT = 5
+
+    # Denormalized rating totals, maintained by the Rating signals in signals.py.
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_score = models.FloatField(default=RATING_PRIOR_MEAN, editable=False, help_text="Bayesian-weighted average used for sorting.")
+    version = models.PositiveIntegerField(default=0, editable=False, help_text="Bumped on every edit; part of the availability cache key.")
+
+    # Demand pricing: half-hours booked in most recent weeks cost this much more (1 disables surge).
+    surge_multiplier = models.DecimalField(max_digits=4, decimal_places=2, default=1)
+    # The compiled weekly price lookup (see pricing.py); rebuilt whenever the pricing inputs change.
+    price_table = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Maintained with update() calls only, so a full save must not write back stale values.
+    COUNTER_FIELDS = ('rating_count', 'rating_sum', 'rating_score', 'version', 'image_variants', 'price_table')
     
     class Meta:
         verbose_name = "Turf Venue"
         verbose_name_plural = "Turf Venues"
         ordering = ['name']
+        indexes = [
+            # Keyset pagination for the listing sorts, optionally narrowed by sport.
+            models.Index(fields=['name', 'id'], name='turf_name_keyset_idx'),
+            models.Index(fields=['price_per_hour', 'id'], name='turf_price_keyset_idx'),
+            models.Index(Lower('sports_type'), 'price_per_hour', 'id', name='turf_sport_price_idx'),
+            models.Index(Lower('sports_type'), 'name', 'id', name='turf_sport_name_idx'),
+            models.Index(fields=['rating_score', 'id'], name='turf_rating_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bayesian_rating(cls, rating_sum, rating_count):
+        prior_weight = cls.RATING_PRIOR_WEIGHT
+        return (prior_weight * cls.RATING_PRIOR_MEAN + rating_sum) / (prior_weight + rating_count)
+
+    @property
+    def average_rating(self):
+        """Plain average star rating for display, or 0 if unrated."""
+        if not self.rating_count:
+            return 0
+        return self.rating_sum / self.rating_count
+
 # -----------------------------------------------------------------------------
 # Booking and Reservation Models
 # -----------------------------------------------------------------------------
@@ -95,8 +148,14 @@ class Booking(models.Model):
         ('Confirmed', 'Confirmed'), ('Cancelled', 'Cancelled'),
         ('Completed', 'Completed'), ('Blocked', 'Blocked'),
     ]
+    # Statuses that occupy a slot and make it unavailable to other players.
+    ACTIVE_STATUSES = ('Confirmed', 'Blocked')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Confirmed')
     block_reason = models.CharField(max_length=100, blank=True, null=True)
+    block_rule = models.ForeignKey(
+        'BlockRule', on_delete=models.SET_NULL, related_name='blocks', null=True, blank=True,
+        help_text="The recurring rule this block was expanded from, if any."
+    )
     total_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     booked_at = models.DateTimeField(auto_now_add=True)
 
@@ -104,6 +163,22 @@ class Booking(models.Model):
         ordering = ['date', 'start_time']
         verbose_name = "Booking"
         verbose_name_plural = "Bookings"
+        indexes = [
+            # Slot grids and owner stats: turf + date (+ status).
+            models.Index(fields=['turf', 'date', 'status'], name='booking_turf_date_status_idx'),
+            # Player history, newest first.
+            models.Index(fields=['player', '-date', '-start_time'], name='booking_player_recent_idx'),
+            # Owner's per-turf booking history, newest first.
+            models.Index(fields=['turf', '-date', '-start_time'], name='booking_turf_recent_idx'),
+            # The lifecycle sweeper's date-partitioned Confirmed -> Completed updates.
+            models.Index(fields=['status', 'date'], name='booking_status_date_idx'),
+            # Availability lookups only ever look at slot-occupying bookings.
+            models.Index(
+                fields=['turf', 'date', 'start_time'],
+                condition=models.Q(status__in=['Confirmed', 'Blocked']),
+                name='booking_active_slot_idx',
+            ),
+        ]
 
     def __str__(self):
         if self.status == 'Blocked':
@@ -117,15 +192,166 @@ class Booking(models.Model):
         end_datetime = datetime.combine(self.date, self.end_time)
         return (end_datetime - start_datetime).total_seconds() / 3600
 
+class TurfDayLock(models.Model):
+    """
+    One row per turf-day. Writers that change a day's slots update this row first,
+    which serializes them per turf-day and bumps the day's availability version.
+    """
+    turf = models.ForeignKey(TurfVenue, on_delete=models.CASCADE, related_name='day_locks')
+    date = models.DateField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['turf', 'date'], name='unique_turf_day_lock'),
+        ]
+
+    def __str__(self):
+        return f"Lock for {self.turf_id} on {self.date} (v{self.version})"
+
+class SlotHold(models.Model):
+    """
+    A short reservation of an interval while a player checks out. Holds count as
+    taken for everyone else until they expire or are converted into a booking.
+    Expired rows are ignored by every read and deleted in bulk by the reaper.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    turf = models.ForeignKey(TurfVenue, on_delete=models.CASCADE, related_name='holds')
+    player = models.ForeignKey(TurfUser, on_delete=models.CASCADE, related_name='holds')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['turf', 'date', 'expires_at'], name='hold_turf_day_idx'),
+            # The reaper deletes everything past its expiry with one range scan.
+            models.Index(fields=['expires_at'], name='hold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hold on {self.turf_id} {self.date} {self.start_time:%H:%M}-{self.end_time:%H:%M} until {self.expires_at:%H:%M:%S}"
+
+class WaitlistEntry(models.Model):
+    """
+    A player waiting for an interval of a turf-day that is taken. Waiters are
+    served first come, first served: when part of the day frees up, the oldest
+    entries whose whole interval is now free become holds (see waitlist.py).
+    """
+    turf = models.ForeignKey(TurfVenue, on_delete=models.CASCADE, related_name='waitlist')
+    player = models.ForeignKey(TurfUser, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A turf-day's waiters in arrival order, read with one range scan.
+            models.Index(fields=['turf', 'date', 'created_at'], name='waitlist_fifo_idx'),
+            models.Index(fields=['player', 'date'], name='waitlist_player_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['turf', 'player', 'date', 'start_time', 'end_time'], name='unique_waitlist_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.player_id} waiting for {self.turf_id} {self.date} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+class BlockRule(models.Model):
+    """
+    A recurring block, e.g. "every Tuesday and Thursday 18:00-20:00 from March
+    to June". It is expanded into Blocked bookings when saved (see services.py).
+    """
+    WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+    turf = models.ForeignKey(TurfVenue, on_delete=models.CASCADE, related_name='block_rules')
+    reason = models.CharField(max_length=100, default='Maintenance')
+    weekdays = models.PositiveSmallIntegerField(help_text="Bitmask of weekdays, Monday is bit 0.")
+    start_date = models.DateField()
+    end_date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    exceptions = models.TextField(blank=True, default='', help_text="Comma-separated YYYY-MM-DD dates to skip.")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['start_date', 'start_time']
+
+    def __str__(self):
+        return f"{self.reason} on {self.weekday_display} {self.start_time:%H:%M}-{self.end_time:%H:%M} for {self.turf.name}"
+
+    @property
+    def weekday_display(self):
+        return ', '.join(name for index, name in enumerate(self.WEEKDAY_NAMES) if self.weekdays >> index & 1)
+
     @property
-    def is_completed(self):
-        """Returns True if the booking's end time is in the past."""
-        if not self.date or not self.end_time:
-            return False
-        booking_end_datetime = timezone.make_aware(
-            datetime.combine(self.date, self.end_time)
-        )
-        return booking_end_datetime < timezone.now()
+    def exception_dates(self):
+        dates = set()
+        for value in self.exceptions.split(','):
+            try:
+                dates.add(datetime.strptime(value.strip(), '%Y-%m-%d').date())
+            except ValueError:
+                continue
+        return dates
+
+    def dates(self, start=None):
+        """Yields every date the rule applies to, from `start` (if later) to end_date."""
+        current = max(self.start_date, start) if start else self.start_date
+        skipped = self.exception_dates
+        while current <= self.end_date:
+            if self.weekdays >> current.weekday() & 1 and current not in skipped:
+                yield current
+            current += timedelta(days=1)
+
+# -----------------------------------------------------------------------------
+# Pricing Models
+# -----------------------------------------------------------------------------
+
+class PriceRule(models.Model):
+    """
+    Multiplies a turf's hourly rate on some weekdays between two times, e.g.
+    "Sat, Sun x1.25" or "Mon-Fri 18:00-22:00 x1.5". Overlapping rules multiply.
+    """
+    turf = models.ForeignKey(TurfVenue, on_delete=models.CASCADE, related_name='price_rules')
+    label = models.CharField(max_length=100, default='Peak hours')
+    weekdays = models.PositiveSmallIntegerField(help_text="Bitmask of weekdays, Monday is bit 0.")
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    multiplier = models.DecimalField(max_digits=4, decimal_places=2)
+
+    class Meta:
+        ordering = ['start_time']
+
+    def __str__(self):
+        return f"{self.label} x{self.multiplier} on {self.weekday_display} for {self.turf.name}"
+
+    @property
+    def weekday_display(self):
+        return ', '.join(name for index, name in enumerate(BlockRule.WEEKDAY_NAMES) if self.weekdays >> index & 1)
+
+class PriceHoliday(models.Model):
+    """A date priced like another weekday (by default a Sunday) instead of its own."""
+    turf = models.ForeignKey(TurfVenue, on_delete=models.CASCADE, related_name='price_holidays')
+    date = models.DateField()
+    label = models.CharField(max_length=100, default='Holiday')
+    priced_as = models.PositiveSmallIntegerField(default=6, help_text="Weekday whose prices apply, Monday is 0.")
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['turf', 'date'], name='unique_turf_price_holiday'),
+        ]
+
+    def __str__(self):
+        return f"{self.label} on {self.date} for {self.turf.name}"
+
+    @property
+    def priced_as_display(self):
+        return BlockRule.WEEKDAY_NAMES[self.priced_as]
 
 class Rating(models.Model):
     booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='rating')
@@ -138,6 +364,11 @@ class Rating(models.Model):
     class Meta:
         ordering = ['-created_at']
 
+    def save(self, *args, **kwargs):
+        # The turf's rating totals are updated by signals; keep both writes in one transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Rating for {self.turf.name} by {self.player.name}: {self.score} stars"
     
@@ -156,4 +387,90 @@ class Transaction(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"Transaction for Booking #{self.booking.id} - ₹{self.amount} ({self.status})"
\ No newline at end of file
+        return f"Transaction for Booking #{self.booking.id} - ₹{self.amount} ({self.status})"
+
+# -----------------------------------------------------------------------------
+# Reporting Models
+# -----------------------------------------------------------------------------
+
+class OwnerDayStats(models.Model):
+    """
+    Pre-aggregated dashboard figures for one turf on one day, kept current by
+    the signal handlers in signals.py and rebuildable with `rebuild_owner_stats`.
+    """
+    owner = models.ForeignKey(TurfUser, on_delete=models.CASCADE, related_name='day_stats')
+    turf = models.ForeignKey(TurfVenue, on_delete=models.CASCADE, related_name='day_stats')
+    date = models.DateField()
+    bookings = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    collected = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    booked_minutes = models.PositiveIntegerField(default=0)
+    blocked_minutes = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Owner Day Stats"
+        verbose_name_plural = "Owner Day Stats"
+        constraints = [
+            models.UniqueConstraint(fields=['turf', 'date'], name='unique_turf_day_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'date'], name='daystats_owner_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.turf_id} on {self.date}"
+
+# -----------------------------------------------------------------------------
+# Background Jobs
+# -----------------------------------------------------------------------------
+
+class Job(models.Model):
+    """
+    A unit of deferred work (receipts, notifications, stats refreshes), run by
+    the `run_jobs` worker. See jobs.py.
+    """
+    STATUS_CHOICES = [
+        ('Queued', 'Queued'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed'),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(
+        max_length=200, null=True, blank=True,
+        help_text="At most one queued job may carry a given key; duplicates are dropped."
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['idempotency_key'], condition=models.Q(status='Queued'),
+                name='unique_queued_job_key',
+            ),
+        ]
+        indexes = [
+            # The worker's claim query: due jobs in run_at order.
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class Watermark(models.Model):
+    """How far a resumable batch process (such as the booking sweeper) has got."""
+    name = models.CharField(max_length=100, unique=True)
+    date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.date}"
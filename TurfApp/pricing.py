@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from django.db.models import F
+from .availability import SLOT_MINUTES, to_minutes
+from .models import Booking, PriceHoliday, PriceRule, TurfVenue
+
+# -----------------------------------------------------------------------------
+# Pricing Engine
+# -----------------------------------------------------------------------------
+#
+# A turf's price rules, holidays and demand surge are compiled into one weekly
+# table of 7 x 48 half-hour cells, each holding the multiplier of the hourly
+# rate in basis points, and stored on TurfVenue.price_table. The table only
+# changes when a rule, holiday or the surge setting does, and once a day as
+# the surge window moves (`manage.py refresh_price_tables`). Quoting an
+# interval is then a sum over the cells it touches: no rule walk and no query,
+# since the table travels with the (cached) turf row.
+#
+# Prices stay relative to price_per_hour, so changing the rate needs no rebuild.
+
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BASIS_POINTS = 10000
+
+# Surge looks at the last SURGE_WINDOW_DAYS of bookings and applies to every
+# weekly half-hour that was booked in at least SURGE_OCCUPANCY of those weeks.
+SURGE_WINDOW_DAYS = 28
+SURGE_OCCUPANCY = 0.75
+
+CENT = Decimal('0.01')
+
+
+def slot_range(start_time, end_time):
+    """The (first, stop) day-slot indices touched by an interval."""
+    return to_minutes(start_time) // SLOT_MINUTES, -(-to_minutes(end_time, round_up=True) // SLOT_MINUTES)
+
+
+def recent_occupancy(turf_id, today=None):
+    """Share of the last SURGE_WINDOW_DAYS weeks in which each weekly half-hour was booked."""
+    today = today or date.today()
+    counts = [0] * (7 * SLOTS_PER_DAY)
+    bookings = Booking.objects.filter(
+        turf_id=turf_id, date__gte=today - timedelta(days=SURGE_WINDOW_DAYS), date__lt=today,
+        status__in=('Confirmed', 'Completed'),
+    ).values_list('date', 'start_time', 'end_time')
+    for day, start_time, end_time in bookings:
+        row = day.weekday() * SLOTS_PER_DAY
+        first, stop = slot_range(start_time, end_time)
+        for slot in range(first, min(stop, SLOTS_PER_DAY)):
+            counts[row + slot] += 1
+    weeks = SURGE_WINDOW_DAYS / 7
+    return [count / weeks for count in counts]
+
+
+def compile_price_table(rules, holidays=(), surge_multiplier=1, occupancy=None):
+    """Builds the stored table from PriceRule-like and PriceHoliday-like objects."""
+    week = [BASIS_POINTS] * (7 * SLOTS_PER_DAY)
+    for rule in rules:
+        factor = Decimal(rule.multiplier)
+        first, stop = slot_range(rule.start_time, rule.end_time)
+        for weekday in range(7):
+            if rule.weekdays >> weekday & 1:
+                row = weekday * SLOTS_PER_DAY
+                for cell in range(row + first, row + min(stop, SLOTS_PER_DAY)):
+                    week[cell] = int(week[cell] * factor)
+    surge = Decimal(surge_multiplier)
+    if occupancy and surge != 1:
+        for cell, share in enumerate(occupancy):
+            if share >= SURGE_OCCUPANCY:
+                week[cell] = int(week[cell] * surge)
+    return {
+        'week': week,
+        'holidays': {holiday.date.isoformat(): holiday.priced_as for holiday in holidays},
+    }
+
+
+def refresh_price_table(turf_id, today=None):
+    """Recompiles and stores one turf's table, invalidating its cached turf-days."""
+    today = today or date.today()
+    surge = TurfVenue.objects.filter(pk=turf_id).values_list('surge_multiplier', flat=True).first()
+    if surge is None:
+        return None
+    table = compile_price_table(
+        PriceRule.objects.filter(turf_id=turf_id),
+        PriceHoliday.objects.filter(turf_id=turf_id, date__gte=today),
+        surge, recent_occupancy(turf_id, today) if surge != 1 else None,
+    )
+    TurfVenue.objects.filter(pk=turf_id).update(price_table=table, version=F('version') + 1)
+    return table
+
+
+class PriceTable:
+    """Quotes intervals against a turf's compiled table; an empty table is the flat rate."""
+    __slots__ = ('rate', 'week', 'holidays')
+
+    def __init__(self, turf):
+        self.rate = Decimal(str(turf.price_per_hour))
+        self.week = turf.price_table.get('week') if turf.price_table else None
+        self.holidays = turf.price_table.get('holidays', {}) if turf.price_table else {}
+
+    def _cell_price(self, row, slot, minutes):
+        points = self.week[row + slot] if self.week else BASIS_POINTS
+        return (self.rate * points * minutes / (BASIS_POINTS * 60)).quantize(CENT, ROUND_HALF_UP)
+
+    def quote(self, day, start_time, end_time):
+        """
+        The price of [start_time, end_time) on a date. Every half-hour is priced
+        (and rounded) on its own, so a range costs exactly the sum of its slots.
+        """
+        start, end = to_minutes(start_time), to_minutes(end_time, round_up=True)
+        if end == 0:
+            end = 24 * 60  # Ends at midnight.
+        row = self.holidays.get(day.isoformat(), day.weekday()) * SLOTS_PER_DAY
+        total = Decimal('0.00')
+        for slot in range(start // SLOT_MINUTES, min(-(-end // SLOT_MINUTES), SLOTS_PER_DAY)):
+            minutes = min(end, (slot + 1) * SLOT_MINUTES) - max(start, slot * SLOT_MINUTES)
+            total += self._cell_price(row, slot, minutes)
+        return total
+
+    def slot_prices(self, day, grid):
+        """The price of each slot of a DayGrid."""
+        return [self.quote(day, grid.slot_start(index), grid.slot_end(index)) for index in range(len(grid))]
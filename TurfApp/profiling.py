@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Request Profiling
+# -----------------------------------------------------------------------------
+#
+# `profile()` records every SQL statement and template render inside a block.
+# ProfilingMiddleware wraps each request in one, adds a Server-Timing header and
+# keeps per-URL-name totals that the staff-only stats endpoint exposes. The
+# same context manager backs the per-view query budget tests.
+
+# A parameterised statement repeated this many times in one request is almost
+# always a lazy relation loaded inside a loop.
+N_PLUS_ONE_THRESHOLD = 3
+
+_active_profile = ContextVar('turf_profile', default=None)
+
+
+class Profile:
+    """Query count, duplicate statements, DB time and template time for one block."""
+
+    def __init__(self, label=None):
+        self.label = label
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.total_ms = 0.0
+        self.statements = Counter()
+        self._started = time.perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper().
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self._started) * 1000
+
+    @property
+    def duplicates(self):
+        """Statements that ran more than once, with their counts."""
+        return {sql: count for sql, count in self.statements.items() if count > 1}
+
+    @property
+    def n_plus_one(self):
+        return {sql: count for sql, count in self.statements.items() if count >= N_PLUS_ONE_THRESHOLD}
+
+    def server_timing(self):
+        """Formats the profile as a Server-Timing header value."""
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'total;dur={self.total_ms:.1f}',
+        ])
+
+
+def _wrap_connections(stack, current):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(current))
+
+
+@contextmanager
+def profile(label=None):
+    """Profiles the SQL and template work done inside the block."""
+    current = Profile(label)
+    token = _active_profile.set(current)
+    try:
+        with ExitStack() as stack:
+            _wrap_connections(stack, current)
+            yield current
+    finally:
+        current.finish()
+        _active_profile.reset(token)
+
+
+@asynccontextmanager
+async def aprofile(label=None):
+    """
+    profile() for async code. Connections are per thread and the async ORM runs
+    queries in the request's thread-sensitive sync thread, so the wrappers are
+    installed (and removed) there.
+    """
+    current = Profile(label)
+    token = _active_profile.set(current)
+    stack = ExitStack()
+    try:
+        await sync_to_async(_wrap_connections)(stack, current)
+        yield current
+    finally:
+        await sync_to_async(stack.close)()
+        current.finish()
+        _active_profile.reset(token)
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        current = _active_profile.get()
+        if current is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            current.template_ms += (time.perf_counter() - started) * 1000
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, with render time added to the active profile."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return ProfiledTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# -----------------------------------------------------------------------------
+# Per-View Totals
+# -----------------------------------------------------------------------------
+
+class ViewStats:
+    """Thread-safe running totals per URL name for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, url_name, current):
+        with self._lock:
+            stats = self._views.setdefault(url_name, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'n_plus_one': 0,
+                'db_ms': 0.0, 'template_ms': 0.0, 'total_ms': 0.0, 'max_total_ms': 0.0,
+            })
+            stats['requests'] += 1
+            stats['queries'] += current.queries
+            stats['max_queries'] = max(stats['max_queries'], current.queries)
+            stats['n_plus_one'] += bool(current.n_plus_one)
+            stats['db_ms'] += current.db_ms
+            stats['template_ms'] += current.template_ms
+            stats['total_ms'] += current.total_ms
+            stats['max_total_ms'] = max(stats['max_total_ms'], current.total_ms)
+
+    def snapshot(self):
+        """Returns {url_name: stats} with per-request averages filled in."""
+        with self._lock:
+            views = {name: dict(stats) for name, stats in self._views.items()}
+        for stats in views.values():
+            requests = stats['requests']
+            stats['avg_queries'] = round(stats['queries'] / requests, 2)
+            for field in ('db_ms', 'template_ms', 'total_ms'):
+                stats[f'avg_{field}'] = round(stats[field] / requests, 2)
+                stats[field] = round(stats[field], 2)
+            stats['max_total_ms'] = round(stats['max_total_ms'], 2)
+        return views
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_stats = ViewStats()
+
+
+class ProfilingMiddleware:
+    """Profiles each request when settings.TURF_PROFILING is on. Works in sync and async stacks."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'TURF_PROFILING', False):
+            return self.get_response(request)
+
+        with profile() as current:
+            response = self.get_response(request)
+        return self.record(request, response, current)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'TURF_PROFILING', False):
+            return await self.get_response(request)
+
+        async with aprofile() as current:
+            response = await self.get_response(request)
+        return self.record(request, response, current)
+
+    def record(self, request, response, current):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else 'unresolved'
+        view_stats.record(url_name, current)
+        response['Server-Timing'] = current.server_timing()
+        if current.n_plus_one:
+            sql, count = max(current.n_plus_one.items(), key=lambda item: item[1])
+            logger.warning("Possible N+1 in %s: %d runs of %s", url_name, count, sql)
+        return response
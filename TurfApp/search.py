@@ -0,0 +1,199 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from datetime import datetime
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .models import TurfVenue, Booking
+from .availability import DayGrid
+from .search_index import get_index
+
+# -----------------------------------------------------------------------------
+# Turf Search
+# -----------------------------------------------------------------------------
+#
+# Listing pages page through turfs with keyset (cursor) pagination: every page
+# is "rows after (sort value, id)" on an index instead of OFFSET, so page 1000
+# costs the same as page 1.
+
+PAGE_SIZE = 12
+
+# Text queries narrow the listing to this many best-ranked turfs.
+TEXT_MATCH_LIMIT = 500
+
+# Public sort name -> (annotated sort field, descending?)
+SORT_OPTIONS = {
+    'name': ('name', False),
+    'price': ('price_per_hour', False),
+    '-price': ('price_per_hour', True),
+    'rating': ('rating_score', True),
+}
+
+# Time-of-day presets used by the listing page's "Any time" dropdown.
+TIME_WINDOWS = {
+    'morning': ('06:00', '12:00'),
+    'afternoon': ('12:00', '17:00'),
+    'evening': ('17:00', '22:00'),
+}
+
+# How many candidate rows to pull per batch while filling a page that also
+# needs the Python-side free-slot check, and how many batches to try.
+FREE_SLOT_BATCH = PAGE_SIZE * 4
+FREE_SLOT_MAX_BATCHES = 10
+
+
+def encode_cursor(value, pk):
+    payload = json.dumps([str(value), pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (value, pk) from a cursor string, or None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_decimal(value):
+    try:
+        return Decimal(value) if value not in (None, '') else None
+    except InvalidOperation:
+        return None
+
+
+class TurfSearch:
+    """
+    Parses listing filters from a QueryDict and returns one keyset page of turfs.
+
+    Supported parameters: q (fuzzy free text), sport, location, min_price,
+    max_price, players, amenities (repeated ids), open_at (HH:MM), date + time
+    window (a `time` preset or `from`/`to`) for "has a free slot", sort and cursor.
+    """
+    def __init__(self, params):
+        self.query = (params.get('q') or '').strip()
+        self.sport = (params.get('sport') or '').strip().lower()
+        self.location = (params.get('location') or '').strip()
+        self.min_price = _parse_decimal(params.get('min_price'))
+        self.max_price = _parse_decimal(params.get('max_price'))
+        self.amenities = [int(pk) for pk in params.getlist('amenities') if pk.isdigit()]
+        self.open_at = _parse_time(params.get('open_at'))
+        try:
+            self.players = int(params.get('players')) if params.get('players') else None
+        except ValueError:
+            self.players = None
+
+        try:
+            self.free_date = datetime.strptime(params.get('date') or '', '%Y-%m-%d').date()
+        except ValueError:
+            self.free_date = None
+        window = TIME_WINDOWS.get(params.get('time'), (params.get('from'), params.get('to')))
+        self.free_from, self.free_to = _parse_time(window[0]), _parse_time(window[1])
+
+        self.sort = params.get('sort') if params.get('sort') in SORT_OPTIONS else 'name'
+        self.cursor = decode_cursor(params.get('cursor') or '')
+
+    @property
+    def needs_free_slot(self):
+        return bool(self.free_date and self.free_from and self.free_to and self.free_from < self.free_to)
+
+    def queryset(self):
+        # Listings never price slots, so the compiled price table stays in the database.
+        turfs = TurfVenue.objects.defer('price_table')
+        if self.query:
+            matches = get_index().search(self.query, limit=TEXT_MATCH_LIMIT)
+            turfs = turfs.filter(id__in=[turf_id for turf_id, _ in matches])
+        if self.sport:
+            # Matches the Lower(sports_type) functional index.
+            turfs = turfs.alias(sport_key=Lower('sports_type')).filter(sport_key=self.sport)
+        if self.location:
+            turfs = turfs.filter(location__icontains=self.location)
+        if self.min_price is not None:
+            turfs = turfs.filter(price_per_hour__gte=self.min_price)
+        if self.max_price is not None:
+            turfs = turfs.filter(price_per_hour__lte=self.max_price)
+        if self.players:
+            turfs = turfs.filter(no_of_players__gte=self.players)
+        for amenity_id in self.amenities:
+            turfs = turfs.filter(amenities=amenity_id)
+        if self.open_at:
+            turfs = turfs.filter(open_time__lte=self.open_at, close_time__gt=self.open_at)
+
+        field, descending = SORT_OPTIONS[self.sort]
+        if descending:
+            return turfs.order_by(f'-{field}', '-id')
+        return turfs.order_by(field, 'id')
+
+    def _after(self, turfs, value, pk):
+        """Restricts the queryset to rows strictly after (value, pk) in sort order."""
+        field, descending = SORT_OPTIONS[self.sort]
+        op = 'lt' if descending else 'gt'
+        return turfs.filter(Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk}))
+
+    def _sort_value(self, turf):
+        field, _ = SORT_OPTIONS[self.sort]
+        return getattr(turf, field)
+
+    def _with_free_slot(self, turfs):
+        """Keeps the turfs that have at least one free slot in the requested window."""
+        if not turfs:
+            return []
+        bookings = Booking.objects.filter(
+            turf__in=turfs, date=self.free_date, status__in=Booking.ACTIVE_STATUSES
+        ).values_list('turf_id', 'start_time', 'end_time')
+        grids = {turf.id: DayGrid(turf.open_time, turf.close_time) for turf in turfs}
+        for turf_id, start_time, end_time in bookings:
+            grids[turf_id].mark(start_time, end_time)
+        matches = []
+        for turf in turfs:
+            grid = grids[turf.id]
+            if grid.free_mask & grid.mask(self.free_from, self.free_to):
+                matches.append(turf)
+        return matches
+
+    def page(self, page_size=PAGE_SIZE):
+        """Returns (turfs, next_cursor); next_cursor is None on the last page."""
+        turfs = self.queryset()
+        if self.cursor:
+            turfs = self._after(turfs, *self.cursor)
+
+        if not self.needs_free_slot:
+            rows = list(turfs[:page_size + 1])
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+        else:
+            # Availability is checked in Python, so pull candidates in index order
+            # until the page is full; each batch costs one turf and one booking query.
+            rows, has_more, last = [], False, None
+            for _ in range(FREE_SLOT_MAX_BATCHES):
+                batch_qs = self._after(turfs, *last) if last else turfs
+                batch = list(batch_qs[:FREE_SLOT_BATCH])
+                if not batch:
+                    break
+                last = (self._sort_value(batch[-1]), batch[-1].id)
+                for turf in self._with_free_slot(batch):
+                    if len(rows) == page_size:
+                        has_more = True
+                        break
+                    rows.append(turf)
+                if has_more or len(batch) < FREE_SLOT_BATCH:
+                    break
+            else:
+                has_more = True
+            if has_more and len(rows) < page_size:
+                # Ran out of batches before filling the page; resume after the last candidate.
+                return rows, encode_cursor(*last)
+
+        next_cursor = None
+        if has_more and rows:
+            next_cursor = encode_cursor(self._sort_value(rows[-1]), rows[-1].id)
+        return rows, next_cursor
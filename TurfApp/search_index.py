@@ -0,0 +1,236 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from django.core.cache import cache
+from .models import TurfVenue
+
+# -----------------------------------------------------------------------------
+# Turf Text Search Index
+# -----------------------------------------------------------------------------
+#
+# An in-process inverted index over turf name, location, description, custom
+# amenities and amenity names. Exact and prefix matches come from the token
+# postings; misspellings are matched through a trigram index over the token
+# vocabulary. The index is built lazily from two queries and then kept current
+# by the signal handlers in signals.py. A shared cache counter lets other
+# worker processes notice changes and rebuild their copy.
+
+# Relative importance of each field when scoring a match.
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'location': 2.0,
+    'amenities': 1.5,
+    'description': 1.0,
+}
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.6
+FUZZY_THRESHOLD = 0.3
+MIN_PREFIX_LENGTH = 2
+
+INDEX_VERSION_KEY = 'turf-search-index-version'
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TurfSearchIndex:
+    """Inverted + trigram index mapping tokens to weighted turf ids."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self.postings = defaultdict(dict)   # token -> {turf_id: weight}
+        self.doc_tokens = {}                # turf_id -> set of tokens
+        self.grams = defaultdict(set)       # trigram -> tokens
+        self._sorted_tokens = None          # lazily rebuilt for prefix lookups
+
+    # --- Maintenance ---
+
+    def add(self, turf_id, fields):
+        """Indexes (or re-indexes) one turf. `fields` maps field name to text."""
+        weights = defaultdict(float)
+        for field, text in fields.items():
+            for token in tokenize(text):
+                weights[token] += FIELD_WEIGHTS.get(field, 1.0)
+        with self._lock:
+            self._discard(turf_id)
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    for gram in trigrams(token):
+                        self.grams[gram].add(token)
+                    self._sorted_tokens = None
+                self.postings[token][turf_id] = weight
+            self.doc_tokens[turf_id] = set(weights)
+
+    def remove(self, turf_id):
+        with self._lock:
+            self._discard(turf_id)
+
+    def _discard(self, turf_id):
+        for token in self.doc_tokens.pop(turf_id, ()):
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.pop(turf_id, None)
+            if not docs:
+                del self.postings[token]
+                for gram in trigrams(token):
+                    self.grams[gram].discard(token)
+                self._sorted_tokens = None
+
+    # --- Lookups ---
+
+    def _tokens_with_prefix(self, prefix):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        tokens = self._sorted_tokens
+        index = bisect_left(tokens, prefix)
+        while index < len(tokens) and tokens[index].startswith(prefix):
+            yield tokens[index]
+            index += 1
+
+    def _fuzzy_tokens(self, token):
+        """Yields (candidate, similarity) for vocabulary tokens close to `token`."""
+        query_grams = trigrams(token)
+        overlap = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self.grams.get(gram, ()):
+                overlap[candidate] += 1
+        for candidate, shared in overlap.items():
+            similarity = shared / (len(query_grams) + len(trigrams(candidate)) - shared)
+            if similarity >= FUZZY_THRESHOLD:
+                yield candidate, similarity
+
+    def _match(self, token, allow_prefix):
+        """Returns {turf_id: score} for one query token."""
+        scores = defaultdict(float)
+        for turf_id, weight in self.postings.get(token, {}).items():
+            scores[turf_id] += weight
+        if allow_prefix and len(token) >= MIN_PREFIX_LENGTH:
+            for candidate in self._tokens_with_prefix(token):
+                if candidate != token:
+                    for turf_id, weight in self.postings[candidate].items():
+                        scores[turf_id] = max(scores[turf_id], weight * PREFIX_FACTOR)
+        if not scores:
+            for candidate, similarity in self._fuzzy_tokens(token):
+                for turf_id, weight in self.postings[candidate].items():
+                    scores[turf_id] = max(scores[turf_id], weight * similarity * FUZZY_FACTOR)
+        return scores
+
+    def search(self, query, limit=20):
+        """
+        Returns [(turf_id, score)] best first. Every query word must match
+        (exactly, as a prefix for the last word, or fuzzily).
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            totals = None
+            for position, token in enumerate(tokens):
+                scores = self._match(token, allow_prefix=position == len(tokens) - 1)
+                if totals is None:
+                    totals = dict(scores)
+                else:
+                    totals = {turf_id: totals[turf_id] + score for turf_id, score in scores.items() if turf_id in totals}
+                if not totals:
+                    return []
+        return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def autocomplete(self, prefix, limit=8):
+        """Returns vocabulary completions for a prefix, most common first."""
+        prefix = (tokenize(prefix) or [''])[-1]
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return []
+        with self._lock:
+            candidates = [(len(self.postings[token]), token) for token in self._tokens_with_prefix(prefix)]
+        candidates.sort(key=lambda item: (-item[0], item[1]))
+        return [token for _, token in candidates[:limit]]
+
+
+_index = TurfSearchIndex()
+_build_lock = threading.Lock()
+
+
+def _turf_documents(turf_ids=None):
+    """Yields (turf_id, fields) for the given turfs (or all turfs) in two queries."""
+    turfs = TurfVenue.objects.all()
+    if turf_ids is not None:
+        turfs = turfs.filter(id__in=turf_ids)
+    amenity_names = defaultdict(list)
+    through = TurfVenue.amenities.through.objects.filter(turfvenue__in=turfs)
+    for turf_id, name in through.values_list('turfvenue_id', 'amenity__name'):
+        amenity_names[turf_id].append(name)
+    rows = turfs.values_list('id', 'name', 'location', 'description', 'custom_amenities')
+    for turf_id, name, location, description, custom_amenities in rows.iterator():
+        yield turf_id, {
+            'name': name,
+            'location': location,
+            'description': description,
+            'amenities': ' '.join(amenity_names[turf_id] + [custom_amenities or '']),
+        }
+
+
+def _shared_version():
+    return cache.get_or_set(INDEX_VERSION_KEY, 1, timeout=None)
+
+
+def get_index():
+    """Returns the process-wide index, (re)building it if another process changed it."""
+    version = _shared_version()
+    if _index.version != version:
+        with _build_lock:
+            if _index.version != version:
+                fresh = TurfSearchIndex()
+                for turf_id, fields in _turf_documents():
+                    fresh.add(turf_id, fields)
+                with _index._lock:
+                    _index.postings, _index.doc_tokens, _index.grams = fresh.postings, fresh.doc_tokens, fresh.grams
+                    _index._sorted_tokens = None
+                    _index.version = version
+    return _index
+
+
+def invalidate_index():
+    """Forces every process to rebuild its index on the next lookup."""
+    _bump_version()
+
+
+def _bump_version():
+    try:
+        version = cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        version = 2
+        cache.set(INDEX_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def reindex_turfs(turf_ids):
+    """Incrementally re-indexes the given turfs in this process and flags other processes."""
+    built = _index.version is not None
+    documents = list(_turf_documents(turf_ids)) if built else []
+    version = _bump_version()
+    if built:
+        with _index._lock:
+            for turf_id, fields in documents:
+                _index.add(turf_id, fields)
+            # Only adopt the new version if nobody else changed the index meanwhile.
+            if _index.version == version - 1:
+                _index.version = version
+
+
+def unindex_turf(turf_id):
+    version = _bump_version()
+    with _index._lock:
+        _index.remove(turf_id)
+        if _index.version == version - 1:
+            _index.version = version
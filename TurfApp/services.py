@@ -0,0 +1,396 @@
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from .models import Booking, BlockRule, PriceHoliday, PriceRule, SlotHold, TurfDayLock, TurfVenue, WaitlistEntry
+from .availability import DayGrid, IntervalIndex
+from .stats import refresh_turf_days
+from .jobs import enqueue, new_job
+from .pricing import PriceTable
+from .live import publish_slots
+
+# -----------------------------------------------------------------------------
+# Booking Services
+# -----------------------------------------------------------------------------
+
+class BookingError(Exception):
+    """Raised when a requested interval cannot be booked; the message is user-facing."""
+
+
+def lock_turf_day(turf, booking_date, bump=True):
+    """
+    Takes the write lock for one turf-day inside the current transaction, and
+    bumps the day's availability version unless `bump` is False (for writers
+    that do not change the cached grid, such as holds).
+
+    It is one upsert, so the first write of a day costs the same as any other.
+    The conflicting UPDATE holds the row lock on Postgres until commit, and on
+    SQLite (run in IMMEDIATE transaction mode) the whole write transaction is
+    already serialized.
+    """
+    step = 1 if bump else 0
+    quote = connection.ops.quote_name
+    table = quote(TurfDayLock._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({quote("turf_id")}, {quote("date")}, {quote("version")}) VALUES (%s, %s, %s) '
+            f'ON CONFLICT ({quote("turf_id")}, {quote("date")}) '
+            f'DO UPDATE SET {quote("version")} = {table}.{quote("version")} + %s',
+            [getattr(turf, 'pk', turf), connection.ops.adapt_datefield_value(booking_date), step, step],
+        )
+
+
+def bump_availability_version(turf_id, booking_date):
+    """
+    Invalidates cached availability for a turf-day after its bookings changed.
+    Days without a lock row fall back to bumping the turf's own version, so this
+    never inserts (it also runs while a turf is being cascade-deleted).
+    """
+    if not TurfDayLock.objects.filter(turf_id=turf_id, date=booking_date).update(version=F('version') + 1):
+        TurfVenue.objects.filter(pk=turf_id).update(version=F('version') + 1)
+
+
+def day_bookings(turf, booking_date):
+    """The slot-occupying bookings of one turf-day."""
+    return Booking.objects.filter(turf=turf, date=booking_date, status__in=Booking.ACTIVE_STATUSES)
+
+
+def load_day_grid(turf, booking_date):
+    """Builds the DayGrid of a turf-day from its slot-occupying bookings."""
+    return DayGrid.for_turf(turf, day_bookings(turf, booking_date).only('start_time', 'end_time'))
+
+
+def load_day_index(turf, booking_date):
+    """Builds the exact IntervalIndex of a turf-day's slot-occupying bookings."""
+    return IntervalIndex.from_bookings(day_bookings(turf, booking_date).only('start_time', 'end_time', 'status'))
+
+
+def day_holds(turf_id, booking_date, exclude_player=None, now=None):
+    """The unexpired holds of one turf-day, optionally leaving out one player's own."""
+    holds = SlotHold.objects.filter(turf_id=turf_id, date=booking_date, expires_at__gt=now or timezone.now())
+    if exclude_player is not None:
+        holds = holds.exclude(player=exclude_player)
+    return holds
+
+
+def quote_price(turf, booking_date, start_time, end_time):
+    """Prices an interval from the turf's compiled price table (see pricing.py)."""
+    return PriceTable(turf).quote(booking_date, start_time, end_time)
+
+
+def create_booking(turf, player, booking_date, start_time, end_time, no_of_players=1):
+    """
+    Books an interval for a player, converting the player's hold on the day (if
+    any) in the same transaction. The payment record, receipt and owner
+    notification are queued as jobs in that transaction too.
+    Raises BookingError if the interval is outside opening hours, already taken
+    or held by another player.
+    """
+    if start_time >= end_time:
+        raise BookingError("The end time must be after the start time.")
+
+    with transaction.atomic():
+        lock_turf_day(turf, booking_date)
+        if not DayGrid(turf.open_time, turf.close_time).fits(start_time, end_time):
+            raise BookingError("Please choose a time within the turf's opening hours.")
+        if load_day_index(turf, booking_date).overlaps(start_time, end_time):
+            raise BookingError("Sorry, that slot has just been booked. Please pick another time.")
+        if overlapping(day_holds(turf.id, booking_date, exclude_player=player), start_time, end_time).exists():
+            raise BookingError(HELD_MESSAGE)
+        SlotHold.objects.filter(turf=turf, player=player, date=booking_date).delete()
+        # The player no longer waits for what they have just booked.
+        overlapping(WaitlistEntry.objects.filter(turf=turf, player=player, date=booking_date), start_time, end_time).delete()
+
+        total_price = quote_price(turf, booking_date, start_time, end_time)
+        booking = Booking.objects.create(
+            turf=turf, player=player, date=booking_date,
+            start_time=start_time, end_time=end_time,
+            total_price=total_price, no_of_players=no_of_players
+        )
+        enqueue(
+            new_job('record_payment', key=f'payment:{booking.id}', booking_id=booking.id),
+            new_job('send_booking_receipt', key=f'receipt:{booking.id}', booking_id=booking.id),
+            new_job('notify_owner', booking_id=booking.id, event='booked'),
+        )
+    return booking
+
+
+# -----------------------------------------------------------------------------
+# Slot Holds
+# -----------------------------------------------------------------------------
+#
+# Picking slots on the booking page holds them for HOLD_SECONDS, so a contested
+# slot is refused when it is picked rather than after the form is filled in.
+# A player has at most one hold per turf-day. Every read ignores expired holds,
+# so the reaper (release_expired_holds) only keeps the table small.
+
+HOLD_SECONDS = 5 * 60
+
+HELD_MESSAGE = "Someone else is booking that slot right now. Please pick another time or try again in a few minutes."
+
+
+def overlapping(queryset, start_time, end_time):
+    """Narrows a queryset of intervals to those overlapping [start_time, end_time)."""
+    return queryset.filter(start_time__lt=end_time, end_time__gt=start_time)
+
+
+def hold_slot(turf, player, booking_date, start_time, end_time, now=None):
+    """
+    Holds an interval for a player, replacing the player's earlier hold on the
+    day. Raises BookingError if it cannot be booked or someone else holds it.
+    """
+    if start_time >= end_time:
+        raise BookingError("The end time must be after the start time.")
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        # Holds are not part of the cached grid, so the day's version stays put.
+        lock_turf_day(turf, booking_date, bump=False)
+        if not DayGrid(turf.open_time, turf.close_time).fits(start_time, end_time):
+            raise BookingError("Please choose a time within the turf's opening hours.")
+        if load_day_index(turf, booking_date).overlaps(start_time, end_time):
+            raise BookingError("Sorry, that slot has just been booked. Please pick another time.")
+        if overlapping(day_holds(turf.id, booking_date, exclude_player=player, now=now), start_time, end_time).exists():
+            raise BookingError(HELD_MESSAGE)
+        SlotHold.objects.filter(turf=turf, player=player, date=booking_date).delete()
+        return SlotHold.objects.create(
+            turf=turf, player=player, date=booking_date, start_time=start_time,
+            end_time=end_time, expires_at=now + timedelta(seconds=HOLD_SECONDS),
+        )
+
+
+def release_hold(player, token):
+    """Gives up one of the player's holds. Returns True if it existed."""
+    return SlotHold.objects.filter(player=player, token=token).delete()[0] > 0
+
+
+def release_expired_holds(now=None):
+    """
+    Deletes every expired hold with one DELETE on the expiry index, and hands
+    the freed turf-days to their waitlists. Returns the count.
+    """
+    expired = SlotHold.objects.filter(expires_at__lte=now or timezone.now())
+    turf_days = set(expired.values_list('turf_id', 'date'))
+    if not turf_days:
+        return 0
+    released = expired.delete()[0]
+    queue_waitlist(turf_days)
+    return released
+
+
+def queue_waitlist(turf_days):
+    """
+    Queues one waitlist pass (see waitlist.py) per turf-day that has waiters.
+    Passes for the same turf-day coalesce until one runs.
+    """
+    turf_days = {(turf_id, day) for turf_id, day in turf_days}
+    if not turf_days:
+        return
+    waiting = set(WaitlistEntry.objects.filter(
+        turf_id__in={turf_id for turf_id, _ in turf_days}, date__in={day for _, day in turf_days},
+    ).values_list('turf_id', 'date').distinct()) & turf_days
+    if waiting:
+        enqueue(*[
+            new_job('promote_waitlist', key=f'waitlist:{turf_id}:{day}', turf_id=turf_id, day=str(day))
+            for turf_id, day in sorted(waiting)
+        ])
+
+
+def cancel_booking(booking):
+    """Cancels a booking and queues the player's and owner's notices."""
+    with transaction.atomic():
+        booking.status = 'Cancelled'
+        booking.save(update_fields=['status'])
+        enqueue(
+            new_job('send_cancellation_notice', key=f'cancelled:{booking.id}', booking_id=booking.id),
+            new_job('notify_owner', booking_id=booking.id, event='cancelled'),
+        )
+
+
+def block_slot(turf, booking_date, start_time, end_time, reason='Maintenance'):
+    """
+    Blocks one interval for the owner. Raises BookingError if it is outside
+    opening hours or overlaps a booking or another block.
+    """
+    if start_time >= end_time:
+        raise BookingError("The end time must be after the start time.")
+
+    with transaction.atomic():
+        lock_turf_day(turf, booking_date)
+        if not DayGrid(turf.open_time, turf.close_time).fits(start_time, end_time):
+            raise BookingError("Please choose a time within the turf's opening hours.")
+        clash = load_day_index(turf, booking_date).first_overlapping(start_time, end_time)
+        if clash is not None:
+            what = 'a block' if clash.status == 'Blocked' else 'a booking'
+            raise BookingError(
+                f"That time overlaps {what} from {clash.start_time:%H:%M} to {clash.end_time:%H:%M}."
+            )
+        return Booking.objects.create(
+            turf=turf, player=None, date=booking_date, start_time=start_time,
+            end_time=end_time, status='Blocked', block_reason=reason,
+        )
+
+# -----------------------------------------------------------------------------
+# Block Rule Services
+# -----------------------------------------------------------------------------
+#
+# A rule is expanded into Blocked bookings with one bulk insert. Per-row signals
+# do not fire for bulk writes, so the turf-day locks (which are also the cache
+# versions) and the owner stats are updated in bulk here instead.
+
+# Longest date range a single block rule may cover.
+MAX_BLOCK_RULE_DAYS = 366
+
+
+def lock_turf_days(turf_id, days):
+    """Takes (and bumps the versions of) the turf-day locks for many days in two queries."""
+    if not days:
+        return
+    TurfDayLock.objects.bulk_create(
+        [TurfDayLock(turf_id=turf_id, date=day) for day in days], ignore_conflicts=True, batch_size=500
+    )
+    TurfDayLock.objects.filter(turf_id=turf_id, date__in=days).update(version=F('version') + 1)
+
+
+def validate_block_rule(rule, turf):
+    """Raises BookingError if the rule cannot be applied to the turf."""
+    if not rule.weekdays:
+        raise BookingError("Pick at least one weekday.")
+    if rule.start_time >= rule.end_time:
+        raise BookingError("The end time must be after the start time.")
+    if rule.end_date < rule.start_date:
+        raise BookingError("The end date must not be before the start date.")
+    if (rule.end_date - rule.start_date).days >= MAX_BLOCK_RULE_DAYS:
+        raise BookingError(f"A recurring block can cover at most {MAX_BLOCK_RULE_DAYS} days.")
+    if not DayGrid(turf.open_time, turf.close_time).fits(rule.start_time, rule.end_time):
+        raise BookingError("Please choose a time within the turf's opening hours.")
+
+
+def apply_block_rule(rule, today=None):
+    """
+    Expands a saved rule into Blocked bookings from today onwards. Dates where a
+    confirmed booking overlaps the interval are skipped and reported; dates with
+    an overlapping block are skipped quietly.
+
+    Returns {'created': int, 'conflicts': [Booking], 'already_blocked': int}.
+    """
+    days = list(rule.dates(start=today or date.today()))
+    result = {'created': 0, 'conflicts': [], 'already_blocked': 0}
+    if not days:
+        return result
+
+    with transaction.atomic():
+        lock_turf_days(rule.turf_id, days)
+        overlapping = Booking.objects.filter(
+            turf_id=rule.turf_id, date__in=days, status__in=Booking.ACTIVE_STATUSES,
+            start_time__lt=rule.end_time, end_time__gt=rule.start_time,
+        ).select_related('player').order_by('date', 'start_time')
+        skipped = set()
+        for booking in overlapping:
+            if booking.status == 'Blocked':
+                result['already_blocked'] += booking.date not in skipped
+            else:
+                result['conflicts'].append(booking)
+            skipped.add(booking.date)
+
+        blocks = [
+            Booking(
+                turf_id=rule.turf_id, player=None, date=day, start_time=rule.start_time,
+                end_time=rule.end_time, status='Blocked', block_reason=rule.reason, block_rule=rule,
+            )
+            for day in days if day not in skipped
+        ]
+        Booking.objects.bulk_create(blocks, batch_size=500)
+        refresh_turf_days(rule.turf_id, [block.date for block in blocks])
+        publish_slots(rule.turf_id, [block.date for block in blocks], rule.start_time, rule.end_time, free=False)
+    result['created'] = len(blocks)
+    return result
+
+
+def create_block_rule(turf, **fields):
+    """Validates, saves and applies a new rule. Returns (rule, apply_block_rule result)."""
+    rule = BlockRule(turf=turf, **fields)
+    validate_block_rule(rule, turf)
+    with transaction.atomic():
+        rule.save()
+        result = apply_block_rule(rule)
+    return rule, result
+
+
+def remove_block_rule(rule, today=None):
+    """
+    Unblocks every upcoming slot created by a rule and deletes the rule. Past
+    blocks stay as history, detached from the rule. Returns the number unblocked.
+    """
+    with transaction.atomic():
+        blocks = Booking.objects.filter(block_rule=rule, status='Blocked', date__gte=today or date.today())
+        slots = set(blocks.values_list('date', 'start_time', 'end_time'))
+        days = sorted({day for day, _, _ in slots})
+        lock_turf_days(rule.turf_id, days)
+        # A plain delete would run the per-row signals for every block; the locks,
+        # stats and live pages are updated in bulk instead. Blocks have no dependent rows.
+        removed = blocks._raw_delete(blocks.db)
+        refresh_turf_days(rule.turf_id, days)
+        intervals = defaultdict(list)
+        for day, start_time, end_time in sorted(slots):
+            intervals[start_time, end_time].append(day)
+        for (start_time, end_time), interval_days in intervals.items():
+            publish_slots(rule.turf_id, interval_days, start_time, end_time, free=True)
+        queue_waitlist((rule.turf_id, day) for day in days)
+        rule.delete()
+    return removed
+
+# -----------------------------------------------------------------------------
+# Pricing Services
+# -----------------------------------------------------------------------------
+# Saving or deleting a rule or holiday recompiles the turf's price table through
+# the signals in signals.py, so admin edits are covered too.
+
+MIN_PRICE_MULTIPLIER = Decimal('0.10')
+MAX_PRICE_MULTIPLIER = Decimal('10.00')
+
+
+def parse_multiplier(value):
+    """Returns a multiplier as a Decimal; raises BookingError if it is out of range."""
+    try:
+        multiplier = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise BookingError("Please enter the price multiplier as a number, e.g. 1.25.")
+    if not MIN_PRICE_MULTIPLIER <= multiplier <= MAX_PRICE_MULTIPLIER:
+        raise BookingError(f"The multiplier must be between {MIN_PRICE_MULTIPLIER} and {MAX_PRICE_MULTIPLIER}.")
+    return multiplier
+
+
+def create_price_rule(turf, weekdays, start_time, end_time, multiplier, label='Peak hours'):
+    """Validates and saves a price rule. Raises BookingError for invalid input."""
+    if not weekdays:
+        raise BookingError("Pick at least one weekday.")
+    if start_time >= end_time:
+        raise BookingError("The end time must be after the start time.")
+    return PriceRule.objects.create(
+        turf=turf, weekdays=weekdays, start_time=start_time, end_time=end_time,
+        multiplier=parse_multiplier(multiplier), label=label,
+    )
+
+
+def set_price_holiday(turf, day, priced_as=6, label='Holiday'):
+    """Prices a date like another weekday, replacing any earlier holiday on that date."""
+    if day < date.today():
+        raise BookingError("Holidays can only be set for today or later.")
+    if priced_as not in range(7):
+        raise BookingError("Pick the weekday whose prices should apply.")
+    holiday, _ = PriceHoliday.objects.update_or_create(
+        turf=turf, date=day, defaults={'priced_as': priced_as, 'label': label},
+    )
+    return holiday
+
+
+def set_surge_multiplier(turf, multiplier):
+    """Changes the demand surge of a turf; 1 switches surge pricing off."""
+    multiplier = parse_multiplier(multiplier)
+    if multiplier < 1:
+        raise BookingError("The surge multiplier cannot be below 1.")
+    turf.surge_multiplier = multiplier
+    turf.save(update_fields=['surge_multiplier'])
@@ -0,0 +1,202 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import TurfVenue, Amenity, Booking, PriceHoliday, PriceRule, Rating, Transaction
+from .services import bump_availability_version, queue_waitlist
+from .stats import apply_rating_delta, bump_owner_stats_on_commit
+from .jobs import enqueue, new_job
+from .search_index import invalidate_index, reindex_turfs, unindex_turf
+from .pricing import refresh_price_table
+from .live import publish_slots
+
+# -----------------------------------------------------------------------------
+# Stats Maintenance Signals
+# -----------------------------------------------------------------------------
+# Day stats are refreshed by a background job; queued refreshes of the same
+# turf-day are coalesced through the job's idempotency key.
+
+def queue_day_stats(turf_id, day):
+    enqueue(new_job('refresh_day_stats', key=f'stats:{turf_id}:{day}', turf_id=turf_id, day=str(day)))
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_day(sender, instance, **kwargs):
+    """Remembers the turf-day and slot a booking is moving away from, if it is being edited."""
+    instance._previous_day = instance._previous_slot = None
+    if instance.pk:
+        previous = Booking.objects.filter(pk=instance.pk).values_list(
+            'turf_id', 'date', 'start_time', 'end_time', 'status',
+        ).first()
+        if previous:
+            instance._previous_day = previous[:2]
+            instance._previous_slot = previous
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    queue_day_stats(instance.turf_id, instance.date)
+    previous = getattr(instance, '_previous_day', None)
+    if previous and previous != (instance.turf_id, instance.date):
+        queue_day_stats(*previous)
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def rating_changed(sender, instance, **kwargs):
+    booking_day = Booking.objects.filter(pk=instance.booking_id).values_list('date', flat=True).first()
+    if booking_day:
+        queue_day_stats(instance.turf_id, booking_day)
+
+@receiver(pre_save, sender=Rating)
+def remember_rating(sender, instance, **kwargs):
+    """Remembers the (turf, score) a rating is being edited from."""
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = Rating.objects.filter(pk=instance.pk).values_list('turf_id', 'score').first()
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        apply_rating_delta(instance.turf_id, instance.score, 1)
+        enqueue(new_job('notify_owner', key=f'rated:{instance.booking_id}', booking_id=instance.booking_id, event='rated'))
+    elif previous[0] != instance.turf_id:
+        apply_rating_delta(previous[0], -previous[1], -1)
+        apply_rating_delta(instance.turf_id, instance.score, 1)
+    else:
+        apply_rating_delta(instance.turf_id, instance.score - previous[1], 0)
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, **kwargs):
+    apply_rating_delta(instance.turf_id, -instance.score, -1)
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def transaction_changed(sender, instance, **kwargs):
+    booking_day = Booking.objects.filter(pk=instance.booking_id).values_list('turf_id', 'date').first()
+    if booking_day:
+        queue_day_stats(*booking_day)
+
+@receiver(post_save, sender=TurfVenue)
+def turf_changed(sender, instance, **kwargs):
+    # Opening hours feed the occupancy figures.
+    bump_owner_stats_on_commit(instance.owner_id)
+
+# -----------------------------------------------------------------------------
+# Search Index Signals
+# -----------------------------------------------------------------------------
+
+@receiver(post_save, sender=TurfVenue)
+def index_turf(sender, instance, **kwargs):
+    turf_id = instance.pk
+    transaction.on_commit(lambda: reindex_turfs([turf_id]))
+
+@receiver(post_delete, sender=TurfVenue)
+def unindex_deleted_turf(sender, instance, **kwargs):
+    turf_id = instance.pk
+    transaction.on_commit(lambda: unindex_turf(turf_id))
+
+@receiver(m2m_changed, sender=TurfVenue.amenities.through)
+def index_turf_amenities(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # An amenity's turfs changed; pk_set holds turf ids (None on clear).
+        if pk_set is None:
+            transaction.on_commit(invalidate_index)
+            return
+        turf_ids = list(pk_set)
+    else:
+        turf_ids = [instance.pk]
+    transaction.on_commit(lambda: reindex_turfs(turf_ids))
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def amenity_changed(sender, instance, **kwargs):
+    # Renames and deletes are rare; let every process rebuild lazily.
+    transaction.on_commit(invalidate_index)
+
+# -----------------------------------------------------------------------------
+# Availability Cache Signals
+# -----------------------------------------------------------------------------
+# Versions are bumped inside the writing transaction, so a reader can never pair
+# the new version with the old bookings (see slot_cache.py).
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_booking_day(sender, instance, **kwargs):
+    bump_availability_version(instance.turf_id, instance.date)
+    previous = getattr(instance, '_previous_day', None)
+    if previous and previous != (instance.turf_id, instance.date):
+        bump_availability_version(*previous)
+
+@receiver(post_save, sender=TurfVenue)
+def invalidate_turf(sender, instance, **kwargs):
+    # Opening hours and prices feed every cached day of the turf.
+    TurfVenue.objects.filter(pk=instance.pk).update(version=F('version') + 1)
+
+# -----------------------------------------------------------------------------
+# Price Table Signals
+# -----------------------------------------------------------------------------
+# The compiled table is rebuilt in the same transaction as the pricing change.
+
+@receiver(post_save, sender=PriceRule)
+@receiver(post_delete, sender=PriceRule)
+@receiver(post_save, sender=PriceHoliday)
+@receiver(post_delete, sender=PriceHoliday)
+def pricing_changed(sender, instance, **kwargs):
+    refresh_price_table(instance.turf_id)
+
+@receiver(post_save, sender=TurfVenue)
+def turf_pricing_changed(sender, instance, created, update_fields=None, **kwargs):
+    # The surge multiplier is an input to the table; nothing else about a new turf is.
+    if not created and (update_fields is None or 'surge_multiplier' in update_fields):
+        refresh_price_table(instance.pk)
+
+# -----------------------------------------------------------------------------
+# Live Availability Signals
+# -----------------------------------------------------------------------------
+# Published on commit (see live.py). Bulk block rule writes publish from the
+# services instead.
+
+def occupied_slot(turf_id, day, start_time, end_time, status):
+    """(turf_id, date, start, end) of a slot-occupying booking, else None."""
+    return (turf_id, day, start_time, end_time) if status in Booking.ACTIVE_STATUSES else None
+
+def slot_change(instance):
+    """(slot freed, slot taken) by a booking save, each an occupied_slot() or None."""
+    previous = getattr(instance, '_previous_slot', None)
+    before = occupied_slot(*previous) if previous else None
+    after = occupied_slot(instance.turf_id, instance.date, instance.start_time, instance.end_time, instance.status)
+    return (None, None) if before == after else (before, after)
+
+@receiver(post_save, sender=Booking)
+def publish_booking_saved(sender, instance, **kwargs):
+    freed, taken = slot_change(instance)
+    if freed:
+        turf_id, day, start_time, end_time = freed
+        publish_slots(turf_id, [day], start_time, end_time, free=True)
+    if taken:
+        turf_id, day, start_time, end_time = taken
+        publish_slots(turf_id, [day], start_time, end_time, free=False)
+
+@receiver(post_delete, sender=Booking)
+def publish_booking_deleted(sender, instance, **kwargs):
+    if instance.status in Booking.ACTIVE_STATUSES:
+        publish_slots(instance.turf_id, [instance.date], instance.start_time, instance.end_time, free=True)
+
+# -----------------------------------------------------------------------------
+# Waitlist Signals
+# -----------------------------------------------------------------------------
+# Freed time is offered to the turf-day's waiters by a queued pass (see
+# waitlist.py). Bulk unblocks and expired holds queue it from the services.
+
+@receiver(post_save, sender=Booking)
+def booking_freed_time(sender, instance, **kwargs):
+    freed, _ = slot_change(instance)
+    if freed:
+        queue_waitlist([freed[:2]])
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted_freed_time(sender, instance, **kwargs):
+    if instance.status in Booking.ACTIVE_STATUSES:
+        queue_waitlist([(instance.turf_id, instance.date)])
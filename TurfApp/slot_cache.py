@@ -0,0 +1,191 @@
+import pickle
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db.models import OuterRef, Subquery
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .models import TurfVenue, TurfDayLock
+from .services import load_day_grid
+
+# -----------------------------------------------------------------------------
+# Availability Cache
+# -----------------------------------------------------------------------------
+#
+# Caches a turf and its DayGrid for one date under (turf_id, date, turf version,
+# day version). TurfVenue.version is bumped on every turf edit and
+# TurfDayLock.version on every booking write (see signals.py), both in the
+# same transaction as the change. Readers fetch the two versions in one
+# indexed query before touching the cache, so stale entries are never read.
+# They simply age out of the backend.
+#
+# The backend is chosen by settings.TURF_SLOT_CACHE. LRUBackend keeps entries
+# in process memory. DjangoCacheBackend stores them in any configured Django
+# cache, such as FileBasedCache or RedisCache, so processes can share them.
+# Both hand every reader its own copy: the turf and grid are mutable model and
+# bitmask objects, and requests on other threads must never see each other's
+# changes to them.
+
+MISSING = object()
+
+DEFAULT_CONFIG = {
+    'BACKEND': 'TurfApp.slot_cache.LRUBackend',
+    'OPTIONS': {'max_entries': 4096},
+}
+
+
+class LRUBackend:
+    """
+    Thread-safe in-process store that evicts the least recently used entry.
+    Values are kept pickled, like Django's LocMemCache, so each get() returns
+    a fresh copy.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key, MISSING)
+            if value is MISSING:
+                return MISSING
+            self._entries.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DjangoCacheBackend:
+    """Stores entries in one of the CACHES aliases (file-based, Redis, memcached...)."""
+
+    def __init__(self, alias='default', timeout=60 * 60, key_prefix='turf-slots'):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.evictions = None  # Left to the cache server.
+
+    def _key(self, key):
+        return ':'.join([self.key_prefix, *map(str, key)])
+
+    def get(self, key):
+        return caches[self.alias].get(self._key(key), MISSING)
+
+    def set(self, key, value):
+        caches[self.alias].set(self._key(key), value, self.timeout)
+
+    def clear(self):
+        # Entries expire on their own; clearing the shared cache would drop unrelated keys.
+        pass
+
+
+class SlotCache:
+    """A backend plus hit/miss counters."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, compute):
+        value = self.backend.get(key)
+        if value is not MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        self.backend.set(key, value)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.backend.evictions,
+            'entries': len(self.backend) if hasattr(self.backend, '__len__') else None,
+        }
+
+
+_slot_cache = None
+_slot_cache_lock = threading.Lock()
+
+
+def slot_cache():
+    """Returns the process-wide SlotCache configured by settings.TURF_SLOT_CACHE."""
+    global _slot_cache
+    if _slot_cache is None:
+        with _slot_cache_lock:
+            if _slot_cache is None:
+                config = getattr(settings, 'TURF_SLOT_CACHE', DEFAULT_CONFIG)
+                backend = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+                _slot_cache = SlotCache(backend)
+    return _slot_cache
+
+
+@receiver(setting_changed)
+def _reset_slot_cache(setting, **kwargs):
+    global _slot_cache
+    if setting == 'TURF_SLOT_CACHE':
+        _slot_cache = None
+
+
+def availability_version(turf_id, day):
+    """Returns (turf version, day version) in one query, or None if the turf does not exist."""
+    day_version = TurfDayLock.objects.filter(turf_id=OuterRef('pk'), date=day).values('version')[:1]
+    row = (TurfVenue.objects.filter(pk=turf_id)
+           .annotate(day_version=Subquery(day_version))
+           .values_list('version', 'day_version')
+           .first())
+    if row is None:
+        return None
+    return row[0], row[1] or 0
+
+
+def cached_turf_day(turf_id, day, versions=None):
+    """
+    Returns (turf, grid) for one turf-day, from the cache when both versions
+    still match. Pass `versions` if availability_version() was already called.
+    Returns None if the turf does not exist.
+    """
+    versions = versions or availability_version(turf_id, day)
+    if versions is None:
+        return None
+
+    def load():
+        turf = TurfVenue.objects.get(pk=turf_id)
+        return turf, load_day_grid(turf, day)
+
+    try:
+        return slot_cache().get_or_set(('turf-day', turf_id, day.isoformat(), *versions), load)
+    except TurfVenue.DoesNotExist:
+        # Deleted between the version check and the load.
+        return None
@@ -0,0 +1,228 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum, Value
+from .models import TurfVenue, Booking, Rating, Transaction, OwnerDayStats
+from .availability import to_minutes
+
+# -----------------------------------------------------------------------------
+# Owner Dashboard Statistics
+# -----------------------------------------------------------------------------
+
+# Bookings that count towards sales figures. 'Completed' is a Confirmed booking
+# whose time has passed, so it keeps contributing once it transitions.
+SOLD_STATUSES = ('Confirmed', 'Completed')
+
+# Cache key holding a per-owner counter; analytics results are cached under it.
+OWNER_VERSION_KEY = 'owner-stats-version:{}'
+
+
+def owner_stats_version(owner_id):
+    return cache.get_or_set(OWNER_VERSION_KEY.format(owner_id), 1, timeout=None)
+
+
+def bump_owner_stats_version(owner_id):
+    """Invalidates every cached analytics result for an owner."""
+    key = OWNER_VERSION_KEY.format(owner_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def bump_owner_stats_on_commit(*owner_ids):
+    """
+    Bumps the owners' stats versions once the current transaction commits. A
+    report built from the old rows in the meantime would otherwise be cached
+    under the new version and outlive the change.
+    """
+    def bump():
+        for owner_id in set(owner_ids):
+            bump_owner_stats_version(owner_id)
+    transaction.on_commit(bump)
+
+
+def _interval_minutes(intervals):
+    # An end of 00:00 is midnight.
+    return sum(max(0, (to_minutes(end) or 24 * 60) - to_minutes(start)) for start, end in intervals)
+
+
+def _is_empty(values):
+    return not any(values.values())
+
+
+def refresh_day_stats(turf_id, day):
+    """
+    Recomputes the stats row for one turf-day from its bookings, ratings and
+    transactions. Every query is bounded by the (turf, date) index.
+    """
+    owner_id = TurfVenue.objects.filter(pk=turf_id).values_list('owner_id', flat=True).first()
+    if owner_id is None:
+        return
+
+    sold = Booking.objects.filter(turf_id=turf_id, date=day, status__in=SOLD_STATUSES).aggregate(
+        count=Count('id'), revenue=Sum('total_price')
+    )
+    ratings = Rating.objects.filter(turf_id=turf_id, booking__date=day).aggregate(
+        total=Sum('score'), count=Count('id')
+    )
+    collected = Transaction.objects.filter(
+        booking__turf_id=turf_id, booking__date=day, status='Completed'
+    ).aggregate(total=Sum('amount'))['total']
+    booked = Booking.objects.filter(turf_id=turf_id, date=day, status__in=SOLD_STATUSES).values_list('start_time', 'end_time')
+    blocked = Booking.objects.filter(turf_id=turf_id, date=day, status='Blocked').values_list('start_time', 'end_time')
+
+    values = {
+        'bookings': sold['count'],
+        'revenue': sold['revenue'] or Decimal('0'),
+        'collected': collected or Decimal('0'),
+        'booked_minutes': _interval_minutes(booked),
+        'blocked_minutes': _interval_minutes(blocked),
+        'rating_sum': ratings['total'] or 0,
+        'rating_count': ratings['count'],
+    }
+
+    if _is_empty(values):
+        OwnerDayStats.objects.filter(turf_id=turf_id, date=day).delete()
+    else:
+        OwnerDayStats.objects.update_or_create(
+            turf_id=turf_id, date=day, defaults={'owner_id': owner_id, **values}
+        )
+    bump_owner_stats_on_commit(owner_id)
+
+
+def _empty_stats():
+    return {
+        'bookings': 0, 'revenue': Decimal('0'), 'collected': Decimal('0'),
+        'booked_minutes': 0, 'blocked_minutes': 0, 'rating_sum': 0, 'rating_count': 0,
+    }
+
+
+def _collect_stats(**booking_filter):
+    """
+    Computes stats rows keyed by (turf_id, date) with one grouped query per
+    source table, for the bookings matching `booking_filter`.
+    """
+    rows = defaultdict(_empty_stats)
+    related_filter = {f'booking__{key}': value for key, value in booking_filter.items()}
+    bookings = Booking.objects.filter(**booking_filter)
+
+    sold = (bookings.filter(status__in=SOLD_STATUSES)
+            .values('turf_id', 'date').annotate(count=Count('id'), revenue=Sum('total_price')).order_by())
+    for row in sold.iterator():
+        stats = rows[row['turf_id'], row['date']]
+        stats['bookings'] = row['count']
+        stats['revenue'] = row['revenue'] or Decimal('0')
+
+    collected = (Transaction.objects.filter(status='Completed', **related_filter)
+                 .values('booking__turf_id', 'booking__date').annotate(total=Sum('amount')).order_by())
+    for row in collected.iterator():
+        rows[row['booking__turf_id'], row['booking__date']]['collected'] = row['total'] or Decimal('0')
+
+    ratings = (Rating.objects.filter(**related_filter).values('turf_id', 'booking__date')
+               .annotate(total=Sum('score'), count=Count('id')).order_by())
+    for row in ratings.iterator():
+        stats = rows[row['turf_id'], row['booking__date']]
+        stats['rating_sum'] = row['total'] or 0
+        stats['rating_count'] = row['count']
+
+    # Durations are summed per distinct (start, end) pair, so the database returns
+    # one row per interval shape rather than one per booking.
+    for status_filter, field in ((Q(status__in=SOLD_STATUSES), 'booked_minutes'), (Q(status='Blocked'), 'blocked_minutes')):
+        intervals = (bookings.filter(status_filter)
+                     .values_list('turf_id', 'date', 'start_time', 'end_time').annotate(count=Count('id')).order_by())
+        for turf_id, day, start_time, end_time, count in intervals.iterator():
+            rows[turf_id, day][field] += _interval_minutes([(start_time, end_time)]) * count
+    return rows
+
+
+def rebuild_all_stats(batch_size=1000):
+    """
+    Rebuilds the whole stats table with one grouped query per source table.
+    Returns the number of rows written.
+    """
+    rows = _collect_stats()
+    owners = dict(TurfVenue.objects.values_list('id', 'owner_id'))
+    objects = [
+        OwnerDayStats(owner_id=owners[turf_id], turf_id=turf_id, date=day, **values)
+        for (turf_id, day), values in rows.items()
+        if turf_id in owners and not _is_empty(values)
+    ]
+
+    with transaction.atomic():
+        OwnerDayStats.objects.all().delete()
+        OwnerDayStats.objects.bulk_create(objects, batch_size=batch_size)
+        bump_owner_stats_on_commit(*owners.values())
+    return len(objects)
+
+
+def refresh_turf_days(turf_id, days, batch_size=1000):
+    """
+    Recomputes the stats rows of many days of one turf at once, for bulk writes
+    that bypass the per-row signals.
+    """
+    owner_id = TurfVenue.objects.filter(pk=turf_id).values_list('owner_id', flat=True).first()
+    days = sorted(set(days))
+    if owner_id is None or not days:
+        return
+    rows = _collect_stats(turf_id=turf_id, date__in=days)
+    objects = [
+        OwnerDayStats(owner_id=owner_id, turf_id=turf_id, date=day, **rows[turf_id, day])
+        for day in days
+        if not _is_empty(rows[turf_id, day])
+    ]
+    with transaction.atomic():
+        OwnerDayStats.objects.filter(turf_id=turf_id, date__in=days).exclude(
+            date__in=[row.date for row in objects]
+        ).delete()
+        OwnerDayStats.objects.bulk_create(
+            objects, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['turf', 'date'], update_fields=list(_empty_stats()) + ['owner'],
+        )
+        bump_owner_stats_on_commit(owner_id)
+
+
+# -----------------------------------------------------------------------------
+# Turf Rating Aggregates
+# -----------------------------------------------------------------------------
+
+def apply_rating_delta(turf_id, score_delta, count_delta):
+    """
+    Shifts a turf's denormalized rating totals in a single UPDATE, so concurrent
+    ratings never overwrite each other's contribution.
+    """
+    if not score_delta and not count_delta:
+        return
+    prior_weight = TurfVenue.RATING_PRIOR_WEIGHT
+    new_sum = F('rating_sum') + score_delta
+    new_count = F('rating_count') + count_delta
+    TurfVenue.objects.filter(pk=turf_id).update(
+        rating_sum=new_sum,
+        rating_count=new_count,
+        rating_score=ExpressionWrapper(
+            (Value(prior_weight * TurfVenue.RATING_PRIOR_MEAN) + new_sum) / (Value(float(prior_weight)) + new_count),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def reconcile_turf_ratings(dry_run=False, batch_size=500):
+    """
+    Recomputes every turf's rating totals with one grouped query and fixes any
+    drift from the signal-maintained values. Returns the list of drifted turf ids.
+    """
+    totals = {
+        row['turf_id']: (row['total'] or 0, row['count'])
+        for row in Rating.objects.values('turf_id').annotate(total=Sum('score'), count=Count('id')).order_by()
+    }
+    drifted = []
+    for turf in TurfVenue.objects.only('id', 'rating_sum', 'rating_count', 'rating_score').iterator():
+        rating_sum, rating_count = totals.get(turf.id, (0, 0))
+        rating_score = TurfVenue.bayesian_rating(rating_sum, rating_count)
+        if (turf.rating_sum, turf.rating_count) != (rating_sum, rating_count) or abs(turf.rating_score - rating_score) > 1e-9:
+            turf.rating_sum, turf.rating_count, turf.rating_score = rating_sum, rating_count, rating_score
+            drifted.append(turf)
+    if drifted and not dry_run:
+        TurfVenue.objects.bulk_update(drifted, ['rating_sum', 'rating_count', 'rating_score'], batch_size=batch_size)
+    return [turf.id for turf in drifted]
@@ -0,0 +1,239 @@
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Q
+from .models import TurfUser, TurfVenue, TurfDayLock, Amenity, Booking, Rating, Transaction, OwnerDayStats
+from .availability import from_minutes, to_minutes
+from .stats import rebuild_all_stats, reconcile_turf_ratings
+from .search_index import invalidate_index
+
+# -----------------------------------------------------------------------------
+# Synthetic Data Generator
+# -----------------------------------------------------------------------------
+#
+# Builds a realistic dataset for load tests: owners with several turfs each,
+# a pool of players, and per-turf-day bookings that never overlap, plus their
+# transactions and ratings. Everything is written with bulk_create in batches
+# and streamed turf by turf, so memory stays flat at millions of bookings. The
+# same seed always produces the same data. Signals do not fire for bulk
+# inserts, so the derived tables are rebuilt once at the end.
+
+# Every generated account uses this e-mail domain, so the data can be cleared.
+SYNTHETIC_DOMAIN = 'bench.turf.local'
+
+SPORTS = ('football', 'cricket', 'badminton', 'tennis')
+CITIES = ('Kochi', 'Calicut', 'Trivandrum', 'Thrissur', 'Kannur', 'Kollam', 'Palakkad', 'Bengaluru', 'Chennai', 'Mumbai')
+NAME_WORDS = ('Arena', 'Ground', 'Sports Hub', 'Turf', 'Field', 'Park', 'Dome', 'Club')
+NAME_PREFIXES = ('Green', 'Victory', 'Champions', 'Royal', 'City', 'Star', 'Urban', 'Galaxy', 'Prime', 'Golden')
+AMENITIES = ('Parking', 'Floodlights', 'Changing Room', 'Drinking Water', 'Washroom', 'Cafeteria', 'First Aid')
+COMMENTS = ('Great pitch', 'Well maintained', 'Good lighting', 'Could be cleaner', 'Friendly staff', '')
+DURATIONS = (60, 60, 90, 120)
+
+
+class SyntheticDataGenerator:
+    """
+    Generates synthetic owners, turfs, players and bookings.
+
+    `bookings_per_day` is the average number of bookings per turf per day; the
+    actual count varies around it and is capped by the opening hours.
+    """
+    def __init__(self, owners=50, turfs_per_owner=2, players=500, days_back=60, days_ahead=14,
+                 bookings_per_day=6, rating_rate=0.3, seed=42, batch_size=5000, stdout=None):
+        self.owners = owners
+        self.turfs_per_owner = turfs_per_owner
+        self.players = players
+        self.days_back = days_back
+        self.days_ahead = days_ahead
+        self.bookings_per_day = bookings_per_day
+        self.rating_rate = rating_rate
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.stdout = stdout
+        self.counts = {'owners': 0, 'players': 0, 'turfs': 0, 'bookings': 0, 'transactions': 0, 'ratings': 0}
+
+    def _log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    # --- Users and Turfs ---
+
+    def _create_users(self, role, count):
+        # Hashing is slow; every synthetic account shares one unusable password.
+        password = make_password(None)
+        # Continue numbering after earlier runs so usernames stay unique.
+        offset = TurfUser.objects.filter(role=role, username__endswith=f'@{SYNTHETIC_DOMAIN}').count()
+        created = []
+        for first in range(offset, offset + count, self.batch_size):
+            users = [
+                TurfUser(
+                    username=f'{role}{i}@{SYNTHETIC_DOMAIN}', email=f'{role}{i}@{SYNTHETIC_DOMAIN}',
+                    name=f'{role.title()} {i}', role=role, password=password,
+                    phone=f'9{self.random.randrange(10 ** 9):09d}',
+                )
+                for i in range(first, min(first + self.batch_size, offset + count))
+            ]
+            created += TurfUser.objects.bulk_create(users, batch_size=self.batch_size)
+        self.counts[f'{role}s'] += len(created)
+        return [user.id for user in created]
+
+    def _create_turfs(self, owner_ids):
+        amenities = [Amenity.objects.get_or_create(name=name)[0].id for name in AMENITIES]
+        Through = TurfVenue.amenities.through
+        turf_ids = []
+        pending = []
+
+        def flush():
+            created = TurfVenue.objects.bulk_create(pending, batch_size=self.batch_size)
+            links = [
+                Through(turfvenue_id=turf.id, amenity_id=amenity_id)
+                for turf in created
+                for amenity_id in self.random.sample(amenities, self.random.randint(1, 4))
+            ]
+            Through.objects.bulk_create(links, batch_size=self.batch_size)
+            turf_ids.extend(turf.id for turf in created)
+            pending.clear()
+
+        for owner_id in owner_ids:
+            for _ in range(self.turfs_per_owner):
+                open_hour = self.random.choice((5, 6, 7, 8))
+                close_hour = self.random.choice((21, 22, 23))
+                city = self.random.choice(CITIES)
+                pending.append(TurfVenue(
+                    owner_id=owner_id,
+                    name=f'{self.random.choice(NAME_PREFIXES)} {self.random.choice(NAME_WORDS)} {city}',
+                    location=f'{self.random.choice(("MG Road", "Beach Road", "Bypass", "Market", "Stadium Road"))}, {city}',
+                    sports_type=self.random.choice(SPORTS),
+                    price_per_hour=Decimal(self.random.randrange(400, 2500, 50)),
+                    no_of_players=self.random.choice((10, 12, 14, 22)),
+                    open_time=time(open_hour), close_time=time(close_hour),
+                    description=f'Synthetic {city} venue for load testing.',
+                ))
+                if len(pending) >= self.batch_size:
+                    flush()
+        if pending:
+            flush()
+        self.counts['turfs'] += len(turf_ids)
+        return turf_ids
+
+    # --- Bookings ---
+
+    def _day_intervals(self, open_minute, close_minute):
+        """Returns non-overlapping (start, end) minute pairs for one turf-day."""
+        wanted = max(0, round(self.random.gauss(self.bookings_per_day, self.bookings_per_day / 3)))
+        intervals = []
+        cursor = open_minute
+        while len(intervals) < wanted and cursor < close_minute:
+            cursor += self.random.choice((0, 0, 30, 60))
+            duration = self.random.choice(DURATIONS)
+            if cursor + duration > close_minute:
+                break
+            intervals.append((cursor, cursor + duration))
+            cursor += duration
+        return intervals
+
+    def _bookings_for_turf(self, turf, player_ids, today):
+        open_minute, close_minute = to_minutes(turf.open_time), to_minutes(turf.close_time)
+        for offset in range(-self.days_back, self.days_ahead + 1):
+            day = today + timedelta(days=offset)
+            for start, end in self._day_intervals(open_minute, close_minute):
+                roll = self.random.random()
+                if roll < 0.05:
+                    yield Booking(
+                        turf_id=turf.id, player=None, date=day, start_time=from_minutes(start),
+                        end_time=from_minutes(end), status='Blocked', block_reason='Maintenance',
+                    )
+                    continue
+                if roll < 0.15:
+                    status = 'Cancelled'
+                else:
+                    status = 'Completed' if offset < 0 else 'Confirmed'
+                yield Booking(
+                    turf_id=turf.id, player_id=self.random.choice(player_ids), date=day,
+                    start_time=from_minutes(start), end_time=from_minutes(end),
+                    no_of_players=self.random.randint(6, turf.no_of_players or 10), status=status,
+                    total_price=(turf.price_per_hour * (end - start) / 60).quantize(Decimal('0.01')),
+                )
+
+    def _flush_bookings(self, bookings):
+        created = Booking.objects.bulk_create(bookings, batch_size=self.batch_size)
+        transactions, ratings = [], []
+        for booking in created:
+            if booking.status == 'Blocked':
+                continue
+            transactions.append(Transaction(
+                booking_id=booking.id, amount=booking.total_price,
+                status='Failed' if booking.status == 'Cancelled' else 'Completed',
+            ))
+            if booking.status == 'Completed' and self.random.random() < self.rating_rate:
+                ratings.append(Rating(
+                    booking_id=booking.id, player_id=booking.player_id, turf_id=booking.turf_id,
+                    score=self.random.choices((1, 2, 3, 4, 5), weights=(1, 2, 5, 9, 7))[0],
+                    comment=self.random.choice(COMMENTS),
+                ))
+        Transaction.objects.bulk_create(transactions, batch_size=self.batch_size)
+        Rating.objects.bulk_create(ratings, batch_size=self.batch_size)
+        self.counts['bookings'] += len(created)
+        self.counts['transactions'] += len(transactions)
+        self.counts['ratings'] += len(ratings)
+
+    def _create_bookings(self, turf_ids, player_ids):
+        today = date.today()
+        pending = []
+        turfs = TurfVenue.objects.filter(id__in=turf_ids).only('id', 'open_time', 'close_time', 'price_per_hour', 'no_of_players')
+        for turf in turfs.iterator(chunk_size=1000):
+            pending.extend(self._bookings_for_turf(turf, player_ids, today))
+            if len(pending) >= self.batch_size:
+                with transaction.atomic():
+                    self._flush_bookings(pending)
+                pending = []
+                self._log(f"  {self.counts['bookings']} bookings...")
+        if pending:
+            with transaction.atomic():
+                self._flush_bookings(pending)
+
+    # --- Entry Points ---
+
+    def generate(self):
+        """Writes the dataset and rebuilds the derived tables. Returns the row counts."""
+        with transaction.atomic():
+            owner_ids = self._create_users(TurfUser.Role.OWNER, self.owners)
+            player_ids = self._create_users(TurfUser.Role.PLAYER, self.players)
+            turf_ids = self._create_turfs(owner_ids)
+        self._log(f"Created {len(owner_ids)} owners, {len(player_ids)} players and {len(turf_ids)} turfs.")
+        if player_ids:
+            self._create_bookings(turf_ids, player_ids)
+
+        self._log("Rebuilding owner stats, turf ratings and the search index...")
+        rebuild_all_stats(batch_size=self.batch_size)
+        reconcile_turf_ratings(batch_size=self.batch_size)
+        invalidate_index()
+        return self.counts
+
+
+def clear_synthetic_data():
+    """
+    Deletes every synthetic account with its turfs and bookings. The bulk tables
+    are emptied with raw deletes, since per-row signals would only recompute
+    stats that are rebuilt once at the end anyway. Returns the bookings deleted.
+    """
+    users = TurfUser.objects.filter(username__endswith=f'@{SYNTHETIC_DOMAIN}')
+    turfs = TurfVenue.objects.filter(owner__in=users)
+    bookings = Booking.objects.filter(Q(turf__in=turfs) | Q(player__in=users))
+    with transaction.atomic():
+        for queryset in (
+            Rating.objects.filter(booking__in=bookings),
+            Transaction.objects.filter(booking__in=bookings),
+            OwnerDayStats.objects.filter(turf__in=turfs),
+            TurfDayLock.objects.filter(turf__in=turfs),
+            TurfVenue.amenities.through.objects.filter(turfvenue__in=turfs),
+        ):
+            queryset._raw_delete(queryset.db)
+        deleted = bookings._raw_delete(bookings.db)
+        turfs.delete()
+        users.delete()
+    rebuild_all_stats()
+    reconcile_turf_ratings()
+    invalidate_index()
+    return deleted
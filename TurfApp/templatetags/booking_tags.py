@@ -1,5 +1,7 @@
 from django import template
+from django.core.files.storage import default_storage
 from django.utils import timezone
+from django.utils.html import format_html
 from datetime import datetime, timedelta
 
 register = template.Library()
@@ -54,5 +56,35 @@ def multiply(value, arg):
         return float(value) * float(arg)
     except (ValueError, TypeError):
         return 0
-    
-    
\ No newline at end of file
+
+@register.filter(name='star_classes')
+def star_classes(rating, max_stars=5):
+    """
+    Returns the Font Awesome icon classes for a star rating, rounded to the nearest half star.
+    """
+    try:
+        halves = round(float(rating) * 2)
+    except (ValueError, TypeError):
+        halves = 0
+    full, half = divmod(max(0, min(halves, max_stars * 2)), 2)
+    return ['fas fa-star'] * full + ['fas fa-star-half-alt'] * half + ['far fa-star'] * (max_stars - full - half)
+
+@register.simple_tag
+def responsive_image(image, variants, sizes='100vw', alt='', css_class=''):
+    """
+    Renders a <picture> with WebP and JPEG srcsets from an image's variants dict,
+    or a plain lazy <img> of the original until its variants have been built.
+    """
+    if not image:
+        return ''
+    if not variants or variants.get('source') != image.name:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">', image.url, alt, css_class)
+
+    def srcset(key):
+        return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in variants[key])
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        srcset('webp'), sizes, default_storage.url(variants['jpeg'][0][1]), srcset('jpeg'), sizes, alt, css_class,
+    )
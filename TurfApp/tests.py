@@ -1,3 +1,2012 @@
-from django.test import TestCase
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.http import QueryDict
+from django.urls import reverse
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from itertools import pairwise
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+import base64
+import csv
+import asyncio
+import io
+import json
+import re
+import tempfile
+from random import Random
+from types import SimpleNamespace
+from PIL import Image
+from threading import Barrier, Event
+from .benchmarks import WRITE_SCENARIOS, BenchmarkSuite
+from .availability import DayGrid, IntervalIndex, pack_into_lanes
+from .jobs import JOB_HANDLERS, enqueue, new_job, run_pending
+from .lifecycle import complete_past_bookings
+from .exports import export_queryset, stream_csv
+from .forms import TurfVenueForm
+from .images import build_variants
+from .live import RESYNC, LocalBroker, broker, live_channel
+from .templatetags.booking_tags import responsive_image
+from .waitlist import join_waitlist, match_waiters
+from .pricing import PriceTable
+from .search import TurfSearch, encode_cursor
+from .search_index import TurfSearchIndex, get_index, invalidate_index
+from .synthetic import SYNTHETIC_DOMAIN, clear_synthetic_data
+from .stats import (
+    apply_rating_delta, owner_stats_version, rebuild_all_stats, reconcile_turf_ratings, refresh_day_stats,
+    refresh_turf_days,
+)
+from .analytics import daily_open_minutes, hour_of_week_heatmap, owner_report, resolve_range
+from .models import (
+    TurfUser, TurfVenue, Amenity, Booking, BlockRule, Job, OwnerDayStats, Rating, SlotHold, Transaction, WaitlistEntry,
+)
+from .profiling import profile
+from .slot_cache import MISSING, LRUBackend, cached_turf_day, slot_cache
+from . import urls as turf_urls
+from .services import (
+    HOLD_SECONDS, BookingError, block_slot, cancel_booking, create_block_rule, create_booking, create_price_rule,
+    hold_slot, lock_turf_day, release_expired_holds, remove_block_rule, set_price_holiday, set_surge_multiplier,
+)
 
-# Create your tests here.
+def stream_body(response):
+    """Reads a streaming response, whether its iterator is sync or async."""
+    if not response.is_async:
+        return b''.join(response.streaming_content)
+
+    async def read():
+        return b''.join([chunk async for chunk in response.streaming_content])
+    return async_to_sync(read)()
+
+# -----------------------------------------------------------------------------
+# Shared Fixtures
+# -----------------------------------------------------------------------------
+
+def make_user(role, username, **fields):
+    """A user of `role`, named after the local part of `username` unless a name is given."""
+    fields.setdefault('name', username.split('@')[0].capitalize())
+    return TurfUser.objects.create_user(username=username, role=role, **fields)
+
+
+def make_owner(username='owner@example.com', **fields):
+    return make_user(TurfUser.Role.OWNER, username, **fields)
+
+
+def make_player(username='player@example.com', **fields):
+    return make_user(TurfUser.Role.PLAYER, username, **fields)
+
+
+def make_turf(owner, **fields):
+    """A Kochi football turf open 06:00-22:00 at 1000 an hour; any field can be overridden."""
+    return TurfVenue.objects.create(owner=owner, **{
+        'name': 'Arena', 'location': 'Kochi', 'sports_type': 'Football',
+        'price_per_hour': 1000, 'open_time': time(6), 'close_time': time(22), **fields,
+    })
+
+# -----------------------------------------------------------------------------
+# Query Plan Regression Tests
+# -----------------------------------------------------------------------------
+
+class BookingQueryPlanTests(TestCase):
+    """
+    Requests the views with hot Booking queries against a seeded database,
+    EXPLAINs every booking query they actually ran, and fails unless each one
+    seeks an index.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.turfs = [make_turf(cls.owner, name=f'Turf {i}') for i in range(5)]
+        today = date.today()
+        bookings = []
+        for turf in cls.turfs:
+            for day in range(-30, 30):
+                for hour in (7, 9, 18):
+                    bookings.append(Booking(
+                        turf=turf, player=cls.player, date=today + timedelta(days=day),
+                        start_time=time(hour), end_time=time(hour + 1),
+                        status='Cancelled' if hour == 9 else 'Confirmed', total_price=1000,
+                    ))
+        Booking.objects.bulk_create(bookings)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        slot_cache().clear()
+
+    def view_booking_queries(self, user, url):
+        """Requests a view and returns the SELECTs it ran against the booking table."""
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertLess(response.status_code, 400, url)
+        table = Booking._meta.db_table
+        statements = [
+            query['sql'] for query in captured.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT') and f'"{table}"' in query['sql']
+        ]
+        self.assertTrue(statements, f'{url} ran no booking query')
+        return statements
+
+    def assertViewSearchesBookings(self, user, url):
+        """Fails unless every booking lookup of the view seeks an index (no table or full index scan)."""
+        table = Booking._meta.db_table
+        for sql in self.view_booking_queries(user, url):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+                plan = '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+            # Subqueries and joins refer to the table by an alias such as U0 or T4.
+            names = {table, *re.findall(rf'"{table}" (\w+)', sql)}
+            for line in plan.splitlines():
+                if connection.vendor == 'postgresql':
+                    self.assertNotIn(f'Seq Scan on "{table}"', line, f'{sql}\n{plan}')
+                    self.assertNotIn(f'Seq Scan on {table}', line, f'{sql}\n{plan}')
+                elif connection.vendor == 'sqlite':
+                    # SCAN ... USING (COVERING) INDEX still reads the whole index.
+                    for name in names:
+                        if re.search(rf'\b(SCAN|SEARCH) {name}\b', line):
+                            self.assertIn(f'SEARCH {name}', line, f'{sql}\n{plan}')
+
+    def test_player_slot_grid_uses_index(self):
+        self.assertViewSearchesBookings(self.player, reverse('booking_page', kwargs={'turf_id': self.turfs[0].id}))
+
+    def test_manage_slots_uses_index(self):
+        self.assertViewSearchesBookings(self.owner, reverse('manage_slots', kwargs={'turf_id': self.turfs[0].id}))
+
+    def _cursor(self):
+        return '?cursor=' + encode_cursor(f'{date.today().isoformat()} 09:00:00', 1)
+
+    def test_my_bookings_uses_index(self):
+        self.assertViewSearchesBookings(self.player, reverse('my_bookings'))
+        self.assertViewSearchesBookings(self.player, reverse('my_bookings_api') + self._cursor())
+
+    def test_owner_dashboard_uses_index(self):
+        self.assertViewSearchesBookings(self.owner, reverse('owner_view'))
+
+    def test_view_bookings_uses_index(self):
+        self.assertViewSearchesBookings(self.owner, reverse('view_bookings', kwargs={'turf_id': self.turfs[0].id}))
+        url = reverse('turf_bookings_api', kwargs={'turf_id': self.turfs[0].id}) + self._cursor()
+        self.assertViewSearchesBookings(self.owner, url)
+
+    def test_availability_range_uses_index(self):
+        start, end = date.today(), date.today() + timedelta(days=6)
+        query = '&'.join(f'turf={turf.id}' for turf in self.turfs)
+        self.assertViewSearchesBookings(self.player, f"{reverse('availability_api')}?{query}&start={start}&end={end}")
+
+
+# -----------------------------------------------------------------------------
+# Concurrent Booking Tests
+# -----------------------------------------------------------------------------
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Fires many simultaneous, overlapping checkouts at one turf-day and checks
+    that the booking service never lets two active bookings share a slot. Runs
+    on SQLite by default; set TURF_POSTGRES_DB to run it against Postgres row
+    locks, which also enables the per-day lock test.
+    """
+    WORKERS = 16
+    ATTEMPTS = 64
+
+    def setUp(self):
+        self.players = [make_player(f'player{i}@example.com') for i in range(self.WORKERS)]
+        self.turf = make_turf(make_owner(), price_per_hour=1200)
+        self.day = date.today() + timedelta(days=1)
+
+    def _attempt(self, barrier, attempt):
+        # Overlapping one- and two-hour intervals starting every 30 minutes from 17:00.
+        start_minute = 17 * 60 + (attempt % 6) * 30
+        length = 60 if attempt % 2 else 120
+        start, end = divmod(start_minute, 60), divmod(start_minute + length, 60)
+        barrier.wait()
+        try:
+            create_booking(
+                self.turf, self.players[attempt % self.WORKERS], self.day,
+                time(*start), time(*end),
+            )
+            return True
+        except BookingError:
+            return False
+        finally:
+            connections.close_all()
+
+    def test_no_double_bookings_under_contention(self):
+        results = []
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            for first in range(0, self.ATTEMPTS, self.WORKERS):
+                barrier = Barrier(self.WORKERS)
+                results += pool.map(
+                    lambda attempt: self._attempt(barrier, attempt),
+                    range(first, first + self.WORKERS),
+                )
+
+        bookings = list(Booking.objects.filter(
+            turf=self.turf, date=self.day, status__in=Booking.ACTIVE_STATUSES
+        ).order_by('start_time'))
+        self.assertTrue(any(results))
+        self.assertEqual(len(bookings), sum(results))
+        for previous, current in pairwise(bookings):
+            self.assertLessEqual(previous.end_time, current.start_time)
+        run_pending()
+        self.assertEqual(Transaction.objects.filter(booking__in=bookings).count(), len(bookings))
+
+    @skipUnless(connection.vendor == 'postgresql', "Row-level turf-day locks need Postgres (set TURF_POSTGRES_DB).")
+    def test_turf_days_lock_independently(self):
+        locked, release = Event(), Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    lock_turf_day(self.turf, self.day)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        def book(day):
+            try:
+                return create_booking(self.turf, self.players[0], day, time(18), time(19)).date
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            holder = pool.submit(hold_lock)
+            self.assertTrue(locked.wait(10))
+            same_day = pool.submit(book, self.day)
+            # Another day of the same turf is not held up by the lock...
+            next_day = self.day + timedelta(days=1)
+            self.assertEqual(pool.submit(book, next_day).result(timeout=10), next_day)
+            # ...but the locked day waits for it.
+            self.assertFalse(same_day.done())
+            release.set()
+            holder.result(timeout=10)
+            self.assertEqual(same_day.result(timeout=10), self.day)
+
+# -----------------------------------------------------------------------------
+# Synthetic Data and Benchmark Tests
+# -----------------------------------------------------------------------------
+
+class SyntheticDataTests(TransactionTestCase):
+    """
+    Runs generate_synthetic_data and run_benchmarks at toy scale. The benchmark
+    threads use their own connections, so the data has to be committed.
+    """
+    def setUp(self):
+        call_command(
+            'generate_synthetic_data', owners=2, turfs_per_owner=2, players=5, days_back=3, days_ahead=2,
+            bookings_per_day=4, rating_rate=1, seed=7, batch_size=10, stdout=io.StringIO(),
+        )
+
+    def test_generates_consistent_rows(self):
+        self.assertEqual(TurfUser.objects.filter(username__endswith=f'@{SYNTHETIC_DOMAIN}', role='owner').count(), 2)
+        self.assertEqual(TurfUser.objects.filter(username__endswith=f'@{SYNTHETIC_DOMAIN}', role='player').count(), 5)
+        self.assertEqual(TurfVenue.objects.count(), 4)
+        bookings = Booking.objects.order_by('turf_id', 'date', 'start_time')
+        self.assertTrue(bookings.exists())
+        self.assertEqual(Transaction.objects.count(), bookings.exclude(status='Blocked').count())
+        self.assertEqual(Rating.objects.count(), bookings.filter(status='Completed').count())
+        self.assertFalse(bookings.filter(date__lt=date.today(), status='Confirmed').exists())
+        for previous, current in pairwise(bookings):
+            if (previous.turf_id, previous.date) == (current.turf_id, current.date):
+                self.assertLessEqual(previous.end_time, current.start_time)
+        # Bulk inserts skip the signals, so the derived tables are rebuilt at the end.
+        self.assertEqual(
+            sum(OwnerDayStats.objects.values_list('bookings', flat=True)),
+            bookings.filter(status__in=('Confirmed', 'Completed')).count(),
+        )
+        self.assertEqual(sum(OwnerDayStats.objects.values_list('rating_count', flat=True)), Rating.objects.count())
+
+        self.assertEqual(clear_synthetic_data(), bookings.count())
+        self.assertFalse(TurfUser.objects.exists())
+        self.assertFalse(Booking.objects.exists())
+
+    def test_benchmarks_report_every_read_scenario(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'run_benchmarks', requests=4, concurrency=2, warmup=1, output=output.name, stdout=io.StringIO(),
+            )
+            report = json.load(output)
+
+        self.assertEqual(report['meta']['dataset']['turfs'], 4)
+        self.assertEqual(report['meta']['requests'], 4)
+        expected = [name for name in BenchmarkSuite.SCENARIOS if name not in WRITE_SCENARIOS]
+        self.assertEqual(sorted(report['scenarios']), sorted(expected))
+        for name, row in report['scenarios'].items():
+            self.assertEqual(row['requests'], 4, name)
+            self.assertEqual(row['errors'], 0, name)
+            self.assertLessEqual(row['p50_ms'], row['p95_ms'])
+            self.assertLessEqual(row['p95_ms'], row['p99_ms'])
+            self.assertGreater(row['throughput_rps'], 0)
+
+# -----------------------------------------------------------------------------
+# Per-View Query Budgets
+# -----------------------------------------------------------------------------
+
+@override_settings(TURF_LIVE_STREAM_SECONDS=0, TURF_PROFILING=False)
+class ViewQueryBudgetTests(TestCase):
+    """
+    Requests every TurfApp route against a small seeded dataset and pins its
+    query count, so a lazy relation loaded in a template loop fails the build.
+    Budgets are for a cold cache (the search routes include building the text
+    index); raise one only together with the change that needs it. The request
+    profiler is off so only the test's own profile() counts and reports queries.
+    """
+    # url name -> (who is logged in, url kwargs, query string, max queries)
+    ROUTES = {
+        'login_view': (None, {}, '', 0),
+        'signup_view': (None, {}, '', 0),
+        'landing_view': (None, {}, '', 0),
+        'logout_view': ('player', {}, '', 4),
+        'home_view': ('player', {}, '', 3),
+        'home_turf_view': ('player', {}, '?sort=rating', 4),
+        'booking_page': ('player', {'turf_id': 'turf'}, '', 6),
+        'booking_receipt': ('player', {'booking_id': 'booking'}, '', 3),
+        'my_bookings': ('player', {}, '', 3),
+        'my_bookings_api': ('player', {}, '', 3),
+        'cancel_booking': ('player', {'booking_id': 'future_booking'}, '', 15),
+        'availability_api': ('player', {}, '?turf={turf}&start={today}&end={week_end}', 5),
+        'slot_holds_api': ('player', {}, '', 3),
+        'waitlist_api': ('player', {}, '', 3),
+        'live_slots': ('player', {'turf_id': 'turf'}, '', 6),
+        'turf_search_api': ('player', {}, '?q=arena', 5),
+        'api_session': ('player', {}, '', 9),
+        'api_turfs': ('player', {}, '?sport=football', 9),
+        'api_availability': ('player', {'turf_id': 'turf'}, '', 9),
+        'api_bookings': ('player', {}, '', 9),
+        'api_booking': ('player', {'booking_id': 'future_booking'}, '', 9),
+        'turf_autocomplete_api': ('player', {}, '?q=are', 4),
+        'owner_view': ('owner', {}, '', 16),
+        'turf_add': ('owner', {}, '', 3),
+        'edit_turf': ('owner', {'turf_id': 'turf'}, '', 5),
+        'view_bookings': ('owner', {'turf_id': 'turf'}, '', 4),
+        'turf_bookings_api': ('owner', {'turf_id': 'turf'}, '', 4),
+        'owner_booking_detail': ('owner', {'booking_id': 'booking'}, '', 3),
+        'export_bookings': ('owner', {}, '?kind=transactions', 3),
+        'manage_slots': ('owner', {'turf_id': 'turf'}, '', 7),
+        'view_stats_api': ('staff', {}, '', 2),
+        'cricket_view': (None, {}, '', 0),
+        'football_view': (None, {}, '', 0),
+        'badminton_view': (None, {}, '', 0),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            'owner': make_owner(),
+            'player': make_player(),
+            'staff': make_owner('staff@example.com', is_staff=True),
+        }
+        others = [make_player(f'guest{i}@example.com', name=f'Guest {i}') for i in range(4)]
+        amenity = Amenity.objects.create(name='Floodlights')
+        turfs = []
+        for i in range(3):
+            turf = make_turf(cls.users['owner'], name=f'Arena {i}')
+            turf.amenities.add(amenity)
+            turfs.append(turf)
+        today = date.today()
+        bookings = []
+        for turf in turfs:
+            for hour, player in zip((7, 9, 11, 13, 15), [cls.users['player']] + others, strict=True):
+                for day in (today, today + timedelta(days=1)):
+                    bookings.append(Booking.objects.create(
+                        turf=turf, player=player, date=day, start_time=time(hour), end_time=time(hour + 1),
+                        total_price=1000,
+                    ))
+            Booking.objects.create(
+                turf=turf, player=None, date=today, start_time=time(17), end_time=time(18),
+                status='Blocked', block_reason='Maintenance',
+            )
+        for booking in bookings:
+            Transaction.objects.create(booking=booking, amount=booking.total_price)
+        for booking in bookings[:5]:
+            Rating.objects.create(booking=booking, player=booking.player, turf=booking.turf, score=4)
+        future = Booking.objects.create(
+            turf=turfs[0], player=cls.users['player'], date=today + timedelta(days=7),
+            start_time=time(20), end_time=time(21), total_price=1000,
+        )
+        cls.objects = {
+            'turf': turfs[0].id, 'booking': bookings[0].id, 'future_booking': future.id,
+            'today': today.isoformat(), 'week_end': (today + timedelta(days=6)).isoformat(),
+        }
+
+    def setUp(self):
+        cache.clear()
+        slot_cache().clear()
+
+    def _url(self, name):
+        _, kwargs, query, _ = self.ROUTES[name]
+        kwargs = {key: self.objects[value] for key, value in kwargs.items()}
+        return reverse(name, kwargs=kwargs) + query.format(**self.objects)
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in turf_urls.urlpatterns}
+        self.assertEqual(names, set(self.ROUTES))
+
+    def test_views_stay_within_query_budget(self):
+        for name, (role, _, _, budget) in self.ROUTES.items():
+            with self.subTest(view=name):
+                if role:
+                    self.client.force_login(self.users[role])
+                else:
+                    self.client.logout()
+                url = self._url(name)
+                with profile(name) as current:
+                    response = self.client.get(url)
+                    if response.streaming:
+                        stream_body(response)
+                self.assertLess(response.status_code, 400, url)
+                self.assertLessEqual(current.queries, budget, f'{name}: {current.queries} queries\n' + '\n'.join(current.statements))
+                self.assertFalse(current.n_plus_one, f'{name} repeats a query per row: {current.n_plus_one}')
+
+    def test_listings_leave_the_price_table_unread(self):
+        for name in ('home_view', 'home_turf_view', 'turf_search_api', 'my_bookings', 'my_bookings_api', 'owner_view'):
+            with self.subTest(view=name):
+                self.client.force_login(self.users[self.ROUTES[name][0]])
+                with profile(name) as current:
+                    self.client.get(self._url(name))
+                self.assertFalse([sql for sql in current.statements if '"price_table"' in sql])
+
+    def test_booking_page_is_cached_until_a_booking_changes(self):
+        self.client.force_login(self.users['player'])
+        url = self._url('booking_page')
+        self.client.get(url)
+        with profile() as warm:
+            response = self.client.get(url)
+        # Session, user, the version lookup and live holds; the turf and its bookings come from the cache.
+        self.assertEqual(warm.queries, 4)
+        self.assertEqual(slot_cache().hits, 1)
+
+        Booking.objects.create(
+            turf_id=self.objects['turf'], player=self.users['player'], date=date.today(),
+            start_time=time(19), end_time=time(20), total_price=1000,
+        )
+        response = self.client.get(url)
+        self.assertEqual(slot_cache().misses, 2)
+        slot = next(row for row in response.context['slots'] if row['start_time'] == time(19))
+        self.assertFalse(slot['is_available'])
+
+    def test_lru_backend_evicts_least_recently_used(self):
+        backend = LRUBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIs(backend.get('b'), MISSING)
+        self.assertEqual(backend.evictions, 1)
+
+    def test_cached_turf_days_are_not_shared_between_readers(self):
+        turf_id, day = self.objects['turf'], date.today()
+        turf, grid = cached_turf_day(turf_id, day)
+        turf.name = 'Renamed'
+        grid.mark(time(6), time(7))
+        again, fresh = cached_turf_day(turf_id, day)
+        self.assertEqual(slot_cache().hits, 1)
+        self.assertIsNot(again, turf)
+        self.assertEqual(again.name, 'Arena 0')
+        self.assertFalse(fresh.is_taken(0))
+
+    @override_settings(TURF_PROFILING=True)
+    def test_middleware_adds_server_timing(self):
+        self.client.force_login(self.users['player'])
+        response = self.client.get(reverse('my_bookings'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+
+# -----------------------------------------------------------------------------
+# Recurring Block Tests
+# -----------------------------------------------------------------------------
+
+class BlockRuleTests(TestCase):
+    """Expands, reports conflicts for, and removes recurring block rules."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.turf = make_turf(cls.owner)
+        # Next Monday, so every weekday of the coming weeks is in the future.
+        today = date.today()
+        cls.monday = today + timedelta(days=7 - today.weekday())
+
+    def _rule(self, weeks, **fields):
+        return create_block_rule(
+            self.turf, weekdays=0b0000101, start_date=self.monday,
+            end_date=self.monday + timedelta(weeks=weeks, days=-1),
+            start_time=time(18), end_time=time(20), reason='League', **fields
+        )
+
+    def test_season_is_blocked_in_a_bounded_number_of_queries(self):
+        with profile() as short:
+            rule, _ = self._rule(weeks=2)
+        remove_block_rule(rule)
+        with profile() as season:
+            rule, result = self._rule(weeks=26)
+        self.assertEqual(result['created'], 52)
+        self.assertEqual(season.queries, short.queries)
+        self.assertEqual(rule.blocks.count(), 52)
+        stats = OwnerDayStats.objects.get(turf=self.turf, date=self.monday + timedelta(weeks=3))
+        self.assertEqual(stats.blocked_minutes, 120)
+
+    def test_confirmed_bookings_and_exceptions_are_skipped(self):
+        wednesday = self.monday + timedelta(days=2)
+        create_booking(self.turf, self.player, wednesday, time(19), time(20))
+        rule, result = self._rule(weeks=2, exceptions=str(self.monday + timedelta(weeks=1)))
+        self.assertEqual([booking.date for booking in result['conflicts']], [wednesday])
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(
+            sorted(rule.blocks.values_list('date', flat=True)),
+            [self.monday, self.monday + timedelta(days=9)],
+        )
+
+    def test_rules_outside_opening_hours_are_rejected(self):
+        with self.assertRaises(BookingError):
+            create_block_rule(
+                self.turf, weekdays=1, start_date=self.monday, end_date=self.monday,
+                start_time=time(21), end_time=time(23),
+            )
+        self.assertFalse(BlockRule.objects.exists())
+
+    def test_removing_a_rule_unblocks_its_slots(self):
+        rule, _ = self._rule(weeks=4)
+        self.assertEqual(remove_block_rule(rule), 8)
+        self.assertFalse(Booking.objects.filter(status='Blocked').exists())
+        self.assertFalse(OwnerDayStats.objects.filter(turf=self.turf).exists())
+        self.assertFalse(BlockRule.objects.exists())
+
+
+
+# -----------------------------------------------------------------------------
+# Day Grid Tests
+# -----------------------------------------------------------------------------
+
+class DayGridTests(SimpleTestCase):
+    """The bitmask run queries, checked at the edges of the day and against a slot-by-slot scan."""
+
+    def setUp(self):
+        self.grid = DayGrid(time(6), time(22))  # 32 slots
+
+    def test_free_runs_at_the_edges(self):
+        self.assertEqual(self.grid.free_runs(), [(0, 32)])
+        self.grid.mark(time(8), time(9))
+        # Both runs touch an edge of the day; the second is longer than half of it.
+        self.assertEqual(self.grid.free_runs(), [(0, 4), (6, 26)])
+        self.grid.mark(time(6), time(6, 30))
+        self.grid.mark(time(21, 30), time(22))
+        self.assertEqual(self.grid.free_runs(), [(1, 3), (6, 25)])
+        self.assertEqual(self.grid.free_runs(blocked=self.grid.full_mask), [])
+
+    def test_first_free_run(self):
+        self.assertEqual(self.grid.first_free_run(32), 0)
+        self.assertIsNone(self.grid.first_free_run(33))
+        self.assertIsNone(self.grid.first_free_run(0))
+        self.grid.mark(time(8), time(9))
+        self.assertEqual(self.grid.first_free_run(4), 0)
+        self.assertEqual(self.grid.first_free_run(5), 6)
+        self.assertEqual(self.grid.first_free_run(26), 6)
+        self.assertIsNone(self.grid.first_free_run(27))
+        self.assertEqual(self.grid.first_free_run(3, blocked=0b1), 1)
+
+    def test_runs_match_a_slot_scan(self):
+        rng = Random(7)
+        for _ in range(200):
+            grid = DayGrid(time(6), time(22))
+            grid.taken = rng.getrandbits(32) & rng.getrandbits(32)
+            free = [not grid.is_taken(k) for k in range(len(grid))]
+            for count in (1, 2, 3, 5, 8, 17, 32):
+                expected = next((k for k in range(len(grid) - count + 1) if all(free[k:k + count])), None)
+                self.assertEqual(grid.first_free_run(count), expected, (bin(grid.taken), count))
+            runs = grid.free_runs()
+            self.assertEqual(sum(length for _, length in runs), sum(free))
+            for first, length in runs:
+                self.assertTrue(all(free[first:first + length]))
+                self.assertFalse(first + length < len(grid) and free[first + length])
+
+    def test_mask_before(self):
+        self.assertEqual(self.grid.mask_before(time(5)), 0)
+        self.assertEqual(self.grid.mask_before(time(6)), 0)
+        # A slot that has started at all is past.
+        self.assertEqual(self.grid.mask_before(time(6, 1)), 0b1)
+        self.assertEqual(self.grid.mask_before(time(7)), 0b11)
+        self.assertEqual(self.grid.mask_before(time(21, 59)), self.grid.full_mask)
+        self.assertEqual(self.grid.mask_before(time(23)), self.grid.full_mask)
+
+# -----------------------------------------------------------------------------
+# Interval Index Tests
+# -----------------------------------------------------------------------------
+
+class IntervalIndexTests(SimpleTestCase):
+    """Answers exact overlap queries, including times off the 30-minute grid."""
+
+    def test_matches_a_linear_scan(self):
+        rng = Random(7)
+        seconds = lambda value: time(value // 3600, value // 60 % 60, value % 60)
+        intervals = []
+        for number in range(200):
+            start = rng.randrange(6 * 3600, 22 * 3600)
+            intervals.append((start, start + rng.randrange(60, 3 * 3600), number))
+        index = IntervalIndex((seconds(start), seconds(min(end, 86399)), n) for start, end, n in intervals)
+        for _ in range(300):
+            start = rng.randrange(6 * 3600, 23 * 3600)
+            end = min(start + rng.randrange(1, 2 * 3600), 86399)
+            expected = {n for s, e, n in intervals if s < end and min(e, 86399) > start}
+            self.assertEqual(set(index.overlapping(seconds(start), seconds(end))), expected)
+            self.assertEqual(index.overlaps(seconds(start), seconds(end)), bool(expected))
+
+    def test_off_grid_intervals(self):
+        index = IntervalIndex([(time(10, 15), time(11, 0), 'a'), (time(11, 0), time(12, 45), 'b')])
+        self.assertFalse(index.overlaps(time(10), time(10, 15)))
+        self.assertFalse(index.overlaps(time(12, 45), time(13)))
+        self.assertEqual(index.overlapping(time(10, 59), time(11, 1)), ['a', 'b'])
+        self.assertEqual(index.containing(time(11, 30), time(12)), ['b'])
+        self.assertEqual(index.covering(time(11)), ['b'])
+        self.assertEqual(len(index.lanes()), 1)
+
+    def test_within_matches_a_linear_scan(self):
+        rng = Random(5)
+        minutes = lambda value: time(value // 60, value % 60)
+        intervals = []
+        for number in range(300):
+            start = rng.randrange(6 * 60, 22 * 60)
+            intervals.append((start, min(start + rng.randrange(15, 300), 23 * 60 + 59), number))
+        index = IntervalIndex((minutes(start), minutes(end), n) for start, end, n in intervals)
+        for _ in range(300):
+            start = rng.randrange(6 * 60, 23 * 60)
+            end = min(start + rng.randrange(1, 6 * 60), 23 * 60 + 59)
+            expected = sorted((s, e, n) for s, e, n in intervals if s >= start and e <= end)
+            self.assertEqual(index.within(minutes(start), minutes(end)), [n for _, _, n in expected])
+        self.assertEqual(len(index.within(time(0), time(0))), 300)  # An end of 00:00 is midnight.
+
+    def _lanes(self, *intervals):
+        bookings = [
+            SimpleNamespace(name=name, start_time=time(*start), end_time=time(*end)) for name, start, end in intervals
+        ]
+        return [[booking.name for booking in lane] for lane in pack_into_lanes(bookings)]
+
+    def test_lanes(self):
+        self.assertEqual(self._lanes(('a', (10,), (11,)), ('b', (11,), (12,))), [['a', 'b']])  # touching
+        self.assertEqual(self._lanes(('a', (10,), (11, 30)), ('b', (11,), (12,))), [['a'], ['b']])  # overlapping
+        self.assertEqual(  # nested
+            self._lanes(('outer', (10,), (14,)), ('first', (11,), (12,)), ('second', (12,), (13,))),
+            [['outer'], ['first', 'second']],
+        )
+        # Each interval takes the lane that freed up earliest.
+        self.assertEqual(
+            self._lanes(('a', (8,), (10,)), ('b', (8,), (9,)), ('c', (9,), (11,)), ('d', (10,), (12,))),
+            [['b', 'c'], ['a', 'd']],
+        )
+        self.assertEqual(self._lanes(), [])
+
+    def test_lanes_are_as_few_as_the_deepest_overlap(self):
+        rng = Random(11)
+        bookings = []
+        half_hour = lambda index: time(index // 2, index % 2 * 30)
+        for number in range(150):
+            start = rng.randrange(12, 44)
+            bookings.append(SimpleNamespace(
+                number=number, start_time=half_hour(start), end_time=half_hour(start + rng.randrange(1, 4)),
+            ))
+        lanes = pack_into_lanes(bookings)
+        depth = max(
+            sum(other.start_time <= booking.start_time < other.end_time for other in bookings) for booking in bookings
+        )
+        self.assertEqual(len(lanes), depth)
+        self.assertEqual(sorted(booking.number for lane in lanes for booking in lane), list(range(150)))
+        for lane in lanes:
+            for previous, booking in pairwise(lane):
+                self.assertLessEqual(previous.end_time, booking.start_time)
+
+
+class OwnerTimelineTests(TestCase):
+    """Renders today's overlapping bookings on the dashboard timeline in separate sub-lanes."""
+
+    def test_overlapping_bookings_get_their_own_lane(self):
+        owner, player = make_owner(), make_player()
+        arena = make_turf(owner)
+        # An empty turf still gets its single lane.
+        make_turf(owner, name='Court')
+        today = date.today()
+        for start, end, status in ((10, 12, 'Confirmed'), (11, 13, 'Blocked'), (12, 14, 'Confirmed'), (9, 15, 'Cancelled')):
+            Booking.objects.create(
+                turf=arena, player=player, date=today, start_time=time(start), end_time=time(end), status=status,
+            )
+        self.client.force_login(owner)
+        response = self.client.get(reverse('owner_view'))
+
+        lanes = {lane['turf'].name: lane for lane in response.context['schedule_data']['lanes']}
+        self.assertEqual(lanes['Arena']['lane_count'], 2)
+        self.assertEqual(
+            sorted((booking.start_time.hour, booking.lane_index) for booking in lanes['Arena']['bookings']),
+            [(10, 0), (11, 1), (12, 0)],
+        )
+        self.assertEqual((lanes['Court']['lane_count'], lanes['Court']['bookings']), (1, []))
+        self.assertContains(response, '--lanes: 2;')
+        self.assertContains(response, '--lanes: 1;')
+        self.assertContains(response, '--lane: 1;', count=1)
+
+
+class BlockSlotTests(TestCase):
+    """Owner blocks and player bookings share the exact overlap check."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.turf = make_turf(cls.owner)
+        cls.day = date.today() + timedelta(days=1)
+
+    def test_block_over_a_booking_is_rejected(self):
+        create_booking(self.turf, self.player, self.day, time(10, 15), time(11))
+        with self.assertRaisesMessage(BookingError, 'a booking from 10:15 to 11:00'):
+            block_slot(self.turf, self.day, time(10, 30), time(11, 30))
+        self.assertFalse(Booking.objects.filter(status='Blocked').exists())
+
+    def test_adjacent_off_grid_intervals_are_allowed(self):
+        create_booking(self.turf, self.player, self.day, time(10, 15), time(11))
+        block_slot(self.turf, self.day, time(10), time(10, 15))
+        create_booking(self.turf, self.player, self.day, time(11), time(11, 45))
+        with self.assertRaises(BookingError):
+            create_booking(self.turf, self.player, self.day, time(10, 10), time(10, 20))
+
+    def test_manage_slots_reports_overlapping_blocks(self):
+        create_booking(self.turf, self.player, self.day, time(10), time(11))
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('manage_slots', kwargs={'turf_id': self.turf.id}), {
+            'action': 'block', 'slot_date': self.day.isoformat(),
+            'start_time': '10:30:00', 'end_time': '11:00:00',
+        }, follow=True)
+        self.assertContains(response, 'overlaps a booking')
+        self.assertFalse(Booking.objects.filter(status='Blocked').exists())
+
+
+# -----------------------------------------------------------------------------
+# Availability API Tests
+# -----------------------------------------------------------------------------
+
+class AvailabilityApiTests(TestCase):
+    """The multi-turf, multi-day availability grid: filters, range limits and shape."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        cls.player = make_player()
+        other = make_player('other@example.com')
+        cls.football = make_turf(owner, name='Kochi Arena', close_time=time(10))
+        cls.cricket = make_turf(
+            owner, name='Calicut Nets', location='Calicut', sports_type='Cricket',
+            price_per_hour=800, open_time=time(8), close_time=time(9),
+        )
+        cls.day = date.today() + timedelta(days=1)
+        Booking.objects.create(
+            turf=cls.football, player=other, date=cls.day, start_time=time(7), end_time=time(8), total_price=1000,
+        )
+        Booking.objects.create(
+            turf=cls.football, player=None, date=cls.day, start_time=time(9, 30), end_time=time(10),
+            status='Blocked', block_reason='Maintenance',
+        )
+        Booking.objects.create(
+            turf=cls.football, player=other, date=cls.day, start_time=time(6), end_time=time(7),
+            total_price=1000, status='Cancelled',
+        )
+        SlotHold.objects.create(
+            turf=cls.football, player=other, date=cls.day, start_time=time(8), end_time=time(8, 30),
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.player)
+
+    def _get(self, **params):
+        return self.client.get(reverse('availability_api'), params)
+
+    def test_response_shape(self):
+        day = self.day.isoformat()
+        response = self._get(turf=self.football.id, start=day, end=day)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'start': day,
+            'end': day,
+            'slot_minutes': 30,
+            'turfs': [{
+                'id': self.football.id,
+                'name': 'Kochi Arena',
+                'open_time': '06:00',
+                'slot_count': 8,
+                # Booked 07:00-08:00, held 08:00-08:30 and blocked 09:30-10:00; the cancellation is free.
+                'availability': {day: '11000110'},
+            }],
+        })
+
+    def test_filters(self):
+        day = self.day.isoformat()
+
+        def ids(response):
+            return [turf['id'] for turf in response.json()['turfs']]
+        self.assertEqual(ids(self._get(sport='cricket', start=day)), [self.cricket.id])
+        self.assertEqual(ids(self._get(location='koch', start=day)), [self.football.id])
+        both = self.client.get(reverse('availability_api'), {'turf': [self.football.id, self.cricket.id], 'start': day})
+        self.assertEqual(sorted(ids(both)), sorted([self.football.id, self.cricket.id]))
+        self.assertEqual(ids(self._get(turf=self.cricket.id, sport='football', start=day)), [])
+
+    def test_date_range(self):
+        start = self.day
+        response = self._get(turf=self.cricket.id, start=start.isoformat(), end=(start + timedelta(days=30)).isoformat())
+        self.assertEqual(len(response.json()['turfs'][0]['availability']), 31)
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        self.assertEqual(self._get(turf=self.cricket.id, start=yesterday).json()['turfs'][0]['availability'], {yesterday: '00'})
+
+        too_long = self._get(start=start.isoformat(), end=(start + timedelta(days=31)).isoformat())
+        self.assertEqual(too_long.status_code, 400)
+        backwards = self._get(start=start.isoformat(), end=(start - timedelta(days=1)).isoformat())
+        self.assertEqual(backwards.status_code, 400)
+        self.assertEqual(self._get(start='tomorrow').status_code, 400)
+        self.assertEqual(self._get(turf='x').status_code, 400)
+
+# -----------------------------------------------------------------------------
+# Turf Search Tests
+# -----------------------------------------------------------------------------
+
+class TurfSearchTests(TestCase):
+    """Walks the keyset pages of the listing and checks they add up to the full ordering."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        # Prices and ratings repeat, so most page boundaries fall inside a tie.
+        for name, price, rating in (
+            ('Alpha', 800, 4.5), ('Bravo', 500, 4.5), ('Charlie', 800, 3.0), ('Delta', 800, 4.5),
+            ('Echo', 1200, 3.0), ('Foxtrot', 500, 2.0), ('Golf', 800, 4.5),
+        ):
+            turf = make_turf(cls.owner, name=name, price_per_hour=price)
+            TurfVenue.objects.filter(pk=turf.pk).update(rating_score=rating)
+        cls.turfs = list(TurfVenue.objects.all())
+        cls.day = date.today() + timedelta(days=1)
+
+    def _walk(self, query, page_size):
+        """Returns every page's turf names, following next cursors until there are none."""
+        pages, cursor = [], None
+        for _ in range(len(self.turfs) + 2):
+            params = QueryDict(query, mutable=True)
+            if cursor:
+                params['cursor'] = cursor
+            rows, cursor = TurfSearch(params).page(page_size)
+            pages.append([turf.name for turf in rows])
+            if cursor is None:
+                return pages
+        self.fail('Paging did not end.')
+
+    def _expected(self, field, descending, turfs=None):
+        turfs = sorted(turfs or self.turfs, key=lambda turf: (getattr(turf, field), turf.id), reverse=descending)
+        return [turf.name for turf in turfs]
+
+    def test_cursors_cover_every_sort_without_gaps_or_repeats(self):
+        for sort, field, descending in (
+            ('name', 'name', False), ('price', 'price_per_hour', False),
+            ('-price', 'price_per_hour', True), ('rating', 'rating_score', True),
+        ):
+            for page_size in (1, 2, 3):
+                with self.subTest(sort=sort, page_size=page_size):
+                    pages = self._walk(f'sort={sort}', page_size)
+                    self.assertEqual(sum(pages, []), self._expected(field, descending))
+                    self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+
+    def test_last_page(self):
+        # A full last page ends the walk instead of leaving an empty page behind.
+        self.assertEqual([len(page) for page in self._walk('sort=name', 7)], [7])
+        self.assertEqual([len(page) for page in self._walk('sort=name', 6)], [6, 1])
+        self.assertEqual(self._walk('sort=price&min_price=1000', 2), [['Echo']])
+        self.assertEqual(self._walk('sort=name&location=Nowhere', 2), [[]])
+
+    def test_cursor_round_trip(self):
+        rows, cursor = TurfSearch(QueryDict('sort=rating')).page(3)
+        last = rows[-1]
+        search = TurfSearch(QueryDict(f'sort=rating&cursor={cursor}'))
+        self.assertEqual(search.cursor, (str(last.rating_score), last.id))
+        self.assertNotIn(last, search.page(10)[0])
+        # A cursor that does not decode starts from the first page.
+        self.assertEqual(TurfSearch(QueryDict('sort=name&cursor=not-a-cursor')).page(2)[0], self.turfs[:2])
+
+    def test_free_slot_pages_resume_across_batches(self):
+        booked = {'Bravo', 'Delta', 'Echo'}
+        for turf in self.turfs:
+            if turf.name in booked:
+                Booking.objects.create(turf=turf, player=self.player, date=self.day, start_time=time(17), end_time=time(22))
+        free = self._expected('price_per_hour', False, [turf for turf in self.turfs if turf.name not in booked])
+        query = f'sort=price&date={self.day.isoformat()}&time=evening'
+        for batch, max_batches in ((2, 10), (2, 1), (1, 1)):
+            with self.subTest(batch=batch, max_batches=max_batches), \
+                    mock.patch('TurfApp.search.FREE_SLOT_BATCH', batch), \
+                    mock.patch('TurfApp.search.FREE_SLOT_MAX_BATCHES', max_batches):
+                self.assertEqual(sum(self._walk(query, 2), []), free)
+
+
+class SearchIndexTests(TestCase):
+    """Matches misspelt and partial words, and follows turf and amenity changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.lights = Amenity.objects.create(name='Floodlights')
+        cls.parking = Amenity.objects.create(name='Parking')
+        cls.arena = cls._turf('Green Arena', 'Kochi', 'Five-a-side football under the stars')
+        cls.court = cls._turf('Smash Court', 'Kakkanad', 'Indoor badminton')
+        cls.park = cls._turf('Riverside Park', 'Aluva', 'Cricket nets')
+
+    @classmethod
+    def _turf(cls, name, location, description):
+        return make_turf(cls.owner, name=name, location=location, description=description)
+
+    def setUp(self):
+        # A fresh process-wide index, so no other test's turfs linger in it.
+        patcher = mock.patch('TurfApp.search_index._index', TurfSearchIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _search(self, query):
+        return [turf_id for turf_id, _ in get_index().search(query)]
+
+    def test_fuzzy_and_prefix_matching(self):
+        self.assertEqual(self._search('arena'), [self.arena.id])
+        self.assertEqual(self._search('footbal'), [self.arena.id])  # misspelt
+        self.assertEqual(self._search('kochi arna'), [self.arena.id])
+        self.assertEqual(self._search('badmin'), [self.court.id])  # prefix of the last word
+        self.assertEqual(self._search('riverside tennis'), [])  # every word must match
+        # A name match outranks the same word in a description.
+        self._turf('Cricket Ground', 'Aluva', '')
+        invalidate_index()
+        self.assertEqual(self._search('cricket')[1], self.park.id)
+
+    def test_autocomplete(self):
+        self._turf('Kochi Dome', 'Kochi', 'Indoor football')
+        self.assertEqual(get_index().autocomplete('ko'), ['kochi'])
+        self.assertEqual(get_index().autocomplete('in'), ['indoor'])
+        self.assertEqual(get_index().autocomplete('k'), [])
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('turf_autocomplete_api'), {'q': 'smash ba'})
+        self.assertEqual(response.json(), {'suggestions': ['badminton']})
+
+    def test_amenity_changes_reindex_the_turf(self):
+        self.assertEqual(self._search('floodlights'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arena.amenities.add(self.lights)
+        self.assertEqual(self._search('floodlights'), [self.arena.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lights.turfvenue_set.add(self.court)
+        self.assertEqual(sorted(self._search('floodlight')), [self.arena.id, self.court.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arena.amenities.remove(self.lights)
+        self.assertEqual(self._search('floodlights'), [self.court.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lights.turfvenue_set.clear()
+        self.assertEqual(self._search('floodlights'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.parking.name = 'Valet Parking'
+            self.parking.save()
+            self.park.amenities.add(self.parking)
+        self.assertEqual(self._search('valet'), [self.park.id])
+
+    def test_invalidate_index_rebuilds_on_the_next_lookup(self):
+        self.assertEqual(self._search('arena'), [self.arena.id])
+        # Queryset updates send no signals, so the index is stale until invalidated.
+        TurfVenue.objects.filter(pk=self.arena.pk).update(name='Blue Stadium')
+        self.assertEqual(self._search('stadium'), [])
+        invalidate_index()
+        self.assertEqual(self._search('stadium'), [self.arena.id])
+        self.assertEqual(self._search('arena'), [])
+
+
+# -----------------------------------------------------------------------------
+# Background Job Tests
+# -----------------------------------------------------------------------------
+
+@override_settings(TURF_JOBS_EAGER=False)
+class JobQueueTests(TestCase):
+    """Queues booking side effects and retries failing jobs with backoff."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner(email='owner@example.com')
+        cls.player = make_player(email='player@example.com')
+        cls.turf = make_turf(cls.owner)
+        cls.day = date.today() + timedelta(days=1)
+
+    def test_booking_side_effects_run_in_the_worker(self):
+        with profile() as checkout:
+            booking = create_booking(self.turf, self.player, self.day, time(10), time(11))
+        self.assertFalse(any('"TurfApp_transaction"' in sql for sql in checkout.statements))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(OwnerDayStats.objects.exists())
+
+        self.assertEqual(run_pending()[1], 0)
+        self.assertEqual(booking.transactions.get().amount, 1000)
+        self.assertEqual(OwnerDayStats.objects.get(turf=self.turf, date=self.day).collected, 1000)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['owner@example.com', 'player@example.com'])
+
+        cancel_booking(booking)
+        run_pending()
+        self.assertIn('cancelled', mail.outbox[-1].subject + mail.outbox[-2].subject)
+        self.assertEqual(OwnerDayStats.objects.get(turf=self.turf, date=self.day).bookings, 0)
+
+    def test_queued_jobs_with_the_same_key_are_coalesced(self):
+        for _ in range(3):
+            enqueue(new_job('refresh_day_stats', key='stats:1', turf_id=self.turf.id, day=str(self.day)))
+        self.assertEqual(Job.objects.filter(idempotency_key='stats:1').count(), 1)
+        run_pending()
+        enqueue(new_job('refresh_day_stats', key='stats:1', turf_id=self.turf.id, day=str(self.day)))
+        self.assertEqual(Job.objects.filter(idempotency_key='stats:1').count(), 2)
+
+    @override_settings(TURF_JOBS_EAGER=True)
+    def test_eager_mode_runs_only_the_committing_transactions_jobs(self):
+        ran = []
+        JOB_HANDLERS['record'] = lambda tag: ran.append(tag)
+        self.addCleanup(JOB_HANDLERS.pop, 'record')
+        with override_settings(TURF_JOBS_EAGER=False):
+            enqueue(new_job('record', tag='queued elsewhere'))
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            enqueue(new_job('record', tag='first'))
+            try:
+                with transaction.atomic():
+                    enqueue(new_job('record', tag='rolled back'))
+                    raise BookingError('rollback')
+            except BookingError:
+                pass
+            enqueue(new_job('record', key='record:1', tag='keyed'), new_job('record', tag='second'))
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(sorted(ran), ['first', 'keyed', 'second'])
+        self.assertEqual(Job.objects.get(status='Queued').payload, {'tag': 'queued elsewhere'})
+
+        # A batch whose savepoint rolled back is not reused.
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    enqueue(new_job('record', tag='rolled back'))
+                    raise BookingError('rollback')
+            except BookingError:
+                pass
+            enqueue(new_job('record', tag='third'))
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(ran[-1], 'third')
+
+    def test_failing_jobs_back_off_then_fail(self):
+        JOB_HANDLERS['explode'] = lambda: 1 / 0
+        self.addCleanup(JOB_HANDLERS.pop, 'explode')
+        enqueue(new_job('explode', max_attempts=3))
+        delays = []
+        for _ in range(3):
+            with self.assertLogs('TurfApp.jobs', 'ERROR'):
+                self.assertEqual(run_pending(), (0, 1))
+            job = Job.objects.get(name='explode')
+            if job.status == 'Queued':
+                delays.append(job.run_at - job.locked_at)
+                # Nothing is due until the backoff has passed.
+                self.assertEqual(run_pending(), (0, 0))
+                Job.objects.filter(pk=job.pk).update(run_at=job.created_at)
+        self.assertEqual(job.status, 'Failed')
+        self.assertEqual(job.attempts, 3)
+        self.assertIn('ZeroDivisionError', job.last_error)
+        self.assertLess(delays[0], delays[1])
+
+# -----------------------------------------------------------------------------
+# Owner Stats Tests
+# -----------------------------------------------------------------------------
+
+@override_settings(TURF_JOBS_EAGER=False)
+class OwnerStatsTests(TestCase):
+    """Keeps the per turf-day stats rows in step with bookings, and rebuilds them identically."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.arena = make_turf(cls.owner)
+        cls.court = make_turf(cls.owner, name='Court', sports_type='Cricket', price_per_hour=600)
+        cls.day = date.today() + timedelta(days=1)
+
+    def _rows(self):
+        return list(OwnerDayStats.objects.order_by('turf_id', 'date').values(
+            'owner_id', 'turf_id', 'date', 'bookings', 'revenue', 'collected',
+            'booked_minutes', 'blocked_minutes', 'rating_sum', 'rating_count',
+        ))
+
+    def test_moved_booking_refreshes_both_days(self):
+        booking = create_booking(self.arena, self.player, self.day, time(10), time(11))
+        run_pending()
+        self.assertEqual(OwnerDayStats.objects.get(turf=self.arena, date=self.day).bookings, 1)
+
+        later = self.day + timedelta(days=2)
+        booking.date = later
+        booking.save()
+        run_pending()
+        self.assertFalse(OwnerDayStats.objects.filter(turf=self.arena, date=self.day).exists())
+        self.assertEqual(OwnerDayStats.objects.get(turf=self.arena, date=later).booked_minutes, 60)
+
+        booking.turf = self.court
+        booking.save()
+        run_pending()
+        self.assertFalse(OwnerDayStats.objects.filter(turf=self.arena).exists())
+        self.assertEqual(OwnerDayStats.objects.get(turf=self.court, date=later).bookings, 1)
+
+    def test_rebuild_matches_day_refreshes(self):
+        days = [self.day + timedelta(days=offset) for offset in range(3)]
+        for turf in (self.arena, self.court):
+            for hour, day in enumerate(days, start=8):
+                create_booking(turf, self.player, day, time(hour), time(hour + 1))
+            cancel_booking(create_booking(turf, self.player, days[0], time(15), time(16)))
+            block_slot(turf, days[1], time(18), time(20))
+        run_pending()
+        rated = Booking.objects.filter(turf=self.arena, date=days[2]).get()
+        Rating.objects.create(booking=rated, player=self.player, turf=self.arena, score=4)
+        run_pending()
+
+        OwnerDayStats.objects.all().delete()
+        for turf_id, day in Booking.objects.values_list('turf_id', 'date').distinct():
+            refresh_day_stats(turf_id, day)
+        refreshed = self._rows()
+        self.assertEqual(len(refreshed), 6)
+
+        out = io.StringIO()
+        call_command('rebuild_owner_stats', stdout=out)
+        self.assertIn('6 turf-day rows', out.getvalue())
+        self.assertEqual(self._rows(), refreshed)
+        self.assertEqual(rebuild_all_stats(batch_size=2), 6)
+        self.assertEqual(self._rows(), refreshed)
+
+        OwnerDayStats.objects.all().delete()
+        refresh_turf_days(self.arena.id, days)
+        refresh_turf_days(self.court.id, days)
+        self.assertEqual(self._rows(), refreshed)
+
+# -----------------------------------------------------------------------------
+# Turf Rating Tests
+# -----------------------------------------------------------------------------
+
+class TurfRatingTests(TestCase):
+    """Keeps each turf's denormalized rating totals in step with its ratings."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.arena, cls.court = make_turf(cls.owner), make_turf(cls.owner, name='Court')
+        cls.day = date.today() - timedelta(days=1)
+
+    def _rate(self, turf, hour, score):
+        booking = Booking.objects.create(
+            turf=turf, player=self.player, date=self.day, start_time=time(hour), end_time=time(hour + 1), status='Completed',
+        )
+        return Rating.objects.create(booking=booking, player=self.player, turf=turf, score=score)
+
+    def assertTotals(self, turf, rating_sum, rating_count):
+        turf.refresh_from_db()
+        self.assertEqual((turf.rating_sum, turf.rating_count), (rating_sum, rating_count))
+        self.assertAlmostEqual(turf.rating_score, TurfVenue.bayesian_rating(rating_sum, rating_count))
+
+    def test_creates_edits_and_deletes(self):
+        first = self._rate(self.arena, 8, 5)
+        self._rate(self.arena, 9, 2)
+        self.assertTotals(self.arena, 7, 2)
+        first.score = 3
+        first.save()
+        self.assertTotals(self.arena, 5, 2)
+        first.delete()
+        self.assertTotals(self.arena, 2, 1)
+        Rating.objects.filter(turf=self.arena).delete()
+        self.assertTotals(self.arena, 0, 0)
+        self.assertEqual(self.arena.rating_score, TurfVenue.RATING_PRIOR_MEAN)
+
+    def test_rating_moved_to_another_turf(self):
+        rating = self._rate(self.arena, 8, 4)
+        self._rate(self.court, 9, 1)
+        rating.turf = self.court
+        rating.score = 5
+        rating.save()
+        self.assertTotals(self.arena, 0, 0)
+        self.assertTotals(self.court, 6, 2)
+
+    def test_zero_delta_is_a_no_op(self):
+        with self.assertNumQueries(0):
+            apply_rating_delta(self.arena.id, 0, 0)
+
+    def test_reconcile_reports_then_fixes_drift(self):
+        self._rate(self.arena, 8, 4)
+        self._rate(self.court, 9, 2)
+        self.assertEqual(reconcile_turf_ratings(), [])
+        TurfVenue.objects.filter(pk=self.arena.pk).update(rating_sum=40, rating_count=3)
+        TurfVenue.objects.filter(pk=self.court.pk).update(rating_score=5.0)
+
+        out = io.StringIO()
+        call_command('reconcile_turf_ratings', '--dry-run', stdout=out)
+        self.assertIn(f'Found rating drift on 2 turf(s): {self.arena.id}, {self.court.id}', out.getvalue())
+        self.arena.refresh_from_db()
+        self.assertEqual((self.arena.rating_sum, self.arena.rating_count), (40, 3))
+
+        self.assertEqual(sorted(reconcile_turf_ratings(batch_size=1)), [self.arena.id, self.court.id])
+        self.assertTotals(self.arena, 4, 1)
+        self.assertTotals(self.court, 2, 1)
+        out = io.StringIO()
+        call_command('reconcile_turf_ratings', stdout=out)
+        self.assertIn('Turf ratings are in sync.', out.getvalue())
+
+# -----------------------------------------------------------------------------
+# Owner Analytics Tests
+# -----------------------------------------------------------------------------
+
+@override_settings(TURF_JOBS_EAGER=False)
+class OwnerAnalyticsTests(TestCase):
+    """Checks the dashboard ranges, occupancy and heatmap against a small hand-counted fixture."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.arena = make_turf(cls.owner)
+        # Open until midnight: 360 minutes a day.
+        cls.night = make_turf(cls.owner, name='Night', price_per_hour=600, open_time=time(18), close_time=time(0))
+        cls.monday = date(2030, 3, 4)
+        tuesday = cls.monday + timedelta(days=1)
+        for turf, day, start, end, status, price in (
+            (cls.arena, cls.monday, time(10), time(12), 'Confirmed', 2000),
+            (cls.arena, cls.monday, time(10, 30), time(11), 'Completed', 500),
+            (cls.arena, cls.monday, time(18), time(20), 'Blocked', None),
+            (cls.arena, tuesday, time(8), time(9), 'Cancelled', 1000),
+            (cls.night, tuesday, time(22), time(0), 'Confirmed', 1200),
+        ):
+            Booking.objects.create(
+                turf=turf, player=cls.player, date=day, start_time=start, end_time=end, status=status, total_price=price,
+            )
+        run_pending()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_resolve_range(self):
+        self.assertEqual(resolve_range('monthly', 2028, 2), (date(2028, 2, 1), date(2028, 2, 29), 'day'))
+        self.assertEqual(resolve_range('monthly', 2030, 12), (date(2030, 12, 1), date(2030, 12, 31), 'day'))
+        self.assertEqual(resolve_range('annually', 2030, 3), (date(2030, 1, 1), date(2030, 12, 31), 'month'))
+        self.assertEqual(resolve_range('monthly', 2030), (date(2030, 1, 1), date(2030, 12, 31), 'month'))
+
+    def test_midnight_close_counts_as_open(self):
+        self.assertEqual(daily_open_minutes(self.owner), 960 + 360)
+
+    def test_monthly_report(self):
+        report = owner_report(self.owner, *resolve_range('monthly', 2030, 3))
+        self.assertEqual(len(report['labels']), 31)
+        self.assertEqual(report['bookings'][3:6], [2, 1, 0])
+        self.assertEqual(report['revenue'][3:5], [2500.0, 1200.0])
+        # 150 and 120 booked minutes out of 1320 open minutes a day.
+        self.assertEqual(report['occupancy'][3:6], [11.36, 9.09, 0])
+        self.assertEqual(report['totals'], {'revenue': 3700.0, 'bookings': 3, 'occupancy': 0.66})
+
+    def test_annual_report(self):
+        report = owner_report(self.owner, *resolve_range('annually', 2030))
+        self.assertEqual(report['labels'][:3], ['Jan 2030', 'Feb 2030', 'Mar 2030'])
+        self.assertEqual(report['bookings'], [0, 0, 3] + [0] * 9)
+        self.assertEqual(report['occupancy'][2], 0.66)
+        self.assertEqual(report['totals']['occupancy'], round(270 * 100 / (1320 * 365), 2))
+
+    def test_heatmap(self):
+        heatmap = hour_of_week_heatmap(self.owner, date(2030, 3, 1), date(2030, 3, 31))
+        expected = [[0] * 24 for _ in range(7)]
+        expected[0][10], expected[0][11] = 2, 1
+        expected[1][22] = expected[1][23] = 1
+        self.assertEqual(heatmap, expected)
+
+    def test_cached_reports_are_invalidated_on_commit(self):
+        start, end, granularity = resolve_range('monthly', 2030, 3)
+        self.assertEqual(owner_report(self.owner, start, end, granularity)['totals']['bookings'], 3)
+        version = owner_stats_version(self.owner.pk)
+        Booking.objects.filter(turf=self.arena, status='Cancelled').update(status='Confirmed')
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_day_stats(self.arena.id, self.monday + timedelta(days=1))
+            self.assertEqual(owner_stats_version(self.owner.pk), version)
+        self.assertEqual(owner_stats_version(self.owner.pk), version + 1)
+        self.assertEqual(owner_report(self.owner, start, end, granularity)['totals']['bookings'], 4)
+
+
+# -----------------------------------------------------------------------------
+# Booking Lifecycle Tests
+# -----------------------------------------------------------------------------
+
+class BookingLifecycleTests(TestCase):
+    """Completes ended bookings in date batches and resumes from the watermark."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.turf = make_turf(cls.owner)
+        cls.today = date.today()
+        cls.now = timezone.make_aware(datetime.combine(cls.today, time(12)))
+
+    def _book(self, days, start, status='Confirmed'):
+        return Booking.objects.create(
+            turf=self.turf, player=self.player, date=self.today + timedelta(days=days),
+            start_time=time(start), end_time=time(start + 1), status=status, total_price=1000,
+        )
+
+    def test_ended_bookings_are_completed(self):
+        past = [self._book(-days, 9) for days in range(1, 21)]
+        cancelled = self._book(-3, 11, status='Cancelled')
+        ended_today, later_today, tomorrow = self._book(0, 10), self._book(0, 13), self._book(1, 10)
+
+        self.assertEqual(complete_past_bookings(batch_days=7, now=self.now), 21)
+        statuses = dict(Booking.objects.values_list('id', 'status'))
+        self.assertTrue(all(statuses[booking.id] == 'Completed' for booking in past + [ended_today]))
+        self.assertEqual(statuses[cancelled.id], 'Cancelled')
+        self.assertEqual(statuses[later_today.id], 'Confirmed')
+        self.assertEqual(statuses[tomorrow.id], 'Confirmed')
+
+    def test_sweeps_resume_from_the_watermark(self):
+        self._book(-10, 9)
+        complete_past_bookings(now=self.now)
+        # Days before the watermark are not looked at again unless restarted.
+        straggler = self._book(-5, 15)
+        with profile() as resumed:
+            self.assertEqual(complete_past_bookings(now=self.now), 0)
+        self.assertFalse(any('BETWEEN' in sql for sql in resumed.statements))
+        self.assertEqual(complete_past_bookings(restart=True, now=self.now), 1)
+        straggler.refresh_from_db()
+        self.assertEqual(straggler.status, 'Completed')
+
+
+# -----------------------------------------------------------------------------
+# Export Tests
+# -----------------------------------------------------------------------------
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class ExportTests(TestCase):
+    """Streams an owner's bookings and transactions in chunks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        other = make_owner('other@example.com')
+        cls.player = make_player(email='player@example.com')
+        cls.turf = make_turf(cls.owner)
+        other_turf = make_turf(other, name='Elsewhere', location='Calicut', price_per_hour=800)
+        cls.start = date(2025, 1, 1)
+        for offset in range(5):
+            for turf in (cls.turf, other_turf):
+                booking = Booking.objects.create(
+                    turf=turf, player=cls.player, date=cls.start + timedelta(days=offset),
+                    start_time=time(9, 30), end_time=time(11), status='Completed', total_price=1500,
+                )
+                Transaction.objects.create(booking=booking, amount=booking.total_price)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def _get(self, **params):
+        response = self.client.get(reverse('export_bookings'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_is_limited_to_the_owner_and_date_range(self):
+        response, content = self._get(start='2025-01-02', end='2025-01-04')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual([row['date'] for row in rows], ['2025-01-02', '2025-01-03', '2025-01-04'])
+        self.assertEqual({row['turf'] for row in rows}, {'Arena'})
+        self.assertEqual(rows[0]['start_time'], '09:30:00')
+        self.assertEqual(rows[0]['player_email'], 'player@example.com')
+
+    def test_rows_are_written_one_chunk_at_a_time(self):
+        chunks = list(stream_csv('transactions', export_queryset('transactions', owner=self.owner), chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunk.count('\n') for chunk in chunks), 6)
+
+    def test_bad_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(reverse('export_bookings'), {'kind': 'ratings'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_bookings'), {'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_bookings'), {'start': '01/02/2025'}).status_code, 400)
+
+    @skipUnless(pq, 'pyarrow is not installed')
+    def test_parquet_round_trips(self):
+        _, content = self._get(kind='transactions', format='parquet')
+        table = pq.read_table(io.BytesIO(content))
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(str(table.column('amount')[0]), '1500.00')
+        self.assertEqual(table.column('booking_date').to_pylist()[0], self.start)
+
+
+# -----------------------------------------------------------------------------
+# Booking History Tests
+# -----------------------------------------------------------------------------
+
+class BookingHistoryTests(TestCase):
+    """Pages booking histories with keyset cursors and status/date filters."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.turf = make_turf(cls.owner)
+        cls.start = date(2025, 3, 1)
+        # Two bookings share each (date, start_time) so the id tie-breaker matters.
+        Booking.objects.bulk_create([
+            Booking(
+                turf=cls.turf, player=cls.player, date=cls.start + timedelta(days=n // 6), start_time=time(8 + n % 3),
+                end_time=time(9 + n % 3), status='Cancelled' if n % 5 == 0 else 'Completed', total_price=1000,
+            )
+            for n in range(60)
+        ])
+
+    def _walk(self, name, kwargs=None, **params):
+        seen, queries, url = [], [], reverse(name, kwargs=kwargs)
+        while True:
+            with profile() as current:
+                data = self.client.get(url, params).json()
+            queries.append(current.queries)
+            seen += data['results']
+            if not data['next_cursor']:
+                return seen, queries
+            params['cursor'] = data['next_cursor']
+
+    def test_pages_cover_every_booking_once_in_order(self):
+        self.client.force_login(self.player)
+        seen, queries = self._walk('my_bookings_api')
+        expected = list(Booking.objects.order_by('-date', '-start_time', '-id').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in seen], expected)
+        self.assertEqual(len(set(queries)), 1)
+
+    def test_filters_apply_to_every_page(self):
+        self.client.force_login(self.owner)
+        seen, _ = self._walk('turf_bookings_api', {'turf_id': self.turf.id}, status='Cancelled', to='2025-03-05')
+        expected = Booking.objects.filter(status='Cancelled', date__lte=date(2025, 3, 5))
+        self.assertEqual(sorted(row['id'] for row in seen), sorted(expected.values_list('id', flat=True)))
+
+    def test_malformed_cursors_start_from_the_first_page(self):
+        self.client.force_login(self.player)
+        first = self.client.get(reverse('my_bookings_api')).json()['results']
+        for payload in ([5, 1], [['2025-03-01', '08:00'], 1], [None, 1], ['2025-03-01', 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            with self.subTest(payload=payload):
+                response = self.client.get(reverse('my_bookings_api'), {'cursor': cursor})
+                self.assertEqual(response.json()['results'], first)
+                self.assertEqual(self.client.get(reverse('my_bookings'), {'cursor': cursor}).status_code, 200)
+        self.assertEqual(self.client.get(reverse('my_bookings_api'), {'cursor': 'bad'}).json()['results'], first)
+
+    def test_html_page_links_to_the_next_page(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('view_bookings', kwargs={'turf_id': self.turf.id}))
+        self.assertEqual(len(response.context['bookings']), 20)
+        self.assertIn('cursor=', response.context['next_query'])
+
+
+# -----------------------------------------------------------------------------
+# Image Variant Tests
+# -----------------------------------------------------------------------------
+
+class ImageVariantsTests(TestCase):
+    """Uploaded turf images are resized, stripped and content-addressed off the request."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.turf = make_turf(cls.owner, no_of_players=10)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _upload(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+        exif[0x0112] = 6  # Rotated 90 degrees: stored landscape, shown portrait.
+        buffer = io.BytesIO()
+        Image.new('RGB', (1600, 900), 'green').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('pitch.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def _save_form(self):
+        data = {
+            'name': 'Arena', 'location': 'Kochi', 'sports_type': 'Football', 'price_per_hour': '1000',
+            'no_of_players': '10', 'open_time': '06:00', 'close_time': '22:00',
+        }
+        form = TurfVenueForm(data, {'image': self._upload()}, instance=self.turf)
+        self.assertTrue(form.is_valid(), form.errors)
+        with override_settings(TURF_JOBS_EAGER=False):
+            return form.save()
+
+    def test_form_save_queues_resized_stripped_variants(self):
+        turf = self._save_form()
+        self.assertEqual(turf.image_variants, {})
+        self.assertTrue(Job.objects.filter(name='process_image', status='Queued').exists())
+
+        self.assertEqual(run_pending(), (1, 0))
+        turf.refresh_from_db()
+        variants = turf.image_variants
+        self.assertEqual(variants['source'], turf.image.name)
+        # Portrait after the EXIF rotation, so 1280 is capped at the 900px width.
+        self.assertEqual([width for width, _ in variants['webp']], [320, 640, 900])
+        for width, name in variants['jpeg']:
+            self.assertRegex(name, rf'^turf_images/variants/[0-9a-f]{{20}}-{width}w\.jpeg$')
+        with default_storage.open(variants['jpeg'][0][1]) as handle, Image.open(handle) as image:
+            self.assertEqual(image.size, (320, 569))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_backfill_reuses_content_hashed_files(self):
+        turf = self._save_form()
+        first = build_variants(turf.image.name, (320, 640))
+        self.assertEqual(build_variants(turf.image.name, (320, 640)), first)
+
+        call_command('process_images', stdout=io.StringIO())
+        turf.refresh_from_db()
+        self.assertEqual(turf.image_variants['jpeg'][:2], first['jpeg'])
+
+        html = responsive_image(turf.image, turf.image_variants, sizes='400px', alt='Arena')
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(f"{default_storage.url(first['webp'][0][1])} 320w", html)
+        # Until the variants exist, the original is served as-is.
+        self.assertIn(turf.image.url, responsive_image(turf.image, {}, alt='Arena'))
+
+
+# -----------------------------------------------------------------------------
+# Pricing Tests
+# -----------------------------------------------------------------------------
+
+class PricingTests(TestCase):
+    """Price rules, holidays and surge compile into a weekly table that quotes intervals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_owner()
+        cls.player = make_player()
+        cls.turf = make_turf(cls.owner)
+        cls.saturday, cls.monday = date(2030, 1, 5), date(2030, 1, 7)
+
+    def _quote(self, day, start, end):
+        self.turf.refresh_from_db()
+        return str(PriceTable(self.turf).quote(day, start, end))
+
+    def test_rules_and_holidays(self):
+        self.assertEqual(self._quote(self.monday, time(9, 15), time(10)), '750.00')
+        create_price_rule(self.turf, weekdays=0b1100000, start_time=time(6), end_time=time(22), multiplier='1.5', label='Weekend')
+        create_price_rule(self.turf, weekdays=0b1111111, start_time=time(18), end_time=time(22), multiplier='1.2')
+
+        self.assertEqual(self._quote(self.saturday, time(18), time(19, 30)), '2700.00')
+        self.assertEqual(self._quote(self.monday, time(17, 30), time(18, 30)), '1100.00')
+        # Off-grid edges are charged by the minute.
+        self.assertEqual(self._quote(self.monday, time(17, 45), time(18, 15)), '550.00')
+
+        set_price_holiday(self.turf, self.monday)
+        self.assertEqual(self._quote(self.monday, time(17, 30), time(18, 30)), '1650.00')
+        with self.assertRaises(BookingError):
+            create_price_rule(self.turf, weekdays=1, start_time=time(18), end_time=time(20), multiplier='50')
+
+    def test_surge_follows_recent_occupancy(self):
+        today = date.today()
+        for weeks in range(1, 5):
+            Booking.objects.create(
+                turf=self.turf, player=self.player, date=today - timedelta(weeks=weeks),
+                start_time=time(20), end_time=time(21), status='Completed', total_price=1000,
+            )
+        set_surge_multiplier(self.turf, '1.5')
+        next_week = today + timedelta(weeks=1)
+        self.assertEqual(self._quote(next_week, time(20), time(21)), '1500.00')
+        self.assertEqual(self._quote(next_week, time(19), time(20)), '1000.00')
+
+    def test_booking_page_and_booking_use_the_table(self):
+        create_price_rule(self.turf, weekdays=0b1111111, start_time=time(18), end_time=time(22), multiplier='2')
+        day = date.today() + timedelta(days=1)
+        self.client.force_login(self.player)
+        response = self.client.get(reverse('booking_page', kwargs={'turf_id': self.turf.id}), {'date': day.isoformat()})
+        prices = {slot['start_time']: str(slot['price']) for slot in response.context['slots']}
+        self.assertEqual((prices[time(17, 30)], prices[time(18)]), ('500.00', '1000.00'))
+
+        self.turf.refresh_from_db()
+        booking = create_booking(self.turf, self.player, day, time(17, 30), time(19))
+        self.assertEqual(str(booking.total_price), '2500.00')
+
+
+# -----------------------------------------------------------------------------
+# Slot Hold Tests
+# -----------------------------------------------------------------------------
+
+class SlotHoldTests(TestCase):
+    """Holds reserve an interval during checkout and turn contention into early refusals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        cls.first = make_player('first@example.com')
+        cls.second = make_player('second@example.com')
+        cls.turf = make_turf(owner)
+        cls.day = date.today() + timedelta(days=1)
+
+    def _slots(self, player):
+        self.client.force_login(player)
+        response = self.client.get(reverse('booking_page', kwargs={'turf_id': self.turf.id}), {'date': self.day.isoformat()})
+        return {slot['start_time']: slot for slot in response.context['slots']}
+
+    def test_hold_refuses_other_players_until_it_expires(self):
+        hold_slot(self.turf, self.first, self.day, time(18), time(19))
+        with self.assertRaises(BookingError):
+            hold_slot(self.turf, self.second, self.day, time(18, 30), time(19, 30))
+        with self.assertRaises(BookingError):
+            create_booking(self.turf, self.second, self.day, time(18), time(19))
+        self.assertTrue(self._slots(self.second)[time(18, 30)]['is_held'])
+        self.assertTrue(self._slots(self.first)[time(18, 30)]['is_available'])
+
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        hold_slot(self.turf, self.second, self.day, time(18, 30), time(19, 30))
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(SlotHold.objects.get().player, self.second)
+
+    def test_booking_converts_the_players_hold(self):
+        hold_slot(self.turf, self.first, self.day, time(9), time(10))
+        # A new pick replaces the player's earlier hold on the day.
+        hold = hold_slot(self.turf, self.first, self.day, time(18), time(19))
+        self.assertEqual(list(SlotHold.objects.all()), [hold])
+        self.assertLessEqual(hold.expires_at - timezone.now(), timedelta(seconds=HOLD_SECONDS))
+
+        create_booking(self.turf, self.first, self.day, time(18), time(19))
+        self.assertFalse(SlotHold.objects.exists())
+        self.assertTrue(Booking.objects.filter(player=self.first, start_time=time(18)).exists())
+
+    def test_holds_api(self):
+        url = reverse('slot_holds_api')
+        data = {'turf': self.turf.id, 'date': self.day.isoformat(), 'start_time': '20:00', 'end_time': '21:00'}
+        self.client.force_login(self.first)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 201)
+        token = response.json()['token']
+
+        self.client.force_login(self.second)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.post(url, {**data, 'end_time': 'late'}).status_code, 400)
+
+        self.client.force_login(self.first)
+        self.assertEqual(self.client.get(url).json()['holds'][0]['token'], token)
+        self.assertTrue(self.client.post(url, {'release': token}).json()['released'])
+        self.assertFalse(SlotHold.objects.exists())
+
+# -----------------------------------------------------------------------------
+# Mobile API Tests
+# -----------------------------------------------------------------------------
+
+class MobileApiTests(TestCase):
+    """The async /api/v1/ views: auth, conditional availability, booking and cancelling."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        cls.player = make_player()
+        cls.other = make_player('other@example.com')
+        cls.turf = make_turf(owner)
+        cls.day = date.today() + timedelta(days=1)
+
+    def setUp(self):
+        slot_cache().clear()
+
+    def _availability(self, **headers):
+        url = reverse('api_availability', kwargs={'turf_id': self.turf.id})
+        return self.client.get(url, {'date': self.day.isoformat()}, headers=headers)
+
+    def test_requires_login(self):
+        response = self.client.get(reverse('api_turfs'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Authentication required.'})
+
+    def test_availability_revalidates_with_etag(self):
+        self.client.force_login(self.player)
+        response = self._availability()
+        data = response.json()
+        self.assertEqual(len(data['free']), 32)
+        self.assertEqual(set(data['free']), {'1'})
+        self.assertEqual(data['prices'][0], '500.00')
+        etag = response['ETag']
+
+        self.assertEqual(self._availability(if_none_match=etag).status_code, 304)
+        # Another player's hold changes what this player may book.
+        hold_slot(self.turf, self.other, self.day, time(6), time(7))
+        response = self._availability(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['free'].startswith('0011'))
+
+    def test_book_and_cancel(self):
+        self.client.force_login(self.player)
+        url = reverse('api_bookings')
+        data = {'turf': self.turf.id, 'date': self.day.isoformat(), 'start_time': '18:00', 'end_time': '19:00'}
+        response = self.client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        booking = response.json()
+        self.assertEqual(booking['status'], 'Confirmed')
+        self.assertEqual(self.client.post(url, data, content_type='application/json').status_code, 409)
+        self.assertEqual(self.client.post(url, {**data, 'date': 'soon'}, content_type='application/json').status_code, 400)
+        self.assertEqual([row['id'] for row in self.client.get(url).json()['results']], [booking['id']])
+
+        self.client.force_login(self.other)
+        detail = reverse('api_booking', kwargs={'booking_id': booking['id']})
+        self.assertEqual(self.client.delete(detail).status_code, 404)
+        self.client.force_login(self.player)
+        self.assertEqual(self.client.delete(detail).json()['status'], 'Cancelled')
+        self.assertEqual(Booking.objects.get(pk=booking['id']).status, 'Cancelled')
+
+    def test_rejects_impossible_player_counts(self):
+        self.client.force_login(self.player)
+        url = reverse('api_bookings')
+        data = {'turf': self.turf.id, 'date': self.day.isoformat(), 'start_time': '18:00', 'end_time': '19:00'}
+        for players in (0, -3):
+            response = self.client.post(url, {**data, 'players': players}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        TurfVenue.objects.filter(pk=self.turf.pk).update(no_of_players=10)
+        response = self.client.post(url, {**data, 'players': 11}, content_type='application/json')
+        self.assertEqual(response.json(), {'error': 'Bring between 1 and 10 players.'})
+        self.assertFalse(Booking.objects.exists())
+        response = self.client.post(url, {**data, 'players': 10}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_malformed_cursor_lists_from_the_start(self):
+        Booking.objects.create(
+            turf=self.turf, player=self.player, date=self.day,
+            start_time=time(18), end_time=time(19), status='Confirmed',
+        )
+        self.client.force_login(self.player)
+        url = reverse('api_bookings')
+        first = self.client.get(url).json()['results']
+        for cursor in ('bad', base64.urlsafe_b64encode(b'[5, 1]').decode()):
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['results'], first)
+
+    def test_session_login_with_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        session_url = reverse('api_session')
+        credentials = {'email': 'player@example.com', 'password': 'secret-pass'}
+        self.player.set_password(credentials['password'])
+        self.player.save()
+
+        # Without the cookie and header the CSRF middleware refuses the write.
+        self.assertEqual(client.post(session_url, credentials, content_type='application/json').status_code, 403)
+        response = client.get(session_url)
+        self.assertEqual(response.json()['user'], None)
+        token = response.json()['csrf_token']
+        self.assertIn('csrftoken', response.cookies)
+
+        wrong = {**credentials, 'password': 'nope'}
+        response = client.post(session_url, wrong, content_type='application/json', headers={'x-csrftoken': token})
+        self.assertEqual(response.status_code, 401)
+        response = client.post(session_url, credentials, content_type='application/json', headers={'x-csrftoken': token})
+        self.assertEqual(response.json()['user']['id'], self.player.id)
+        token = response.json()['csrf_token']
+
+        url = reverse('api_bookings')
+        data = {'turf': self.turf.id, 'date': self.day.isoformat(), 'start_time': '18:00', 'end_time': '19:00'}
+        self.assertEqual(client.post(url, data, content_type='application/json').status_code, 403)
+        response = client.post(url, data, content_type='application/json', headers={'x-csrftoken': token})
+        self.assertEqual(response.status_code, 201)
+        detail = reverse('api_booking', kwargs={'booking_id': response.json()['id']})
+        self.assertEqual(client.delete(detail).status_code, 403)
+        self.assertEqual(client.delete(detail, headers={'x-csrftoken': token}).json()['status'], 'Cancelled')
+
+# -----------------------------------------------------------------------------
+# Live Availability Tests
+# -----------------------------------------------------------------------------
+
+class RecordingBroker(LocalBroker):
+    """LocalBroker that also keeps every published message."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return super().publish(channel, message)
+
+
+@override_settings(TURF_LIVE_BROKER={'BACKEND': 'TurfApp.tests.RecordingBroker'})
+class LiveAvailabilityTests(TestCase):
+    """Slot changes reach open booking pages once their transaction commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_owner()
+        cls.player = make_player()
+        cls.turf = make_turf(owner)
+        cls.day = date.today() + timedelta(days=3)
+
+    def _published(self, write):
+        broker().published.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            result = write()
+        return result, [(channel, message['free'], message['slots']) for channel, message in broker().published]
+
+    def test_writes_publish_slot_deltas(self):
+        channel = live_channel(self.turf.id, self.day)
+        booking, published = self._published(
+            lambda: create_booking(self.turf, self.player, self.day, time(18), time(19)))
+        self.assertEqual(published, [(channel, False, [['18:00', '19:00']])])
+        _, published = self._published(lambda: cancel_booking(booking))
+        self.assertEqual(published, [(channel, True, [['18:00', '19:00']])])
+
+        block, published = self._published(lambda: block_slot(self.turf, self.day, time(6), time(8)))
+        self.assertEqual(published, [(channel, False, [['06:00', '08:00']])])
+        _, published = self._published(block.delete)
+        self.assertEqual(published, [(channel, True, [['06:00', '08:00']])])
+
+        def clash():
+            create_booking(self.turf, self.player, self.day, time(9), time(10))
+            create_booking(self.turf, self.player, self.day, time(9), time(10))
+        with self.assertRaises(BookingError):
+            self._published(clash)
+        # Nothing from the failed second write; the first committed normally.
+        self.assertEqual(len(broker().published), 1)
+
+    def test_block_rules_publish_every_day(self):
+        start = self.day
+        (rule, result), published = self._published(lambda: create_block_rule(
+            self.turf, weekdays=127, start_time=time(20), end_time=time(22),
+            start_date=start, end_date=start + timedelta(days=2), reason='League',
+        ))
+        self.assertEqual(result['created'], 3)
+        days = [live_channel(self.turf.id, start + timedelta(days=i)) for i in range(3)]
+        self.assertEqual([channel for channel, _, _ in published], days)
+        self.assertFalse(any(free for _, free, _ in published))
+
+        _, published = self._published(lambda: remove_block_rule(rule))
+        self.assertEqual(published, [(channel, True, [['20:00', '22:00']]) for channel in days])
+
+    def test_local_broker_fans_out_from_other_threads(self):
+        hub = LocalBroker(max_pending=2)
+        channel = live_channel(self.turf.id, self.day)
+
+        async def listen():
+            first, second = hub.subscribe(channel), hub.subscribe(channel)
+            other = hub.subscribe(live_channel(self.turf.id, self.day + timedelta(days=1)))
+            self.assertEqual(await asyncio.to_thread(hub.publish, channel, {'n': 1}), 2)
+            received = [await first.get(1), await second.get(1), await other.get(0.01)]
+            for n in range(2, 5):
+                await asyncio.to_thread(hub.publish, channel, {'n': n})
+            # A reader that falls behind gets one resync instead of the backlog.
+            received.append(await first.get(1))
+            for subscription in (first, second, other):
+                hub.unsubscribe(subscription)
+            return received
+
+        self.assertEqual(asyncio.run(listen()), [{'n': 1}, {'n': 1}, None, RESYNC])
+        self.assertEqual(hub.subscriber_count(), 0)
+
+    @override_settings(TURF_LIVE_STREAM_SECONDS=0)
+    def test_stream_opens_with_a_snapshot(self):
+        Booking.objects.create(
+            turf=self.turf, player=self.player, date=self.day, start_time=time(6), end_time=time(7), total_price=1000,
+        )
+        self.async_client.force_login(self.player)
+        response = async_to_sync(self.async_client.get)(
+            reverse('live_slots', kwargs={'turf_id': self.turf.id}), {'date': self.day.isoformat()},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = stream_body(response).decode()
+        self.assertIn('data: {"type":"snapshot","free":"00' + '1' * 30 + '"}', body)
+        self.assertEqual(broker().subscriber_count(), 0)
+
+        page = async_to_sync(self.async_client.get)(
+            reverse('booking_page', kwargs={'turf_id': self.turf.id}), {'date': self.day.isoformat()},
+        )
+        self.assertContains(page, 'const liveUpdates = true;')
+
+    def test_wsgi_requests_get_no_stream(self):
+        # Under WSGI the stream would be buffered until it ends, holding a worker throughout.
+        self.client.force_login(self.player)
+        response = self.client.get(reverse('live_slots', kwargs={'turf_id': self.turf.id}), {'date': self.day.isoformat()})
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+        self.assertEqual(broker().subscriber_count(), 0)
+
+        page = self.client.get(reverse('booking_page', kwargs={'turf_id': self.turf.id}), {'date': self.day.isoformat()})
+        self.assertFalse(page.context['live_updates'])
+        self.assertContains(page, 'const liveUpdates = false;')
+
+# -----------------------------------------------------------------------------
+# Waitlist Tests
+# -----------------------------------------------------------------------------
+
+class WaitlistTests(TestCase):
+    """Freed time goes to the oldest waiters it fits, as holds, in one pass."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = [make_player(f'p{i}@example.com', email=f'p{i}@example.com') for i in range(5)]
+        cls.turf = make_turf(make_owner())
+        cls.day = date.today() + timedelta(days=2)
+
+    def _wait(self, player, start_hour, end_hour):
+        return join_waitlist(self.turf, player, self.day, time(start_hour), time(end_hour))
+
+    def test_cancellation_promotes_the_oldest_waiters_that_fit(self):
+        first, second, third, fourth, fifth = self.players
+        booking = create_booking(self.turf, first, self.day, time(18), time(20))
+        create_booking(self.turf, first, self.day, time(17), time(18))
+        oldest = self._wait(second, 18, 19)
+        overlapping = self._wait(third, 18, 20)
+        self._wait(fourth, 19, 20)
+        partial = self._wait(fifth, 17, 19)
+        run_pending()
+        mail.outbox.clear()
+
+        cancel_booking(booking)
+        with mock.patch('TurfApp.waitlist.match_waiters', wraps=match_waiters) as matcher:
+            run_pending()
+        # The pass never loads a waiter that does not fit the freed time.
+        (entries, _, _), = [call.args for call in matcher.call_args_list]
+        self.assertEqual(len(entries), 3)
+        self.assertNotIn(partial, entries)
+        holds = {(hold.player_id, hold.start_time, hold.end_time) for hold in SlotHold.objects.all()}
+        self.assertEqual(holds, {(second.id, time(18), time(19)), (fourth.id, time(19), time(20))})
+        self.assertEqual(set(WaitlistEntry.objects.all()), {overlapping, partial})
+        offers = sorted(message.to[0] for message in mail.outbox if 'waitlisted' in message.subject)
+        self.assertEqual(offers, [second.email, fourth.email])
+        self.assertFalse(WaitlistEntry.objects.filter(pk=oldest.pk).exists())
+
+        # An offer that runs out passes the time on to the next waiter.
+        SlotHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_holds(), 2)
+        run_pending()
+        self.assertEqual(SlotHold.objects.get().player, third)
+
+        # Booking what they waited for takes a player off the list.
+        create_booking(self.turf, third, self.day, time(18), time(20))
+        self.assertEqual(list(WaitlistEntry.objects.all()), [partial])
+
+    def test_unblock_promotes_waiters(self):
+        block = block_slot(self.turf, self.day, time(6), time(8))
+        self._wait(self.players[0], 6, 7)
+        block.delete()
+        run_pending()
+        self.assertEqual(SlotHold.objects.get().player, self.players[0])
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_waitlist_api(self):
+        url = reverse('waitlist_api')
+        create_booking(self.turf, self.players[1], self.day, time(20), time(21))
+        self.client.force_login(self.players[0])
+        data = {'turf': self.turf.id, 'date': self.day.isoformat(), 'start_time': '20:00', 'end_time': '21:00'}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.post(url, data).json()['id'], response.json()['id'])
+        # Free time should simply be booked.
+        self.assertEqual(self.client.post(url, {**data, 'start_time': '07:00', 'end_time': '08:00'}).status_code, 409)
+
+        self.assertEqual(len(self.client.get(url).json()['entries']), 1)
+        self.assertTrue(self.client.post(url, {'leave': response.json()['id']}).json()['left'])
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_matching_ignores_partial_overlaps(self):
+        created = timezone.now()
+        # Hundreds of waiters straddle the one free hour; only the two inside it can be served.
+        entries = [
+            SimpleNamespace(id=i, player_id=i, created_at=created, start_time=time(9 + i % 4), end_time=time(14 + i % 5))
+            for i in range(400)
+        ]
+        inside = [
+            SimpleNamespace(id=1000 + i, player_id=1000 + i, created_at=created, start_time=time(12), end_time=time(13))
+            for i in range(2)
+        ]
+        grid = DayGrid(time(6), time(22))
+        grid.mark(time(6), time(12))
+        grid.mark(time(13), time(22))
+        self.assertEqual(match_waiters(entries + inside, grid), inside[:1])
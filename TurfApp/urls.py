@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 # This is the app's URL configuration.
 # The name 'owner_view' is used for the main dashboard URL.
@@ -17,15 +17,34 @@ urlpatterns = [
     path('receipt/<int:booking_id>/', views.booking_receipt_view, name='booking_receipt'),
     path('my-bookings/', views.my_bookings_view, name='my_bookings'),
     path('cancel-booking/<int:booking_id>/', views.cancel_booking_view, name='cancel_booking'),
+    path('api/my-bookings/', views.my_bookings_api, name='my_bookings_api'),
+    path('api/availability/', views.availability_api, name='availability_api'),
+    path('api/holds/', views.slot_holds_api, name='slot_holds_api'),
+    path('api/waitlist/', views.waitlist_api, name='waitlist_api'),
+    path('api/live/<int:turf_id>/', api.live_slots_stream, name='live_slots'),
+    path('api/search/', views.turf_search_api, name='turf_search_api'),
+    path('api/search/autocomplete/', views.turf_autocomplete_api, name='turf_autocomplete_api'),
 
     # Owner Views
     path('ownerdashboard/', views.owner_dashboard_view, name='owner_view'),
     path('turf/add/', views.turf_view, name='turf_add'),
     path('turf/<int:turf_id>/edit/', views.edit_turf, name='edit_turf'),
     path('turf/<int:turf_id>/bookings/', views.view_bookings, name='view_bookings'),
+    path('api/turf/<int:turf_id>/bookings/', views.turf_bookings_api, name='turf_bookings_api'),
+    path('owner/export/', views.export_bookings, name='export_bookings'),
     path('owner/booking/<int:booking_id>/', views.owner_booking_detail_view, name='owner_booking_detail'),
     path('turf/<int:turf_id>/slots/', views.manage_slots, name='manage_slots'),
 
+    # Mobile JSON API (async)
+    path('api/v1/session/', api.session_api, name='api_session'),
+    path('api/v1/turfs/', api.turfs_api, name='api_turfs'),
+    path('api/v1/turfs/<int:turf_id>/availability/', api.availability_api, name='api_availability'),
+    path('api/v1/bookings/', api.bookings_api, name='api_bookings'),
+    path('api/v1/bookings/<int:booking_id>/', api.booking_api, name='api_booking'),
+
+    # Diagnostics
+    path('api/debug/view-stats/', views.view_stats_api, name='view_stats_api'),
+
     # Placeholder/Static Views
     path('cricket/', views.cricket_view, name='cricket_view'),
     path('football/', views.football_view, name='football_view'),
@@ -1,17 +1,35 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import Http404, JsonResponse, QueryDict, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
 from datetime import datetime, timedelta, date, time
-from .models import TurfUser, TurfVenue, Booking, Rating, Transaction
+from .models import TurfUser, TurfVenue, Amenity, Booking, BlockRule, PriceHoliday, PriceRule, SlotHold, Transaction, OwnerDayStats, WaitlistEntry
 from .forms import UpdateProfileForm, PasswordChangeForm, TurfVenueForm
-from decimal import Decimal
-from django.db.models import Q, Sum, Count, Avg, Min, Max
-from django.db.models.functions import TruncMonth, TruncDay
+from .availability import DayGrid, SLOT_MINUTES, build_day_grids, pack_into_lanes
+from .services import (
+    BookingError, block_slot, cancel_booking, create_block_rule, create_booking, create_price_rule, day_holds,
+    hold_slot, release_hold, remove_block_rule, set_price_holiday, set_surge_multiplier,
+)
+from .pricing import PriceTable
+from .waitlist import join_waitlist, leave_waitlist
+from .analytics import owner_report, resolve_range
+from .search import TurfSearch
+from .search_index import get_index
+from .profiling import view_stats
+from .slot_cache import cached_turf_day, slot_cache
+from .live import serves_live_streams
+from .exports import EXPORT_FORMATS, ExportError, export_queryset, stream_export
+from .history import BOOKING_STATUSES, BookingHistory
+from .templatetags.booking_tags import is_cancellable
+from django.db.models import Q, Sum
 from django.core.paginator import Paginator
 from django.urls import reverse
+from django.conf import settings
 import calendar
+import uuid
+from itertools import chain
 
 # -----------------------------------------------------------------------------
 # Helper Functions for Role Checks
@@ -46,7 +64,7 @@ def login_view(request):
         else:
             messages.error(request, "Invalid email or password.")
             
-    return render(request, 'login.html')
+    return render(request, 'Login.html')
 
 def signup_view(request):
     """Handles new user registration."""
@@ -90,24 +108,39 @@ def landing_view(request):
 @login_required
 @user_passes_test(is_player)
 def home_view(request):
-    """Displays all available turfs for players."""
-    turfs = TurfVenue.objects.all()
-    return render(request, 'home.html', {'turfs': turfs})
+    """Displays the top-rated turfs for players."""
+    turfs, _ = TurfSearch(QueryDict('sort=rating')).page()
+    return render(request, 'Home.html', {'turfs': turfs})
 
 @login_required
 @user_passes_test(is_player)
 def home_turf_view(request):
-    """Displays a filterable list of turfs."""
-    turfs = TurfVenue.objects.all()
-    return render(request, 'home_turfs.html', {'turfs': turfs})
+    """Displays a filterable, sortable, cursor-paginated list of turfs."""
+    search = TurfSearch(request.GET)
+    turfs, next_cursor = search.page()
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+
+    context = {
+        'turfs': turfs,
+        'filters': request.GET,
+        'selected_amenities': search.amenities,
+        'amenities': Amenity.objects.all(),
+        'next_query': next_query,
+        'is_first_page': not request.GET.get('cursor'),
+    }
+    return render(request, 'home_turfs.html', context)
 
 @login_required
 @user_passes_test(is_player)
 def booking_view_player(request, turf_id):
     """Handles both displaying the booking page and creating a booking."""
-    turf = get_object_or_404(TurfVenue, id=turf_id)
-
     if request.method == 'POST':
+        turf = get_object_or_404(TurfVenue, id=turf_id)
         start_time_str = request.POST.get('start_time')
         end_time_str = request.POST.get('end_time')
         booking_date_str = request.POST.get('booking_date')
@@ -121,20 +154,13 @@ def booking_view_player(request, turf_id):
             messages.error(request, "You cannot book a turf for a past date.")
             return redirect('booking_page', turf_id=turf.id)
 
-        duration = (datetime.combine(date.today(), end_time) - datetime.combine(date.today(), start_time)).total_seconds() / 3600
-        total_price = Decimal(duration) * turf.price_per_hour
-
-        booking = Booking.objects.create(
-            turf=turf, player=request.user, date=booking_date,
-            start_time=start_time, end_time=end_time,
-            total_price=total_price, no_of_players=players
-        )
-        
-        Transaction.objects.create(
-            booking=booking,
-            amount=total_price,
-            status='Completed'
-        )
+        try:
+            booking = create_booking(
+                turf, request.user, booking_date, start_time, end_time, no_of_players=players
+            )
+        except BookingError as error:
+            messages.error(request, str(error))
+            return redirect(f"{reverse('booking_page', kwargs={'turf_id': turf.id})}?date={booking_date_str}")
         
         messages.success(request, "Booking created successfully!")
         return redirect('booking_receipt', booking_id=booking.id)
@@ -142,53 +168,275 @@ def booking_view_player(request, turf_id):
     else: # GET Request
         selected_date_str = request.GET.get('date', date.today().strftime('%Y-%m-%d'))
         selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date()
-        
-        bookings_on_date = Booking.objects.filter(
-            Q(status='Confirmed') | Q(status='Blocked'),
-            turf=turf, 
-            date=selected_date
-        )
-        
-        booked_slots = set()
-        for booking in bookings_on_date:
-            current_slot = datetime.combine(selected_date, booking.start_time)
-            end_time_dt = datetime.combine(selected_date, booking.end_time)
-            while current_slot < end_time_dt:
-                booked_slots.add(current_slot.time())
-                current_slot += timedelta(minutes=30)
-
-        slots = []
-        if turf.open_time and turf.close_time:
-            current_time = datetime.combine(selected_date, turf.open_time)
-            close_time = datetime.combine(selected_date, turf.close_time)
-            
-            while current_time < close_time:
-                slot_start_time = current_time.time()
-                end_of_slot = current_time + timedelta(minutes=30)
-                
-                is_past = selected_date == date.today() and slot_start_time < (timezone.now() - timedelta(minutes=10)).time()
-                is_booked = slot_start_time in booked_slots
-
-                slots.append({
-                    'start_time': slot_start_time,
-                    'end_time': end_of_slot.time(),
-                    'is_available': not is_booked and not is_past,
-                })
-                current_time = end_of_slot
+
+        # The turf and its day grid come from the versioned availability cache.
+        turf_day = cached_turf_day(turf_id, selected_date)
+        if turf_day is None:
+            raise Http404("No TurfVenue matches the given query.")
+        turf, grid = turf_day
+
+        past_slots = 0
+        if selected_date == date.today():
+            past_slots = grid.mask_before((timezone.now() - timedelta(minutes=10)).time())
+        # Holds are short-lived, so they are read fresh rather than cached with the grid.
+        held = grid.mask_intervals(day_holds(turf.id, selected_date, exclude_player=request.user).values_list('start_time', 'end_time'))
+        slots = grid.slots(blocked=past_slots, held=held)
+        # Quoted from the price table on the cached turf, so this costs no queries.
+        for slot, price in zip(slots, PriceTable(turf).slot_prices(selected_date, grid), strict=True):
+            slot['price'] = price
 
         context = {
             'turf': turf, 
             'slots': slots,
             'selected_date': selected_date.strftime('%Y-%m-%d'),
+            'live_updates': serves_live_streams(request),
         }
         return render(request, 'booking_player.html', context)
 
+def hold_json(hold):
+    return {
+        'token': str(hold.token),
+        'turf_id': hold.turf_id,
+        'date': hold.date.isoformat(),
+        'start_time': hold.start_time.strftime('%H:%M'),
+        'end_time': hold.end_time.strftime('%H:%M'),
+        'expires_at': hold.expires_at.isoformat(),
+    }
+
+@login_required
+@user_passes_test(is_player)
+def slot_holds_api(request):
+    """
+    GET lists the player's unexpired holds. POST `turf`, `date`, `start_time` and
+    `end_time` holds an interval while the player checks out (409 if it is
+    taken or held), and POST `release` with a hold token gives one up.
+    """
+    if request.method != 'POST':
+        holds = SlotHold.objects.filter(player=request.user, expires_at__gt=timezone.now()).order_by('date', 'start_time')
+        return JsonResponse({'holds': [hold_json(hold) for hold in holds]})
+
+    if 'release' in request.POST:
+        try:
+            token = uuid.UUID(request.POST['release'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid hold token.'}, status=400)
+        return JsonResponse({'released': release_hold(request.user, token)})
+
+    try:
+        turf_id = int(request.POST.get('turf', ''))
+        hold_date = datetime.strptime(request.POST.get('date', ''), '%Y-%m-%d').date()
+        start_time = datetime.strptime(request.POST.get('start_time', ''), '%H:%M').time()
+        end_time = datetime.strptime(request.POST.get('end_time', ''), '%H:%M').time()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid turf, date or time.'}, status=400)
+    if hold_date < date.today():
+        return JsonResponse({'error': 'You cannot book a turf for a past date.'}, status=400)
+    turf = get_object_or_404(TurfVenue.objects.only('id', 'open_time', 'close_time'), id=turf_id)
+    try:
+        hold = hold_slot(turf, request.user, hold_date, start_time, end_time)
+    except BookingError as error:
+        return JsonResponse({'error': str(error)}, status=409)
+    return JsonResponse(hold_json(hold), status=201)
+
+def waitlist_json(entry):
+    return {
+        'id': entry.id,
+        'turf_id': entry.turf_id,
+        'date': entry.date.isoformat(),
+        'start_time': entry.start_time.strftime('%H:%M'),
+        'end_time': entry.end_time.strftime('%H:%M'),
+        'created_at': entry.created_at.isoformat(),
+    }
+
+@login_required
+@user_passes_test(is_player)
+def waitlist_api(request):
+    """
+    GET lists the player's upcoming waitlist entries. POST `turf`, `date`,
+    `start_time` and `end_time` waits for a taken interval (409 if it is free
+    or cannot be booked), and POST `leave` with an entry id leaves the list.
+    """
+    if request.method != 'POST':
+        entries = WaitlistEntry.objects.filter(player=request.user, date__gte=date.today()).order_by('date', 'start_time')
+        return JsonResponse({'entries': [waitlist_json(entry) for entry in entries]})
+
+    if 'leave' in request.POST:
+        try:
+            entry_id = int(request.POST['leave'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid waitlist entry.'}, status=400)
+        return JsonResponse({'left': leave_waitlist(request.user, entry_id)})
+
+    try:
+        turf_id = int(request.POST.get('turf', ''))
+        wait_date = datetime.strptime(request.POST.get('date', ''), '%Y-%m-%d').date()
+        start_time = datetime.strptime(request.POST.get('start_time', ''), '%H:%M').time()
+        end_time = datetime.strptime(request.POST.get('end_time', ''), '%H:%M').time()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid turf, date or time.'}, status=400)
+    if wait_date < date.today():
+        return JsonResponse({'error': 'You cannot book a turf for a past date.'}, status=400)
+    turf = get_object_or_404(TurfVenue.objects.only('id', 'open_time', 'close_time'), id=turf_id)
+    try:
+        entry = join_waitlist(turf, request.user, wait_date, start_time, end_time)
+    except BookingError as error:
+        return JsonResponse({'error': str(error)}, status=409)
+    return JsonResponse(waitlist_json(entry), status=201)
+
+# Longest date range a single availability request may cover.
+MAX_AVAILABILITY_DAYS = 31
+
+@login_required
+def availability_api(request):
+    """
+    Returns a compact per-turf, per-day availability grid as JSON.
+
+    Query parameters: `start` and `end` (YYYY-MM-DD, inclusive), and optional
+    `sport`, `location` and repeated `turf` ids. All Confirmed and Blocked
+    bookings for the range are fetched in one query, and other players'
+    unexpired holds in another; both show as taken.
+    """
+    try:
+        start_date = datetime.strptime(request.GET.get('start', date.today().strftime('%Y-%m-%d')), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.GET.get('end', start_date.strftime('%Y-%m-%d')), '%Y-%m-%d').date()
+        turf_ids = [int(turf_id) for turf_id in request.GET.getlist('turf')]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date or turf id.'}, status=400)
+
+    day_count = (end_date - start_date).days + 1
+    if day_count < 1 or day_count > MAX_AVAILABILITY_DAYS:
+        return JsonResponse({'error': f'Date range must cover 1 to {MAX_AVAILABILITY_DAYS} days.'}, status=400)
+
+    turfs = TurfVenue.objects.only('id', 'name', 'open_time', 'close_time')
+    if turf_ids:
+        turfs = turfs.filter(id__in=turf_ids)
+    if request.GET.get('sport'):
+        turfs = turfs.filter(sports_type__iexact=request.GET['sport'])
+    if request.GET.get('location'):
+        turfs = turfs.filter(location__icontains=request.GET['location'])
+    turfs = list(turfs)
+
+    days = [start_date + timedelta(days=offset) for offset in range(day_count)]
+    bookings = Booking.objects.filter(
+        turf__in=[turf.id for turf in turfs],
+        date__range=(start_date, end_date),
+        status__in=Booking.ACTIVE_STATUSES,
+    ).values_list('turf_id', 'date', 'start_time', 'end_time')
+    holds = SlotHold.objects.filter(
+        turf__in=[turf.id for turf in turfs],
+        date__range=(start_date, end_date),
+        expires_at__gt=timezone.now(),
+    ).exclude(player=request.user).values_list('turf_id', 'date', 'start_time', 'end_time')
+    grids = build_day_grids(turfs, days, chain(bookings, holds))
+
+    today = date.today()
+    past_cutoff = (timezone.now() - timedelta(minutes=10)).time()
+    results = []
+    for turf in turfs:
+        availability = {}
+        for day in days:
+            grid = grids[turf.id, day]
+            if day < today:
+                blocked = grid.full_mask
+            elif day == today:
+                blocked = grid.mask_before(past_cutoff)
+            else:
+                blocked = 0
+            availability[day.isoformat()] = grid.bitstring(blocked)
+        results.append({
+            'id': turf.id,
+            'name': turf.name,
+            'open_time': turf.open_time.strftime('%H:%M') if turf.open_time else None,
+            'slot_count': len(grids[turf.id, start_date]),
+            'availability': availability,
+        })
+
+    return JsonResponse({
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'slot_minutes': SLOT_MINUTES,
+        'turfs': results,
+    })
+
+@login_required
+def turf_search_api(request):
+    """Ranked, typo-tolerant turf search over names, locations, descriptions and amenities."""
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 50)
+    except ValueError:
+        limit = 20
+    matches = get_index().search(request.GET.get('q', ''), limit=limit)
+    turfs = TurfVenue.objects.defer('price_table').in_bulk([turf_id for turf_id, _ in matches])
+    results = [
+        {
+            'id': turf_id,
+            'name': turfs[turf_id].name,
+            'location': turfs[turf_id].location,
+            'sports_type': turfs[turf_id].sports_type,
+            'price_per_hour': str(turfs[turf_id].price_per_hour),
+            'score': round(score, 3),
+        }
+        for turf_id, score in matches if turf_id in turfs
+    ]
+    return JsonResponse({'results': results})
+
+@login_required
+def turf_autocomplete_api(request):
+    """Prefix completions for the search box."""
+    return JsonResponse({'suggestions': get_index().autocomplete(request.GET.get('q', ''))})
+
+def history_page(request, bookings):
+    """Returns (bookings, next_cursor, next_query) for one page of a booking history."""
+    page, next_cursor = BookingHistory(bookings, request.GET).page()
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+    return page, next_cursor, next_query
+
+def booking_json(booking):
+    return {
+        'id': booking.id,
+        'date': booking.date.isoformat(),
+        'start_time': booking.start_time.strftime('%H:%M'),
+        'end_time': booking.end_time.strftime('%H:%M'),
+        'status': booking.status,
+        'no_of_players': booking.no_of_players,
+        'total_price': str(booking.total_price) if booking.total_price is not None else None,
+    }
+
 @login_required
 @user_passes_test(is_player)
 def my_bookings_view(request):
-    """Fetches and displays all bookings for the current player."""
-    bookings = Booking.objects.filter(player=request.user).select_related('turf').order_by('-date', '-start_time')
-    return render(request, 'my_bookings.html', {'bookings': bookings})
+    """Shows the current player's bookings, newest first, one keyset page at a time."""
+    bookings = Booking.objects.filter(player=request.user).select_related('turf').defer('turf__price_table')
+    page, _, next_query = history_page(request, bookings)
+    context = {
+        'bookings': page,
+        'filters': request.GET,
+        'statuses': BOOKING_STATUSES,
+        'next_query': next_query,
+        'is_first_page': not request.GET.get('cursor'),
+    }
+    return render(request, 'my_bookings.html', context)
+
+@login_required
+@user_passes_test(is_player)
+def my_bookings_api(request):
+    """One page of the player's bookings as JSON, for infinite scroll. Same filters as my_bookings_view."""
+    bookings = Booking.objects.filter(player=request.user).select_related('turf').defer('turf__price_table')
+    page, next_cursor, _ = history_page(request, bookings)
+    results = [
+        {
+            **booking_json(booking),
+            'turf': booking.turf.name,
+            'receipt_url': reverse('booking_receipt', args=[booking.id]),
+            'cancel_url': reverse('cancel_booking', args=[booking.id]) if is_cancellable(booking) else None,
+        }
+        for booking in page
+    ]
+    return JsonResponse({'results': results, 'next_cursor': next_cursor})
 
 @login_required
 @user_passes_test(is_player)
@@ -202,8 +450,7 @@ def cancel_booking_view(request, booking_id):
         messages.error(request, "Cancellation is not allowed within 2 hours of the start time.")
         return redirect('my_bookings')
 
-    booking.status = 'Cancelled'
-    booking.save()
+    cancel_booking(booking)
     messages.success(request, f"Your booking for {booking.turf.name} has been cancelled.")
     return redirect('my_bookings')
 
@@ -212,7 +459,7 @@ def cancel_booking_view(request, booking_id):
 @user_passes_test(is_player)
 def booking_receipt_view(request, booking_id):
     """Displays a receipt for a specific booking."""
-    booking = get_object_or_404(Booking, id=booking_id, player=request.user)
+    booking = get_object_or_404(Booking.objects.select_related('turf', 'player'), id=booking_id, player=request.user)
     return render(request, 'booking_receipt.html', {'booking': booking})
 
 # -----------------------------------------------------------------------------
@@ -250,26 +497,30 @@ def owner_dashboard_view(request):
         profile_form = UpdateProfileForm(instance=owner)
         password_form = PasswordChangeForm(user=owner)
     
-    turfs = TurfVenue.objects.filter(owner=owner)
+    turfs = TurfVenue.objects.filter(owner=owner).defer('price_table')
     today = date.today()
     start_of_month = today.replace(day=1)
     
-    bookings_this_month = Booking.objects.filter(
-        turf__owner=owner, date__gte=start_of_month, status='Confirmed'
+    # Headline figures come from the pre-aggregated per-day stats table.
+    owner_stats = OwnerDayStats.objects.filter(owner=owner).aggregate(
+        bookings=Sum('bookings', filter=Q(date__gte=start_of_month)),
+        revenue=Sum('revenue', filter=Q(date__gte=start_of_month)),
+        rating_sum=Sum('rating_sum'),
+        rating_count=Sum('rating_count'),
     )
-    
-    total_bookings_count = bookings_this_month.count()
-    revenue_data = bookings_this_month.aggregate(total=Sum('total_price'))
-    total_revenue = revenue_data['total'] or 0
-    avg_rating_data = Rating.objects.filter(turf__owner=owner).aggregate(avg=Avg('score'))
-    average_rating = avg_rating_data['avg'] or 0.0
+    total_bookings_count = owner_stats['bookings'] or 0
+    total_revenue = owner_stats['revenue'] or 0
+    average_rating = (owner_stats['rating_sum'] or 0) / (owner_stats['rating_count'] or 1)
+
+    end_of_month = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    month_report = owner_report(owner, start_of_month, end_of_month, 'day')
 
     stats = {
         'total_bookings': total_bookings_count, 'total_revenue': total_revenue,
-        'average_rating': round(average_rating, 2), 'occupancy_rate': 0, # Placeholder
+        'average_rating': round(average_rating, 2), 'occupancy_rate': month_report['totals']['occupancy'],
     }
 
-    all_owner_bookings = Booking.objects.filter(turf__owner=owner).select_related('player', 'turf')
+    all_owner_bookings = Booking.objects.filter(turf__owner=owner).select_related('player', 'turf').defer('turf__price_table')
     recent_bookings = all_owner_bookings.order_by('-booked_at')[:5]
     
     all_bookings_paginator = Paginator(all_owner_bookings.order_by('-date', '-start_time'), 10)
@@ -278,8 +529,16 @@ def owner_dashboard_view(request):
     transactions_paginator = Paginator(Transaction.objects.filter(booking__turf__owner=owner).order_by('-created_at'), 10)
     transactions_page = transactions_paginator.get_page(request.GET.get('page_trans'))
 
-    # ... (Analytics logic) ...
-    chart_data = {'labels': [], 'revenue': [], 'bookings': []} # Placeholder for now
+    # Analytics: the year/month selectors pick the range, the report is cached per range.
+    view_type = request.GET.get('view_type', 'annually')
+    try:
+        selected_year = int(request.GET.get('year', today.year))
+        month_param = request.GET.get('month')
+        selected_month_num = int(month_param.split('-')[-1]) if month_param else today.month
+    except ValueError:
+        selected_year, selected_month_num = today.year, today.month
+    range_start, range_end, granularity = resolve_range(view_type, selected_year, selected_month_num)
+    chart_data = owner_report(owner, range_start, range_end, granularity)
 
     context = {
         'turfs': turfs, 'stats': stats, 'recent_bookings': recent_bookings,
@@ -288,18 +547,29 @@ def owner_dashboard_view(request):
         'profile_form': profile_form,
         'password_form': password_form,
         'chart_data': chart_data,
-        'analytics_filters': { 'years': range(2023, today.year + 2) },
+        'analytics_filters': {
+            'years': range(2023, today.year + 2),
+            'view_type': view_type,
+            'selected_year': selected_year,
+            'selected_month_num': selected_month_num,
+            'months': [(num, calendar.month_name[num]) for num in range(1, 13)],
+        },
     }
     
     # Today's Schedule Timeline Logic
-    schedule_turfs = turfs
-    if schedule_turfs.exists():
-        min_open = schedule_turfs.aggregate(min=Min('open_time'))['min'] or time(8, 0)
-        max_close = schedule_turfs.aggregate(max=Max('close_time'))['max'] or time(22, 0)
+    # The owner's turfs are already loaded; one more query fetches today's bookings,
+    # which are grouped per turf and packed into non-overlapping sub-lanes in one pass.
+    schedule_turfs = list(turfs)
+    if schedule_turfs:
+        open_times = [turf.open_time for turf in schedule_turfs if turf.open_time]
+        close_times = [turf.close_time for turf in schedule_turfs if turf.close_time]
+        min_open = min(open_times) if open_times else time(8, 0)
+        max_close = max(close_times) if close_times else time(22, 0)
         
         start_hour = min_open.hour
         end_hour = max_close.hour + (1 if max_close.minute > 0 else 0)
         total_hours = end_hour - start_hour
+        total_timeline_minutes = total_hours * 60
 
         time_slots = [time(hour=h) for h in range(start_hour, end_hour)]
             
@@ -307,21 +577,32 @@ def owner_dashboard_view(request):
             turf__in=schedule_turfs, date=today
         ).exclude(status='Cancelled').select_related('player')
 
+        bookings_by_turf = {turf.id: [] for turf in schedule_turfs}
         for booking in bookings_today:
             if total_hours > 0:
                 start_offset_minutes = (booking.start_time.hour - start_hour) * 60 + booking.start_time.minute
-                total_timeline_minutes = total_hours * 60
                 booking.start_offset_percent = (start_offset_minutes / total_timeline_minutes) * 100
-                duration_minutes = booking.duration_in_hours * 60
-                booking.duration_percent = (duration_minutes / total_timeline_minutes) * 100
+                booking.duration_percent = (booking.duration_in_hours * 60 / total_timeline_minutes) * 100
             else:
                 booking.start_offset_percent = 0
                 booking.duration_percent = 0
+            bookings_by_turf[booking.turf_id].append(booking)
+
+        lanes = []
+        for turf in schedule_turfs:
+            sub_lanes = pack_into_lanes(bookings_by_turf[turf.id])
+            for lane_index, sub_lane in enumerate(sub_lanes):
+                for booking in sub_lane:
+                    booking.lane_index = lane_index
+            lanes.append({
+                'turf': turf,
+                'bookings': bookings_by_turf[turf.id],
+                'lane_count': max(1, len(sub_lanes)),
+            })
         
         context['schedule_data'] = {
-            'turfs': schedule_turfs, 
+            'lanes': lanes,
             'time_slots': time_slots, 
-            'bookings': bookings_today,
             'start_hour': start_hour,
         }
     
@@ -364,22 +645,75 @@ def edit_turf(request, turf_id):
 @login_required
 @user_passes_test(is_owner)
 def view_bookings(request, turf_id):
-    """Allows an owner to see all bookings for one of their turfs."""
+    """Allows an owner to page through the bookings of one of their turfs, newest first."""
     turf = get_object_or_404(TurfVenue, id=turf_id, owner=request.user)
-    bookings = Booking.objects.filter(turf=turf).order_by('-date', '-start_time')
-    return render(request, 'view_bookings.html', {'turf': turf, 'bookings': bookings})
+    page, _, next_query = history_page(request, Booking.objects.filter(turf=turf).select_related('player'))
+    context = {
+        'turf': turf,
+        'bookings': page,
+        'filters': request.GET,
+        'statuses': BOOKING_STATUSES,
+        'next_query': next_query,
+        'is_first_page': not request.GET.get('cursor'),
+    }
+    return render(request, 'view_bookings.html', context)
+
+@login_required
+@user_passes_test(is_owner)
+def turf_bookings_api(request, turf_id):
+    """One page of a turf's bookings as JSON, for infinite scroll. Same filters as view_bookings."""
+    if not TurfVenue.objects.filter(id=turf_id, owner=request.user).exists():
+        raise Http404("No TurfVenue matches the given query.")
+    page, next_cursor, _ = history_page(request, Booking.objects.filter(turf_id=turf_id).select_related('player'))
+    results = [
+        {
+            **booking_json(booking),
+            'player': booking.player.name if booking.player else None,
+            'detail_url': reverse('owner_booking_detail', args=[booking.id]),
+        }
+        for booking in page
+    ]
+    return JsonResponse({'results': results, 'next_cursor': next_cursor})
+
+@login_required
+@user_passes_test(is_owner)
+def export_bookings(request):
+    """
+    Streams the owner's bookings or transactions for download.
+
+    Query parameters: `kind` (bookings or transactions), `format` (csv or
+    parquet), optional `start` and `end` (YYYY-MM-DD, inclusive) and `turf`.
+    """
+    kind = request.GET.get('kind', 'bookings')
+    export_format = request.GET.get('format', 'csv')
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else None
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else None
+        turf_id = int(request.GET['turf']) if request.GET.get('turf') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date or turf id.'}, status=400)
+    try:
+        rows = export_queryset(kind, owner=request.user, start=start, end=end, turf_id=turf_id)
+        chunks = stream_export(kind, export_format, rows)
+    except ExportError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    content_type, extension = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{kind}-{date.today():%Y%m%d}.{extension}"'
+    return response
 
 @login_required
 @user_passes_test(is_owner)
 def owner_booking_detail_view(request, booking_id):
     """Allows an owner to see the full details of a single booking."""
-    booking = get_object_or_404(Booking, id=booking_id, turf__owner=request.user)
+    booking = get_object_or_404(Booking.objects.select_related('turf', 'player'), id=booking_id, turf__owner=request.user)
     return render(request, 'view_booking_detail.html', {'booking': booking, 'turf': booking.turf})
 
 @login_required
 @user_passes_test(is_owner)
 def manage_slots(request, turf_id):
-    """Allows a turf owner to view, block, and unblock time slots."""
+    """Allows a turf owner to view, block, and unblock time slots, one at a time or by recurring rule."""
     turf = get_object_or_404(TurfVenue, id=turf_id, owner=request.user)
     
     if request.method == 'POST':
@@ -388,66 +722,152 @@ def manage_slots(request, turf_id):
         slot_date = datetime.strptime(slot_date_str, '%Y-%m-%d').date()
 
         if action == 'block':
-            start_time_str = request.POST.get('start_time')
-            end_time_str = request.POST.get('end_time')
-            reason = request.POST.get('reason', 'Maintenance')
-
-            Booking.objects.create(
-                turf=turf, player=None, date=slot_date,
-                start_time=datetime.strptime(start_time_str, '%H:%M:%S').time(),
-                end_time=datetime.strptime(end_time_str, '%H:%M:%S').time(),
-                status='Blocked', block_reason=reason
-            )
-            messages.success(request, f"Slot on {slot_date_str} blocked successfully.")
+            try:
+                block_slot(
+                    turf, slot_date,
+                    datetime.strptime(request.POST.get('start_time'), '%H:%M:%S').time(),
+                    datetime.strptime(request.POST.get('end_time'), '%H:%M:%S').time(),
+                    reason=request.POST.get('reason') or 'Maintenance',
+                )
+            except BookingError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, f"Slot on {slot_date_str} blocked successfully.")
         
         elif action == 'unblock':
             booking_id = request.POST.get('booking_id')
             booking_to_unblock = get_object_or_404(Booking, id=booking_id, turf=turf, status='Blocked')
             booking_to_unblock.delete()
             messages.success(request, f"Slot on {slot_date_str} is now available.")
-            
+
+        elif action == 'block_rule':
+            try:
+                rule, result = create_block_rule(
+                    turf,
+                    weekdays=sum(1 << int(day) for day in set(request.POST.getlist('weekdays')) if day in '0123456'),
+                    start_date=datetime.strptime(request.POST.get('start_date'), '%Y-%m-%d').date(),
+                    end_date=datetime.strptime(request.POST.get('end_date'), '%Y-%m-%d').date(),
+                    start_time=datetime.strptime(request.POST.get('start_time'), '%H:%M').time(),
+                    end_time=datetime.strptime(request.POST.get('end_time'), '%H:%M').time(),
+                    reason=request.POST.get('reason') or 'Maintenance',
+                    exceptions=request.POST.get('exceptions', ''),
+                )
+            except (TypeError, ValueError):
+                messages.error(request, "Please fill in the dates and times of the recurring block.")
+            except BookingError as error:
+                messages.error(request, str(error))
+            else:
+                messages.success(request, f"Blocked {result['created']} slot(s) for {rule.weekday_display}.")
+                if result['conflicts']:
+                    clashes = ', '.join(
+                        f"{booking.date:%d %b} ({booking.player.name if booking.player else 'N/A'})"
+                        for booking in result['conflicts'][:5]
+                    )
+                    more = len(result['conflicts']) - 5
+                    messages.warning(request, f"Skipped {len(result['conflicts'])} date(s) with confirmed bookings: {clashes}" + (f" and {more} more." if more > 0 else "."))
+                if result['already_blocked']:
+                    messages.info(request, f"Skipped {result['already_blocked']} date(s) that were already blocked.")
+
+        elif action == 'remove_rule':
+            rule = get_object_or_404(BlockRule, id=request.POST.get('rule_id'), turf=turf)
+            removed = remove_block_rule(rule)
+            messages.success(request, f"Removed the recurring block and unblocked {removed} upcoming slot(s).")
+
+        elif action == 'price_rule':
+            try:
+                rule = create_price_rule(
+                    turf,
+                    weekdays=sum(1 << int(day) for day in set(request.POST.getlist('weekdays')) if day in '0123456'),
+                    start_time=datetime.strptime(request.POST.get('start_time'), '%H:%M').time(),
+                    end_time=datetime.strptime(request.POST.get('end_time'), '%H:%M').time(),
+                    multiplier=request.POST.get('multiplier'),
+                    label=request.POST.get('label') or 'Peak hours',
+                )
+            except (TypeError, ValueError):
+                messages.error(request, "Please fill in the times of the price rule.")
+            except BookingError as error:
+                messages.error(request, str(error))
+            else:
+                messages.success(request, f"Prices on {rule.weekday_display} are now x{rule.multiplier} from {rule.start_time:%H:%M} to {rule.end_time:%H:%M}.")
+
+        elif action == 'remove_price_rule':
+            get_object_or_404(PriceRule, id=request.POST.get('rule_id'), turf=turf).delete()
+            messages.success(request, "Removed the price rule.")
+
+        elif action == 'price_holiday':
+            try:
+                holiday = set_price_holiday(
+                    turf,
+                    datetime.strptime(request.POST.get('holiday_date'), '%Y-%m-%d').date(),
+                    priced_as=int(request.POST.get('priced_as', 6)),
+                    label=request.POST.get('label') or 'Holiday',
+                )
+            except (TypeError, ValueError):
+                messages.error(request, "Please pick the holiday's date.")
+            except BookingError as error:
+                messages.error(request, str(error))
+            else:
+                messages.success(request, f"{holiday.date:%d %b %Y} is now priced as a {holiday.priced_as_display}.")
+
+        elif action == 'remove_price_holiday':
+            get_object_or_404(PriceHoliday, id=request.POST.get('holiday_id'), turf=turf).delete()
+            messages.success(request, "Removed the holiday.")
+
+        elif action == 'surge':
+            try:
+                set_surge_multiplier(turf, request.POST.get('surge_multiplier'))
+            except BookingError as error:
+                messages.error(request, str(error))
+            else:
+                messages.success(request, "Surge pricing updated.")
+
         return redirect(f"{request.path}?date={slot_date_str}")
 
     selected_date_str = request.GET.get('date', date.today().strftime('%Y-%m-%d'))
     selected_date = datetime.strptime(selected_date_str, '%Y-%m-%d').date()
     
-    bookings_on_date = Booking.objects.filter(turf=turf, date=selected_date)
-    
-    booked_slots = {}
-    for booking in bookings_on_date:
-        booked_slots[booking.start_time] = booking
+    bookings_on_date = Booking.objects.filter(
+        turf=turf, date=selected_date
+    ).exclude(status='Cancelled').select_related('player')
+    grid = DayGrid(turf.open_time, turf.close_time)
+    slot_owners = grid.owners(bookings_on_date)
 
     slots = []
-    if turf.open_time and turf.close_time:
-        current_time = datetime.combine(selected_date, turf.open_time)
-        close_time = datetime.combine(selected_date, turf.close_time)
-        
-        while current_time < close_time:
-            slot_start_time = current_time.time()
-            end_of_slot = current_time + timedelta(minutes=30)
-            
-            slot_info = {
-                'start_time': slot_start_time,
-                'end_time': end_of_slot.time(),
-                'status': 'available',
-                'booking_obj': None,
-            }
-
-            if slot_start_time in booked_slots:
-                booking = booked_slots[slot_start_time]
-                slot_info['status'] = booking.status.lower()
-                slot_info['booking_obj'] = booking
-
-            slots.append(slot_info)
-            current_time = end_of_slot
+    for index, booking in enumerate(slot_owners):
+        slots.append({
+            'start_time': grid.slot_start(index),
+            'end_time': grid.slot_end(index),
+            'status': booking.status.lower() if booking else 'available',
+            'booking_obj': booking,
+        })
 
     context = {
         'turf': turf,
         'slots': slots,
         'selected_date': selected_date.strftime('%Y-%m-%d'),
+        'block_rules': BlockRule.objects.filter(turf=turf, end_date__gte=date.today()),
+        'price_rules': PriceRule.objects.filter(turf=turf),
+        'price_holidays': PriceHoliday.objects.filter(turf=turf, date__gte=date.today()),
+        'weekday_names': list(enumerate(BlockRule.WEEKDAY_NAMES)),
     }
     return render(request, 'owner-manage-slots.html', context)
 
+# -----------------------------------------------------------------------------
+# Diagnostics
+# -----------------------------------------------------------------------------
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def view_stats_api(request):
+    """Per-view query counts and timings, plus availability cache counters. POST resets the timings."""
+    if request.method == 'POST':
+        view_stats.reset()
+    return JsonResponse({
+        'profiling': settings.TURF_PROFILING,
+        'views': view_stats.snapshot(),
+        'slot_cache': slot_cache().stats(),
+    })
+
 # -----------------------------------------------------------------------------
 # Placeholder Views for Static Pages
 # -----------------------------------------------------------------------------
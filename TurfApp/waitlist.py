@@ -0,0 +1,141 @@
+from datetime import date, timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .availability import DayGrid, IntervalIndex
+from .jobs import enqueue, job, new_job
+from .models import SlotHold, TurfVenue, WaitlistEntry
+from .services import BookingError, day_holds, load_day_grid, load_day_index, lock_turf_day, overlapping
+
+# -----------------------------------------------------------------------------
+# Waitlist
+# -----------------------------------------------------------------------------
+#
+# Players can wait for an interval of a turf-day that is taken. Whenever part
+# of the day frees up (a cancellation, an unblock, a removed block rule or an
+# expired hold), a promote_waitlist job is queued for the turf-day; queued
+# passes for the same day coalesce through the job key. One pass reads the
+# day's waiters in arrival order and offers every one that can now be served
+# a hold for WAITLIST_OFFER_SECONDS, plus an email. An offer that runs out
+# frees its interval again, so the next waiter gets it.
+#
+# A pass loads only the waiters whose interval fits inside one of the day's
+# free runs; the database filters out the rest. match_waiters then indexes
+# them in an IntervalIndex and asks it, for each free run, for the waiters
+# lying entirely inside it. That lookup bisects to the waiters starting in the
+# run and skips any subtree whose earliest end is past the run's end.
+
+WAITLIST_OFFER_SECONDS = 30 * 60
+
+# Most intervals one player may wait for on one turf-day.
+MAX_WAITLIST_ENTRIES = 5
+
+
+def join_waitlist(turf, player, day, start_time, end_time):
+    """
+    Puts a player on the waitlist for an interval, or returns their existing
+    entry for it. Raises BookingError if the interval could be booked right now.
+    """
+    if start_time >= end_time:
+        raise BookingError("The end time must be after the start time.")
+    if not DayGrid(turf.open_time, turf.close_time).fits(start_time, end_time):
+        raise BookingError("Please choose a time within the turf's opening hours.")
+
+    with transaction.atomic():
+        lock_turf_day(turf, day, bump=False)
+        taken = load_day_index(turf, day).overlaps(start_time, end_time) or overlapping(
+            day_holds(turf.id, day, exclude_player=player), start_time, end_time,
+        ).exists()
+        if not taken:
+            raise BookingError("That time is free, so you can book it right away.")
+        entries = WaitlistEntry.objects.filter(turf=turf, player=player, date=day)
+        entry = entries.filter(start_time=start_time, end_time=end_time).first()
+        if entry is None:
+            if entries.count() >= MAX_WAITLIST_ENTRIES:
+                raise BookingError(f"You can wait for at most {MAX_WAITLIST_ENTRIES} times on one day.")
+            entry = WaitlistEntry.objects.create(
+                turf=turf, player=player, date=day, start_time=start_time, end_time=end_time,
+            )
+    return entry
+
+
+def leave_waitlist(player, entry_id):
+    """Removes one of the player's entries. Returns True if it existed."""
+    return WaitlistEntry.objects.filter(player=player, pk=entry_id).delete()[0] > 0
+
+
+def match_waiters(entries, grid, blocked=0):
+    """
+    Picks, oldest first, the entries whose whole interval lies in a free run
+    of the grid, never two that overlap and at most one per player.
+    """
+    index = IntervalIndex((entry.start_time, entry.end_time, entry) for entry in entries)
+    candidates = []
+    for first, length in grid.free_runs(blocked):
+        candidates.extend(index.within(grid.slot_start(first), grid.slot_end(first + length - 1)))
+
+    picked, players = [], set()
+    for entry in sorted(candidates, key=lambda entry: (entry.created_at, entry.id)):
+        if entry.player_id in players:
+            continue
+        # At most one pick per free half-hour, so this list stays short.
+        if any(other.start_time < entry.end_time and entry.start_time < other.end_time for other in picked):
+            continue
+        picked.append(entry)
+        players.add(entry.player_id)
+    return picked
+
+
+def promote_waitlist(turf_id, day, now=None):
+    """
+    One batched pass over a turf-day's waitlist. Every waiter that can be
+    served gets a hold, an offer email and leaves the list. Returns those entries.
+    """
+    now = now or timezone.now()
+    if day < date.today():
+        WaitlistEntry.objects.filter(turf_id=turf_id, date=day).delete()
+        return []
+
+    with transaction.atomic():
+        turf = TurfVenue.objects.filter(pk=turf_id).first()
+        if turf is None:
+            return []
+        lock_turf_day(turf, day, bump=False)
+        grid = load_day_grid(turf, day)
+        blocked = grid.mask_intervals(day_holds(turf.id, day, now=now).values_list('start_time', 'end_time'))
+        if day == date.today():
+            blocked |= grid.mask_before((now - timedelta(minutes=10)).time())
+        runs = grid.free_runs(blocked)
+        if not runs:
+            return []
+        fits = Q()
+        for first, length in runs:
+            fits |= Q(start_time__gte=grid.slot_start(first), end_time__lte=grid.slot_end(first + length - 1))
+        entries = WaitlistEntry.objects.filter(fits, turf=turf, date=day).only(
+            'id', 'player_id', 'start_time', 'end_time', 'created_at',
+        )
+        picked = match_waiters(entries, grid, blocked)
+        if not picked:
+            return []
+
+        expires_at = now + timedelta(seconds=WAITLIST_OFFER_SECONDS)
+        # A player has one hold per turf-day, so the offer replaces any other.
+        SlotHold.objects.filter(turf=turf, date=day, player_id__in=[entry.player_id for entry in picked]).delete()
+        holds = SlotHold.objects.bulk_create([
+            SlotHold(
+                turf=turf, player_id=entry.player_id, date=day, start_time=entry.start_time,
+                end_time=entry.end_time, expires_at=expires_at,
+            )
+            for entry in picked
+        ])
+        WaitlistEntry.objects.filter(pk__in=[entry.pk for entry in picked]).delete()
+        enqueue(*[
+            new_job('send_waitlist_offer', key=f'offer:{hold.token}', hold_token=str(hold.token))
+            for hold in holds
+        ])
+    return picked
+
+
+@job('promote_waitlist')
+def promote_waitlist_job(turf_id, day):
+    promote_waitlist(turf_id, date.fromisoformat(day))
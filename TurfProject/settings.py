@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,8 +24,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    # --- ADD THIS LINE ---
-    "whitenoise.middleware.WhiteNoiseMiddleware", # For serving static files
+    # Per-request query/latency profiling; only active when TURF_PROFILING is on.
+    'TurfApp.profiling.ProfilingMiddleware',
+    # WhiteNoise static files, wrapped so the stack stays fully async under ASGI.
+    'TurfApp.middleware.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -37,7 +40,8 @@ ROOT_URLCONF = 'TurfProject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The stock Django backend, plus render timing for TurfApp.profiling.
+        'BACKEND': 'TurfApp.profiling.ProfiledDjangoTemplates',
         # --- CORRECTED DIRS PATH ---
         'DIRS': [os.path.join(BASE_DIR, 'TurfApp/templates')],
         'APP_DIRS': True,
@@ -57,8 +61,30 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Serialize write transactions up front so concurrent checkouts queue
+        # on the turf-day lock instead of failing with "database is locked".
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file-backed test database (outside the checkout), so concurrency
+        # tests exercise real SQLite locking rather than shared-cache table locks.
+        'TEST': {
+            'NAME': os.path.join(tempfile.gettempdir(), 'turfapp_test.sqlite3'),
+        },
     }
 }
+# Set TURF_POSTGRES_DB (and TURF_POSTGRES_HOST/PORT/USER/PASSWORD) to run on
+# Postgres instead, e.g. to stress the turf-day row locks in the test suite.
+if os.environ.get('TURF_POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['TURF_POSTGRES_DB'],
+        'HOST': os.environ.get('TURF_POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('TURF_POSTGRES_PORT', '5432'),
+        'USER': os.environ.get('TURF_POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('TURF_POSTGRES_PASSWORD', ''),
+    }
 
 # ... (Password Validators) ...
 
@@ -77,6 +103,33 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Adds Server-Timing headers and per-view totals (see TurfApp/profiling.py).
+TURF_PROFILING = DEBUG
+
+# Where cached turf-day availability lives (see TurfApp/slot_cache.py). To share
+# it between processes, use 'TurfApp.slot_cache.DjangoCacheBackend' with
+# OPTIONS {'alias': ...} naming a file-based or Redis entry in CACHES.
+TURF_SLOT_CACHE = {
+    'BACKEND': 'TurfApp.slot_cache.LRUBackend',
+    'OPTIONS': {'max_entries': 4096},
+}
+# Background jobs (see TurfApp/jobs.py) are run by `manage.py run_jobs`. When
+# TURF_JOBS_EAGER is on, each request also drains the queue after it commits.
+TURF_JOBS_EAGER = DEBUG
+# Live slot updates for open booking pages (see TurfApp/live.py). LocalBroker only
+# reaches streams served by the same process; run one ASGI worker or plug in a
+# shared broker.
+TURF_LIVE_BROKER = {
+    'BACKEND': 'TurfApp.live.LocalBroker',
+    'OPTIONS': {'max_pending': 64},
+}
+TURF_LIVE_STREAM_SECONDS = 300
+
+if DEBUG:
+    # Development prints outgoing mail instead of sending it.
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'bookings@turfbooking.local'
 AUTH_USER_MODEL = 'TurfApp.TurfUser'
 
 # ... (Your JAZZMIN_SETTINGS) ...